@@ -3,14 +3,19 @@
 
 Administrative commands for bot owner:
 - /reset_pins - Unpin all messages in owner chat
+- /reload_settings - Re-read .env and environment into cached settings
+- /latency [reset] - Per-update latency percentiles (p50/p95/p99)
 """
 
 import logging
+from html import escape
 from aiogram import Router, Bot
 from aiogram.types import Message
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 
-from config.env import get_settings
+from bot.middlewares.latency import format_latency_report
+from config.env import get_settings, reload_settings
+from engine.latency import get_latency_registry
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -51,5 +56,63 @@ async def handle_reset_pins(message: Message, bot: Bot):
         await message.answer("❌ Произошла ошибка при очистке пинов.")
 
 
+@router.message(Command("reload_settings"))
+async def handle_reload_settings(message: Message):
+    """
+    Admin command to reload cached settings (same as SIGHUP).
+
+    Only works for owner_id user.
+    """
+    try:
+        settings = get_settings()
+        user_id = message.from_user.id
+
+        if not settings.owner_id or user_id != settings.owner_id:
+            await message.answer("🚫 Доступ запрещен. Эта команда только для владельца бота.")
+            logger.warning(f"[ADMIN] Unauthorized access to /reload_settings by user {user_id}")
+            return
+
+        reload_settings()
+        await message.answer("✅ Настройки перечитаны.")
+        logger.info(f"[ADMIN] User {user_id} executed /reload_settings")
+
+    except Exception as e:
+        logger.error(f"Error in /reload_settings command: {e}")
+        await message.answer("❌ Не удалось перечитать настройки, оставлены прежние.")
+
+
+@router.message(Command("latency"))
+async def handle_latency(message: Message, command: CommandObject):
+    """
+    Admin command to show latency percentiles per router and callback prefix.
+
+    "/latency reset" clears the histograms. Only works for owner_id user.
+    """
+    try:
+        settings = get_settings()
+        user_id = message.from_user.id
+
+        if not settings.owner_id or user_id != settings.owner_id:
+            await message.answer("🚫 Доступ запрещен. Эта команда только для владельца бота.")
+            logger.warning(f"[ADMIN] Unauthorized access to /latency by user {user_id}")
+            return
+
+        registry = get_latency_registry()
+        if (command.args or "").strip() == "reset":
+            registry.reset()
+            await message.answer("✅ Гистограммы задержек сброшены.")
+            logger.info(f"[ADMIN] User {user_id} executed /latency reset")
+            return
+
+        report = format_latency_report(registry.snapshot())
+        await message.answer(
+            f"⏱️ Задержки обработки\n<pre>{escape(report)}</pre>", parse_mode="HTML"
+        )
+
+    except Exception as e:
+        logger.error(f"Error in /latency command: {e}")
+        await message.answer("❌ Не удалось получить статистику задержек.")
+
+
 # Export router
 __all__ = ["router"]
@@ -21,14 +21,15 @@ from engine.analytics import (
     checkout_started,
 )
 from engine.catalog_store import CatalogStore
+from bot.utils.lazy import LazyProxy
 import os
 from i18n.ru import *
 
 logger = logging.getLogger(__name__)
 router = Router()
 
-# Global instances
-cart_store = CartStore()
+# Global instances (carts are loaded from disk on first use)
+cart_store = LazyProxy(CartStore)
 
 # Catalog instance for product lookup
 _catalog_store = None
@@ -71,6 +72,14 @@ def find_product_by_id(product_id: str):
                 return product
         except Exception:
             pass
+    # Fuzzy: full-text index (word order, ё/е) - only an unambiguous exact-word match
+    try:
+        found = get_catalog_store().unique_match(pid)
+        if found:
+            logger.info(f"🔍 Catalog lookup for '{pid}' resolved by search: {found.key}")
+            return found
+    except Exception as e:
+        logger.warning(f"Catalog search failed for '{pid}': {e}")
     logger.warning(f"🧐 Catalog lookup failed for product_id='{pid}'")
     return None
 
@@ -448,14 +448,13 @@ async def q8_lip_color(cb: CallbackQuery, state: FSMContext) -> None:
 
         # Legacy PDF helpers (guarded)
         try:
-            from bot.ui.pdf import save_last_json, save_text_pdf
+            from bot.ui.pdf import save_last_json
         except Exception:
 
             def save_last_json(*args, **kwargs):
                 return None
 
-            def save_text_pdf(*args, **kwargs):
-                return None
+        from bot.ui.report_service import get_report_service
 
         from bot.ui.render import render_makeup_report
         import os
@@ -560,7 +559,6 @@ async def q8_lip_color(cb: CallbackQuery, state: FSMContext) -> None:
             render_report_pdf,
             save_report_blocks,
         )
-        from bot.ui.pdf_v2 import generate_structured_pdf_report
 
         profile_dict = {
             "season": str(profile.season) if hasattr(profile, "season") else None,
@@ -618,7 +616,7 @@ async def q8_lip_color(cb: CallbackQuery, state: FSMContext) -> None:
                         source_result=result,
                         analysis={"tldr": tldr_report, "full": full_report},
                     )
-                    path = generate_structured_pdf_report(uid, snap)
+                    path = await get_report_service().render("structured", uid, snap)
                     print(f"✅ PDF v2 generated for palette: {path}")
                 except Exception as e:
                     print(f"⚠️ PDF v2 generation failed (palette): {e}")
@@ -753,7 +751,9 @@ async def q8_lip_color(cb: CallbackQuery, state: FSMContext) -> None:
             except Exception as e:
                 print(f"⚠️ save_last_json failed: {e}")
             try:
-                save_text_pdf(uid, title="🎨 Отчёт по цветотипу", body_text=full_report)
+                get_report_service().submit(
+                    "text", uid, title="🎨 Отчёт по цветотипу", body_text=full_report
+                )
             except Exception as e:
                 print(f"⚠️ save_text_pdf failed: {e}")
 
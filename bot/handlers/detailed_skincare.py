@@ -481,14 +481,13 @@ async def q8_desired_effect(cb: CallbackQuery, state: FSMContext) -> None:
 
         # Legacy PDF helpers (guarded)
         try:
-            from bot.ui.pdf import save_last_json, save_text_pdf
+            from bot.ui.pdf import save_last_json
         except Exception:
 
             def save_last_json(*args, **kwargs):
                 return None
 
-            def save_text_pdf(*args, **kwargs):
-                return None
+        from bot.ui.report_service import get_report_service
 
         import os
 
@@ -649,7 +648,9 @@ async def q8_desired_effect(cb: CallbackQuery, state: FSMContext) -> None:
                 print(f"⚠️ save_last_json failed: {e}")
             try:
                 # Optional legacy text PDF; errors are ignored
-                save_text_pdf(uid, title="🧴 Отчёт по уходу за кожей", body_text=full_report)
+                get_report_service().submit(
+                    "text", uid, title="🧴 Отчёт по уходу за кожей", body_text=full_report
+                )
             except Exception as e:
                 print(f"⚠️ save_text_pdf failed: {e}")
 
@@ -751,7 +752,7 @@ async def q8_desired_effect(cb: CallbackQuery, state: FSMContext) -> None:
             render_report_pdf,
             save_report_blocks,
         )
-        from bot.ui.pdf_v2 import generate_structured_pdf_report
+        from bot.ui.report_service import get_report_service
 
         # Собираем минимальный набор для отчёта
         picks = {"products": []}
@@ -775,7 +776,7 @@ async def q8_desired_effect(cb: CallbackQuery, state: FSMContext) -> None:
                         source_result=result,
                         analysis={"tldr": tldr_report, "full": full_report},
                     )
-                    path = generate_structured_pdf_report(uid, snap)
+                    path = await get_report_service().render("structured", uid, snap)
                     print(f"✅ PDF v2 generated for skincare: {path}")
                 except Exception as e:
                     print(f"⚠️ PDF v2 generation failed (skincare): {e}")
@@ -14,17 +14,16 @@ from engine.selector import SelectorV2
 from engine.answer_expander import AnswerExpanderV2
 
 try:
-    from bot.ui.pdf import save_text_pdf, save_last_json  # type: ignore
+    from bot.ui.pdf import save_last_json  # type: ignore
 except ImportError as e:
     print(f"Warning: Could not import pdf module: {e}")
 
-    def save_text_pdf(*args, **kwargs):
-        return ""
-
     def save_last_json(*args, **kwargs):
         pass
 
 
+from bot.ui.report_service import get_report_service
+
 router = Router()
 
 
@@ -426,7 +425,12 @@ async def a7(cb: CallbackQuery, state: FSMContext) -> None:
             "full_text": enriched.get("full_text"),
         }
         save_last_json(uid, snapshot)
-        save_text_pdf(uid, title="Отчёт по палитре", body_text=text_to_pdf)
+        try:
+            get_report_service().submit(
+                "text", uid, title="Отчёт по палитре", body_text=text_to_pdf
+            )
+        except Exception as e:
+            print(f"⚠️ save_text_pdf failed: {e}")
         await msg.edit_text(text, disable_web_page_preview=True)
         await msg.edit_reply_markup(reply_markup=kb)
         await state.clear()
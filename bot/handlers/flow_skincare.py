@@ -14,17 +14,16 @@ from engine.selector import SelectorV2
 from engine.answer_expander import AnswerExpanderV2
 
 try:
-    from bot.ui.pdf import save_text_pdf, save_last_json
+    from bot.ui.pdf import save_last_json
 except ImportError as e:
     print(f"Warning: Could not import pdf module: {e}")
 
-    def save_text_pdf(*args, **kwargs):
-        return ""
-
     def save_last_json(*args, **kwargs):
         pass
 
 
+from bot.ui.report_service import get_report_service
+
 router = Router()
 
 
@@ -278,7 +277,12 @@ async def on_confirm(cb: CallbackQuery, state: FSMContext) -> None:
             "full_text": full_report,
         }
         save_last_json(uid, snapshot)
-        save_text_pdf(uid, title="📊 Skin Advisor - Отчёт по уходу", body_text=full_report)
+        try:
+            get_report_service().submit(
+                "text", uid, title="📊 Skin Advisor - Отчёт по уходу", body_text=full_report
+            )
+        except Exception as e:
+            print(f"⚠️ save_text_pdf failed: {e}")
         await msg.edit_text(text, disable_web_page_preview=True)
         await msg.edit_reply_markup(reply_markup=kb)
         await state.clear()
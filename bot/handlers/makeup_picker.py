@@ -3,12 +3,14 @@
 Инлайн-подбор декоративной косметики после теста «Тон&Сияние»
 Выбор оттенков на основе профиля пользователя, прямое добавление в корзину
 """
+
 import os
 import sys
 from typing import List, Dict, Optional, Tuple
 from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+from bot.utils.lazy import LazyProxy
 
 # Default MAKEUP_CATEGORIES (fallback if i18n fails)
 MAKEUP_CATEGORIES = [
@@ -128,8 +130,10 @@ except ImportError:
 
 # Fix import for engine modules
 try:
-    from engine.catalog_store import CatalogStore
+    from engine.catalog_store import CatalogStore, partner_link_params
     from engine.models import Product, UserProfile
+    from engine.shade_matching import MAX_MATCH_DELTA_E, delta_e_2000, hex_to_lab
+    from engine.shade_normalization import get_shade_normalizer
     from engine.source_resolver import SourceResolver
     from engine.affiliate_validator import AffiliateManager
     from engine.ab_testing import get_ab_testing_framework
@@ -292,11 +296,16 @@ try:
 except:
     affiliate_manager = AffiliateManager()  # fallback
 
-# Инициализация A/B testing framework
-try:
-    ab_framework = get_ab_testing_framework()
-except:
-    ab_framework = ABTestingFramework()  # fallback
+
+# Инициализация A/B testing framework (история назначений читается при первом обращении)
+def _load_ab_framework():
+    try:
+        return get_ab_testing_framework()
+    except:
+        return ABTestingFramework()  # fallback
+
+
+ab_framework = LazyProxy(_load_ab_framework)
 
 # MAKEUP_CATEGORIES is now defined inside the i18n try/except block above
 
@@ -405,6 +414,14 @@ def select_shades(profile: UserProfile, product: Product) -> List[Dict]:
         if len(preferred_shades) < 3:
             preferred_shades.extend(["nude", "beige", "neutral"])
 
+        # Цвета предпочтений в CIELAB (для вариантов, не совпавших по названию)
+        normalizer = get_shade_normalizer()
+        preferred_labs = []
+        for i, shade in enumerate(preferred_shades):
+            lab = hex_to_lab(normalizer.normalize_shade(shade).hex_color)
+            if lab:
+                preferred_labs.append((1.0 - (i * 0.1), lab))
+
         # Фильтруем варианты продукта
         suitable_variants = []
         if hasattr(product, "variants") and product.variants:
@@ -423,6 +440,19 @@ def select_shades(profile: UserProfile, product: Product) -> List[Dict]:
                         relevance_score = max(relevance_score, weight)
                         break
 
+                # Нет совпадения по названию - сравниваем цвет по ΔE2000
+                if relevance_score == 0 and preferred_labs:
+                    variant_hex = (
+                        getattr(variant, "hex_color", None)
+                        or getattr(variant, "hex", None)
+                        or normalizer.normalize_shade(variant_name).hex_color
+                    )
+                    variant_lab = hex_to_lab(variant_hex)
+                    if variant_lab:
+                        for weight, lab in preferred_labs:
+                            closeness = 1.0 - delta_e_2000(lab, variant_lab) / MAX_MATCH_DELTA_E
+                            relevance_score = max(relevance_score, weight * closeness)
+
                 # Дополнительные бонусы
                 if undertone and undertone in variant_undertone:
                     relevance_score += 0.3
@@ -467,37 +497,52 @@ async def get_makeup_products_for_category(
             print(f"❌ No catalog loaded for {category_slug}")
             return [], 0
 
-        # Фильтруем продукты по категории
-        category_products = []
-        for product in catalog:
-            if hasattr(product, "category") and product.category == category_slug:
-                category_products.append(product)
+        # Фильтруем продукты по категории (индекс каталога)
+        category_query = catalog_store.query().category(category_slug, exact=True)
+        total = category_query.count()
 
-        if not category_products:
+        if not total:
             print(f"❌ No products found for category {category_slug}")
             return [], 0
 
         # Преобразуем в формат для отображения
         result_products = []
-        for product in category_products[:8]:  # Максимум 8 товаров на страницу
+        for product in category_query.first(8):  # Максимум 8 товаров на страницу
             # Выбираем подходящие оттенки
             suitable_shades = select_shades(user_profile, product)
 
+            # Статичные поля карточки посчитаны при загрузке каталога
+            projection = catalog_store.projection(product)
+            if projection is not None:
+                static_fields = {
+                    "name": projection.name or "Без названия",
+                    "brand": projection.brand,
+                    "price": projection.price,
+                    "currency": projection.price_currency,
+                    "in_stock": projection.in_stock,
+                    "ref_link": projection.ref_link(*partner_link_params()) or "",
+                }
+            else:
+                static_fields = {
+                    "name": getattr(product, "name", "Без названия"),
+                    "brand": getattr(product, "brand", "Бренд"),
+                    "price": getattr(product, "price", 0),
+                    "currency": getattr(product, "currency", "RUB"),
+                    "in_stock": getattr(product, "in_stock", True),
+                    "ref_link": getattr(product, "ref_link", ""),
+                }
+
             product_dict = {
+                # id должен совпадать с поиском в m:prd:/m:add: обработчиках
                 "product_id": getattr(product, "id", str(id(product))),
-                "name": getattr(product, "name", "Без названия"),
-                "brand": getattr(product, "brand", "Бренд"),
-                "price": getattr(product, "price", 0),
-                "currency": getattr(product, "currency", "RUB"),
-                "in_stock": getattr(product, "in_stock", True),
-                "ref_link": getattr(product, "ref_link", ""),
+                **static_fields,
                 "category": category_slug,
                 "suitable_shades": suitable_shades,
                 "has_variants": len(suitable_shades) > 0,
             }
             result_products.append(product_dict)
 
-        return result_products, len(category_products)
+        return result_products, total
 
     except Exception as e:
         print(f"❌ Error getting makeup products for category {category_slug}: {e}")
@@ -645,7 +690,11 @@ async def show_makeup_category(cb: CallbackQuery, state: FSMContext) -> None:
 
         # Добавляем кнопку "Назад"
         buttons.append(
-            [InlineKeyboardButton(text="◀️ Назад к категориям", callback_data="makeup_picker:start")]
+            [
+                InlineKeyboardButton(
+                    text="◀️ Назад к категориям", callback_data="makeup_picker:start"
+                )
+            ]
         )
 
         await cb.message.edit_text(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
@@ -11,6 +11,7 @@ from aiogram import Bot, F, Router
 from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from bot.utils.lazy import LazyProxy
 from bot.utils.security import safe_send_message
 from config.env import get_settings
 from engine.catalog_store import CatalogStore
@@ -29,7 +30,8 @@ router = Router()
 try:
     from engine.selector import SelectorV2
 
-    _selector = SelectorV2()
+    # Правила совместимости компилируются при первом обращении
+    _selector = LazyProxy(SelectorV2)
     selector_available = True
 except ImportError:  # pragma: no cover - optional dependency
     selector_available = False
@@ -60,19 +62,8 @@ def _get_catalog_products() -> List[dict]:
     try:
         settings = get_settings()
         catalog_store = CatalogStore.instance(settings.catalog_path)
-        catalog = catalog_store.get()
-        return [
-            {
-                "id": p.key,
-                "name": p.title,
-                "price": p.price or 0,
-                "category": p.category,
-                "brand": p.brand,
-                "image_url": p.image_url,
-                "source": p.source,
-            }
-            for p in catalog[:200]
-        ]
+        # Сводки продуктов собраны при загрузке каталога (read-only)
+        return catalog_store.summaries()[:200]
     except Exception as e:
         logger.error(f"Failed to load catalog products: {e}")
         # Ultimate fallback
@@ -102,6 +93,21 @@ def _get_catalog_products() -> List[dict]:
 
 def _filter_products(category: str, page: int, per_page: int = 8) -> tuple[List[dict], int]:
     settings = get_settings()
+    try:
+        catalog_store = CatalogStore.instance(settings.catalog_path)
+        query = catalog_store.query()
+        if category != "all":
+            query = query.category(category, exact=True)
+        result = query.page(page, per_page)
+        summaries = []
+        for product in result.items:
+            projection = catalog_store.projection(product)
+            if projection is not None:
+                summaries.append(projection.summary)
+        return summaries, result.pages
+    except Exception as exc:
+        logger.warning("Catalog query failed, using fallback list: %s", exc)
+
     products_all: List[dict] = []
 
     if selector_available and _selector:
@@ -2,8 +2,11 @@ from __future__ import annotations
 
 import os
 from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import CallbackQuery
 
+from bot.ui.report_cache import file_content_key, get_file_id_store, get_report_cache
+
 try:
     from aiogram.types import FSInputFile
 except ImportError:
@@ -19,6 +22,38 @@ def _user_id(cb: CallbackQuery) -> int | None:
     return None
 
 
+def _report_key(uid: int, path: str) -> str | None:
+    """Хеш содержимого отчета: указатель из кеша отчетов или хеш файла"""
+    try:
+        key = get_report_cache().read_ref(uid, os.path.basename(path))
+        return key or file_content_key(path)
+    except Exception as e:
+        print(f"⚠️ Could not compute report key: {e}")
+        return None
+
+
+async def _send_report_document(cb: CallbackQuery, uid: int, path: str) -> None:
+    """Отправляет PDF по сохраненному file_id, при отказе Telegram - загружает файл"""
+    caption = "📄 Ваш последний отчёт"
+    store = get_file_id_store()
+    key = _report_key(uid, path)
+
+    file_id = store.get(key)
+    if file_id:
+        try:
+            await cb.message.answer_document(document=file_id, caption=caption)
+            return
+        except TelegramBadRequest as e:
+            print(f"⚠️ Cached file_id rejected, re-uploading report: {e}")
+            store.forget(key)
+
+    # Use message.answer_document instead of bot.send_document
+    sent = await cb.message.answer_document(document=FSInputFile(path), caption=caption)
+    document = getattr(sent, "document", None)
+    if key and document is not None and getattr(document, "file_id", None):
+        store.set(key, document.file_id)
+
+
 @router.callback_query(F.data == "report:latest")
 async def send_latest_report(cb: CallbackQuery) -> None:
     try:
@@ -72,10 +107,7 @@ async def send_latest_report(cb: CallbackQuery) -> None:
         # Отправка документа
         if cb.message:
             try:
-                # Use message.answer_document instead of bot.send_document
-                await cb.message.answer_document(
-                    document=FSInputFile(path), caption="📄 Ваш последний отчёт"
-                )
+                await _send_report_document(cb, uid, path)
                 await cb.answer("📄 Отчёт отправлен!")
             except Exception as send_error:
                 print(f"❌ Error sending document: {send_error}")
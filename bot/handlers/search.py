@@ -0,0 +1,65 @@
+"""
+🔍 Product Search Handler
+
+/search <текст> - полнотекстовый поиск по каталогу (бренд, название,
+категория, теги, активы) с кнопками добавления в корзину
+"""
+
+import logging
+import time
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
+
+from config.env import get_settings
+from engine.catalog_store import CatalogStore
+from i18n.ru import BTN_ADD, MSG_SEARCH_EMPTY, MSG_SEARCH_RESULTS, MSG_SEARCH_USAGE
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+SEARCH_RESULTS_LIMIT = 8
+
+
+@router.message(Command("search"))
+async def handle_search(message: Message, command: CommandObject):
+    """Показывает до SEARCH_RESULTS_LIMIT товаров по свободному тексту"""
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer(MSG_SEARCH_USAGE)
+        return
+
+    try:
+        store = CatalogStore.instance(get_settings().catalog_path)
+        started = time.perf_counter()
+        products = store.search(query, limit=SEARCH_RESULTS_LIMIT)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"🔍 /search '{query}': {len(products)} results in {elapsed_ms:.1f} ms")
+    except Exception as e:
+        logger.error(f"Error in /search command: {e}")
+        await message.answer("❌ Поиск временно недоступен.")
+        return
+
+    if not products:
+        await message.answer(MSG_SEARCH_EMPTY.format(query=query))
+        return
+
+    lines = [MSG_SEARCH_RESULTS.format(query=query), ""]
+    keyboard = InlineKeyboardBuilder()
+    for number, product in enumerate(products, 1):
+        price = f"{product.price:.0f} ₽" if product.price else "—"
+        lines.append(f"{number}. {product.brand} {product.title} — {price}")
+        keyboard.row(
+            InlineKeyboardButton(
+                text=f"{BTN_ADD} {number}", callback_data=f"cart:add:{product.key}:default"
+            )
+        )
+    keyboard.row(InlineKeyboardButton(text="🛒 Корзина", callback_data="cart:open"))
+
+    await message.answer("\n".join(lines), reply_markup=keyboard.as_markup())
+
+
+# Export router
+__all__ = ["router"]
@@ -10,6 +10,7 @@ from typing import List, Dict, Tuple
 from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+from bot.utils.lazy import LazyProxy
 
 # Fix imports for engine modules
 try:
@@ -308,11 +309,16 @@ try:
 except:
     affiliate_manager = AffiliateManager()  # fallback
 
-# Инициализация A/B testing framework
-try:
-    ab_framework = get_ab_testing_framework()
-except:
-    ab_framework = ABTestingFramework()  # fallback
+
+# Инициализация A/B testing framework (история назначений читается при первом обращении)
+def _load_ab_framework():
+    try:
+        return get_ab_testing_framework()
+    except:
+        return ABTestingFramework()  # fallback
+
+
+ab_framework = LazyProxy(_load_ab_framework)
 
 # Маппинг категорий на их слаги
 CATEGORY_MAPPING = {
@@ -933,16 +939,26 @@ async def show_out_of_stock_alternatives(cb: CallbackQuery, state: FSMContext) -
             analytics = get_analytics_tracker()
             analytics.track_event("oos_shown", user_id, {"pid": product_id})
 
-        # TODO: Найти альтернативы в той же категории и ценовой группе
-
-        # Заглушка с альтернативными товарами
+        # Замены из индекса каталога (ранжированы при загрузке каталога)
+        catalog_path = os.getenv("CATALOG_PATH", "assets/fixed_catalog.yaml")
+        catalog_store = CatalogStore.instance(catalog_path)
+        index = catalog_store.alternatives() if catalog_store is not None else None
+        base_product = index.get_product(product_id) if index else None
+        found = index.alternatives(product_id, limit=3) if base_product is not None else []
         alternatives = [
-            {"id": "alt_1", "name": "Альтернатива 1", "brand": "Brand A", "price": 2200},
-            {"id": "alt_2", "name": "Альтернатива 2", "brand": "Brand B", "price": 2400},
-            {"id": "alt_3", "name": "Альтернатива 3", "brand": "Brand C", "price": 2100},
+            {
+                "id": alt.product.key,
+                "name": alt.product.title,
+                "brand": alt.product.brand,
+                "price": alt.product.price or 0,
+            }
+            for alt in found
         ]
+        base_category = base_product.category if base_product is not None else "unknown"
 
         text_lines = ["🔄 **Альтернативы для товара**\n"]
+        if not alternatives:
+            text_lines.append("Подходящих замен в наличии сейчас нет.")
         buttons = []
 
         for i, alt in enumerate(alternatives, 1):
@@ -966,7 +982,7 @@ async def show_out_of_stock_alternatives(cb: CallbackQuery, state: FSMContext) -
         await cb.message.edit_text("\n".join(text_lines), reply_markup=kb)
 
         # Аналитика показа альтернатив
-        track_alternatives_shown(user_id, product_id, "unknown", len(alternatives))
+        track_alternatives_shown(user_id, product_id, base_category, len(alternatives))
 
         await cb.answer()
 
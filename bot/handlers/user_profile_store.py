@@ -4,9 +4,10 @@
 
 import json
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 
+from engine.latency import PHASE_STORAGE, timed_phase
 from engine.models import UserProfile
 
 
@@ -16,11 +17,16 @@ class UserProfileStore:
     def __init__(self, storage_path: str = "data/user_profiles"):
         self.storage_path = storage_path
         os.makedirs(storage_path, exist_ok=True)
+        # user_id -> (mtime_ns файла, данные профиля): повторная загрузка без разбора JSON
+        self._cache: Dict[int, Tuple[int, Dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
 
     def _get_profile_path(self, user_id: int) -> str:
         """Получить путь к файлу профиля пользователя"""
         return os.path.join(self.storage_path, f"user_{user_id}.json")
 
+    @timed_phase(PHASE_STORAGE)
     def save_profile(
         self, user_id: int, profile_data: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None
     ) -> bool:
@@ -42,6 +48,7 @@ class UserProfileStore:
             profile_path = self._get_profile_path(user_id)
             with open(profile_path, "w", encoding="utf-8") as f:
                 json.dump(normalized_data, f, ensure_ascii=False, indent=2)
+            self._cache[user_id] = (os.stat(profile_path).st_mtime_ns, normalized_data)
 
             print(f"✅ Profile saved for user {user_id}")
             return True
@@ -50,17 +57,28 @@ class UserProfileStore:
             print(f"❌ Error saving profile for user {user_id}: {e}")
             return False
 
+    @timed_phase(PHASE_STORAGE)
     def load_profile(self, user_id: int) -> Optional[UserProfile]:
         """Загрузить профиль пользователя"""
         try:
             profile_path = self._get_profile_path(user_id)
 
-            if not os.path.exists(profile_path):
+            try:
+                mtime = os.stat(profile_path).st_mtime_ns
+            except FileNotFoundError:
+                self._cache.pop(user_id, None)
                 print(f"⚠️ Profile not found for user {user_id}")
                 return None
 
-            with open(profile_path, "r", encoding="utf-8") as f:
-                profile_data = json.load(f)
+            cached = self._cache.get(user_id)
+            if cached is not None and cached[0] == mtime:
+                self.hits += 1
+                profile_data = cached[1]
+            else:
+                self.misses += 1
+                with open(profile_path, "r", encoding="utf-8") as f:
+                    profile_data = json.load(f)
+                self._cache[user_id] = (mtime, profile_data)
 
             # Создаем профиль из сохраненных данных
             profile = UserProfile(
@@ -79,10 +97,12 @@ class UserProfileStore:
             print(f"❌ Error loading profile for user {user_id}: {e}")
             return None
 
+    @timed_phase(PHASE_STORAGE)
     def delete_profile(self, user_id: int) -> bool:
         """Удалить профиль пользователя"""
         try:
             profile_path = self._get_profile_path(user_id)
+            self._cache.pop(user_id, None)
 
             if os.path.exists(profile_path):
                 os.remove(profile_path)
@@ -95,6 +115,10 @@ class UserProfileStore:
             print(f"❌ Error deleting profile for user {user_id}: {e}")
             return False
 
+    def get_stats(self) -> Dict[str, int]:
+        """Счетчики кеша профилей для мониторинга"""
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
 
 # Глобальный экземпляр хранилища профилей
 _profile_store = None
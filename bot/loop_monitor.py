@@ -0,0 +1,261 @@
+"""
+🐢 Event Loop Lag - задержка event loop и поиск блокирующих вызовов
+
+Фоновая задача засыпает на LOOP_LAG_INTERVAL секунд и измеряет, насколько
+позже она проснулась: если loop занят синхронной работой (разбор YAML,
+рендер PDF, файловый I/O), дрейф растет. Последнее и максимальное
+значения отдает /metrics.
+
+Сама задача во время блокировки ничего не видит, поэтому рядом работает
+сторожевой поток: если loop опоздал с пробуждением больше чем на
+LOOP_LAG_THRESHOLD_MS, поток снимает стек потока loop
+(sys._current_frames) - это и есть блокирующий вызов. Когда loop
+оживает, событие с задержкой, местом вызова и стеком пишется JSON-строкой
+в logs/loop_lag.jsonl (engine/logging_setup.py).
+
+Накладные расходы: одна задача раз в LOOP_LAG_INTERVAL и поток, который
+просыпается раз в половину порога; стек снимается только при зависании.
+
+Строгий режим для тестов - strict_loop_monitor(threshold_ms): по выходе
+бросает BlockingCallError, если loop блокировался дольше порога.
+
+Настройка через переменные окружения:
+    LOOP_LAG_INTERVAL       период проверки, сек (по умолчанию 0.5)
+    LOOP_LAG_THRESHOLD_MS   порог блокировки, мс (по умолчанию 100)
+    LOOP_LAG_STACKS         снимать стеки при блокировке (по умолчанию 1)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from types import FrameType
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from engine.latency import LatencyHistogram
+
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+LOOP_LAG_STACKS = os.getenv("LOOP_LAG_STACKS", "1").lower() in ("1", "true", "yes")
+
+STACK_DEPTH = 20
+EVENT_HISTORY = 50
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+_SKIP_PATHS = tuple(
+    os.path.realpath(p) for p in {sys.prefix, sys.base_prefix, os.path.dirname(os.__file__)} if p
+) + (os.path.realpath(__file__),)
+
+
+class BlockingCallError(AssertionError):
+    """Строгий режим: event loop блокировался дольше порога"""
+
+
+@dataclass
+class BlockingEvent:
+    """Зафиксированная блокировка event loop"""
+
+    lag_ms: float
+    threshold_ms: float
+    call_site: Optional[str] = None
+    stack: List[str] = field(default_factory=list)
+    at: float = field(default_factory=time.time)
+
+    def payload(self) -> Dict[str, Any]:
+        return {"event": "event_loop_blocked", **asdict(self)}
+
+    def describe(self) -> str:
+        return f"{self.lag_ms:.0f} ms at {self.call_site or 'unknown call site'}"
+
+
+def _is_project_frame(frame: FrameType) -> bool:
+    path = os.path.realpath(frame.f_code.co_filename)
+    return path.startswith(PROJECT_ROOT) and not path.startswith(_SKIP_PATHS)
+
+
+def _format_frame(frame: FrameType) -> str:
+    path = os.path.relpath(frame.f_code.co_filename, PROJECT_ROOT)
+    return f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+
+def describe_stack(frame: Optional[FrameType]) -> Tuple[Optional[str], List[str]]:
+    """(место вызова, стек): самый глубокий кадр кода проекта и кадры снаружи внутрь"""
+    frames: List[FrameType] = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    call_site = next((_format_frame(f) for f in frames if _is_project_frame(f)), None)
+    if call_site is None and frames:
+        call_site = _format_frame(frames[0])
+    stack = [_format_frame(f) for f in reversed(frames[:STACK_DEPTH])]
+    return call_site, stack
+
+
+class LoopLagMonitor:
+    """Проверка дрейфа asyncio.sleep в event loop и стеки при блокировке"""
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL,
+        threshold_ms: float = LOOP_LAG_THRESHOLD_MS,
+        sample_stacks: bool = LOOP_LAG_STACKS,
+        strict: bool = False,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.interval = interval
+        self.threshold_ms = threshold_ms
+        self.sample_stacks = sample_stacks
+        self.strict = strict
+        self.logger = logger
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.samples = 0
+        self.blocked = 0
+        self.histogram = LatencyHistogram()
+        self.events: Deque[BlockingEvent] = deque(maxlen=EVENT_HISTORY)
+        self.violations: List[BlockingEvent] = []
+
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        # (номер сна, момент ожидаемого пробуждения) - пишет задача, читает поток
+        self._beat: Tuple[int, float] = (0, 0.0)
+        self._sampled: Optional[Tuple[int, Optional[str], List[str]]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def record(self, lag_ms: float) -> None:
+        lag_ms = max(0.0, lag_ms)
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        self.samples += 1
+        self.histogram.record(lag_ms)
+        if lag_ms >= self.threshold_ms:
+            self._report(lag_ms)
+
+    def _report(self, lag_ms: float) -> None:
+        call_site, stack = None, []
+        sampled = self._sampled
+        if sampled is not None and sampled[0] == self._beat[0]:
+            _, call_site, stack = sampled
+        event = BlockingEvent(lag_ms, self.threshold_ms, call_site, stack)
+        self.blocked += 1
+        self.events.append(event)
+        if self.strict:
+            self.violations.append(event)
+
+        if self.logger is None:
+            from engine.logging_setup import get_loop_lag_logger
+
+            self.logger = get_loop_lag_logger()
+        self.logger.warning(
+            f"🐢 Event loop blocked for {event.describe()}", extra={"payload": event.payload()}
+        )
+
+    async def _probe(self) -> None:
+        beat = 0
+        while True:
+            beat += 1
+            started = time.perf_counter()
+            self._beat = (beat, started + self.interval)
+            await asyncio.sleep(self.interval)
+            self.record((time.perf_counter() - started - self.interval) * 1000)
+
+    def _watch(self) -> None:
+        poll = max(0.005, self.threshold_ms / 2000)
+        while not self._stopped.wait(poll):
+            beat, wake_at = self._beat
+            sampled = self._sampled
+            if sampled is not None and sampled[0] == beat:
+                continue
+            if (time.perf_counter() - wake_at) * 1000 < self.threshold_ms:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            call_site, stack = describe_stack(frame)
+            del frame
+            self._sampled = (beat, call_site, stack)
+
+    def start(self) -> None:
+        """Запустить проверку в текущем event loop (повторный вызов - no-op)"""
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = (0, time.perf_counter() + self.interval)
+        self._task = loop.create_task(self._probe())
+        if self.sample_stacks:
+            self._stopped.clear()
+            self._watchdog = threading.Thread(
+                target=self._watch, name="LoopLagWatchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._stopped.set()
+        watchdog, self._watchdog = self._watchdog, None
+        if watchdog is not None:
+            watchdog.join(timeout=1)
+
+    def check(self) -> None:
+        """Строгий режим: ошибка, если были блокировки дольше порога"""
+        if self.violations:
+            details = "; ".join(event.describe() for event in self.violations)
+            raise BlockingCallError(
+                f"Event loop blocked longer than {self.threshold_ms:.0f} ms: {details}"
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "last_ms": self.last_lag_ms,
+            "max_ms": self.max_lag_ms,
+            "p99_ms": self.histogram.percentile(99),
+            "samples": self.samples,
+            "blocked": self.blocked,
+            "recent": [event.payload() for event in list(self.events)[-5:]],
+        }
+
+
+@asynccontextmanager
+async def strict_loop_monitor(
+    threshold_ms: float, interval: float = 0.01, logger: Optional[logging.Logger] = None
+) -> AsyncIterator[LoopLagMonitor]:
+    """Для тестов: BlockingCallError, если loop блокировался дольше threshold_ms"""
+    monitor = LoopLagMonitor(
+        interval=interval, threshold_ms=threshold_ms, strict=True, logger=logger
+    )
+    monitor.start()
+    try:
+        yield monitor
+        # Дать пробе проснуться после последней блокировки
+        await asyncio.sleep(interval * 2)
+    finally:
+        await monitor.stop()
+    monitor.check()
+
+
+_monitor: Optional[LoopLagMonitor] = None
+
+
+def get_loop_monitor() -> LoopLagMonitor:
+    """Глобальный монитор задержки event loop"""
+    global _monitor
+    if _monitor is None:
+        _monitor = LoopLagMonitor()
+    return _monitor
@@ -9,140 +9,48 @@ print("Starting imports...")
 print(f"Current directory: {os.getcwd()}")
 print(f"Python path: {sys.path[:3]}...")
 
-try:
-    from aiogram import Bot, Dispatcher, F
-
-    print("OK aiogram imported")
-except ImportError as e:
-    print(f"ERROR Failed to import aiogram: {e}")
-    raise
-
-try:
-    from engine.catalog_store import CatalogStore
-
-    print("OK CatalogStore imported")
-except ImportError as e:
-    print(f"ERROR Failed to import CatalogStore: {e}")
-    raise
-
 # Global bot and dispatcher instances for webhook handling
 bot = None
 dp = None
 _handlers_registered = False
 
 
-# Routers
-try:
-    from bot.handlers.start import router as start_router
-
-    print("OK start router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import start router: {e}")
-    raise
-
-try:
-    from bot.handlers.flow_skincare import router as skincare_router
-
-    print("OK skincare router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import skincare router: {e}")
-    raise
-
-try:
-    from bot.handlers.flow_palette import router as palette_router
-
-    print("OK palette router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import palette router: {e}")
-    raise
-
-try:
-    from bot.handlers.skincare_picker import router as skincare_picker_router
-
-    print("OK skincare picker router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import skincare picker router: {e}")
-    raise
-
-try:
-    from bot.handlers.makeup_picker import router as makeup_picker_router
-
-    print("OK makeup picker router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import makeup picker router: {e}")
-    raise
-
-try:
-    from bot.handlers.report import router as report_router
-
-    print("OK report router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import report router: {e}")
-    raise
-
-try:
-    from bot.handlers.report_tabs import router as report_tabs_router
-
-    print("OK report tabs router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import report tabs router: {e}")
-    raise
-
-try:
-    from bot.handlers.universal import router as universal_router
-
-    print("OK universal router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import universal router: {e}")
-    raise
-
-try:
-    from bot.handlers.detailed_palette import router as detailed_palette_router
-
-    print("OK detailed palette router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import detailed palette router: {e}")
-    raise
-
-try:
-    from bot.handlers.detailed_skincare import router as detailed_skincare_router
-
-    print("OK detailed skincare router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import detailed skincare router: {e}")
-    raise
-
-try:
-    from bot.handlers.anti_pin_guard import router as anti_pin_guard_router
-
-    print("OK anti-pin guard router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import anti-pin guard router: {e}")
-    raise
-
-try:
-    from bot.handlers.admin import router as admin_router
-
-    print("OK admin router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import admin router: {e}")
-    raise
-
-try:
-    from bot.handlers.cart_v2 import router as cart_v2_router
-
-    print("OK cart v2 router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import cart v2 router: {e}")
-    raise
-
-try:
-    from bot.handlers.recommendations import router as recommendations_router
-
-    print("OK recommendations router imported")
-except ImportError as e:
-    print(f"ERROR Failed to import recommendations router: {e}")
-    raise
+# Routers in registration order: (module, name for logs). Modules are imported
+# on registration, not at import of bot.main - handlers pull in aiogram types,
+# engine models and catalog/selector code (see tests/test_import_budget.py).
+ROUTER_MODULES = (
+    ("bot.handlers.anti_pin_guard", "anti-pin guard"),
+    ("bot.handlers.admin", "admin"),
+    ("bot.handlers.search", "search"),
+    ("bot.handlers.cart_v2", "cart v2"),
+    ("bot.handlers.recommendations", "recommendations"),
+    ("bot.handlers.start", "start"),
+    ("bot.handlers.detailed_palette", "detailed palette"),
+    ("bot.handlers.detailed_skincare", "detailed skincare"),
+    ("bot.handlers.skincare_picker", "skincare picker"),
+    ("bot.handlers.makeup_picker", "makeup picker"),
+    ("bot.handlers.flow_skincare", "skincare"),
+    ("bot.handlers.flow_palette", "palette"),
+    ("bot.handlers.report", "report"),
+    ("bot.handlers.report_tabs", "report tabs"),
+    ("bot.handlers.universal", "universal"),
+)
+
+
+def load_routers() -> list:
+    """Import handler modules and return their routers (order preserved)."""
+    import importlib
+
+    routers = []
+    for module_name, label in ROUTER_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+            print(f"OK {label} router imported")
+        except ImportError as e:
+            print(f"ERROR Failed to import {label} router: {e}")
+            raise
+        routers.append(module.router)
+    return routers
 
 
 CATALOG_PATH = os.getenv("CATALOG_PATH", "assets/fixed_catalog.yaml")
@@ -153,20 +61,24 @@ def _ensure_routers_registered() -> None:
     global _handlers_registered, dp
     if dp is None or _handlers_registered:
         return
-    dp.include_router(anti_pin_guard_router)
-    dp.include_router(admin_router)
-    dp.include_router(cart_v2_router)
-    dp.include_router(recommendations_router)
-    dp.include_router(start_router)
-    dp.include_router(detailed_palette_router)
-    dp.include_router(detailed_skincare_router)
-    dp.include_router(skincare_picker_router)
-    dp.include_router(makeup_picker_router)
-    dp.include_router(skincare_router)
-    dp.include_router(palette_router)
-    dp.include_router(report_router)
-    dp.include_router(report_tabs_router)
-    dp.include_router(universal_router)
+    # Per-update latency histograms (see bot/middlewares/latency.py)
+    from bot.middlewares.latency import install_latency_middleware
+
+    install_latency_middleware(dp, bot)
+
+    # Double taps share one run; tap storms on view screens keep the latest
+    from bot.middlewares.callback_coalescing import CALLBACK_COALESCING, get_callback_coalescing
+
+    if CALLBACK_COALESCING:
+        dp.callback_query.outer_middleware(get_callback_coalescing())
+
+    # Concurrency cap, per-user FIFO and priorities (after coalescing on purpose)
+    from bot.middlewares.update_scheduler import UPDATE_SCHEDULER, install_update_scheduler
+
+    if UPDATE_SCHEDULER:
+        install_update_scheduler(dp)
+    for router in load_routers():
+        dp.include_router(router)
     _handlers_registered = True
 
 
@@ -199,6 +111,21 @@ def get_bot_and_dispatcher():
     return bot, dp
 
 
+async def _shutdown_services() -> None:
+    """Stop background services started by handlers (PDF pool, A/B writer)."""
+    from engine.ab_testing import shutdown_ab_testing_framework
+    from bot.loop_monitor import get_loop_monitor
+    from bot.middlewares.update_scheduler import get_update_scheduler
+    from bot.ui.report_service import get_report_service
+    from bot.utils.outbound import get_outbound_dispatcher
+
+    await get_update_scheduler().stop()
+    await get_loop_monitor().stop()
+    await get_outbound_dispatcher().stop()
+    await get_report_service().shutdown()
+    await asyncio.to_thread(shutdown_ab_testing_framework)
+
+
 async def main() -> None:
     print("🤖 Bot main() started")
     print(f"📊 BOT_TOKEN: {os.getenv('BOT_TOKEN', 'NOT_SET')[:15]}...")
@@ -273,12 +200,55 @@ async def main() -> None:
     # Register routers (order preserved)
     _ensure_routers_registered()
 
+    # SIGHUP re-reads cached settings (same as /reload_settings)
+    try:
+        import signal
+        from config.env import reload_settings
+
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_settings)
+        print("✅ SIGHUP settings reload handler installed")
+    except (AttributeError, NotImplementedError, RuntimeError) as e:
+        print(f"⚠️ SIGHUP handler not installed: {e}")
+
+    # Event-loop lag probe for /metrics (see bot/loop_monitor.py)
+    from bot.loop_monitor import get_loop_monitor
+
+    get_loop_monitor().start()
+
+    # Rate-limited outbound queue for every send/edit call of the bot session
+    from bot.utils.outbound import OUTBOUND_QUEUE, install_outbound_queue
+
+    if OUTBOUND_QUEUE:
+        install_outbound_queue(bot)
+        print("✅ Outbound send queue started")
+
+    # Update handling slots (see bot/middlewares/update_scheduler.py)
+    from bot.middlewares.update_scheduler import UPDATE_SCHEDULER, get_update_scheduler
+
+    if UPDATE_SCHEDULER:
+        get_update_scheduler().start()
+        print("✅ Update scheduler started")
+
+    # Catalog, rules, fonts, A/B assignments, carts and report cache GC run
+    # concurrently before updates are accepted (see bot/warmup.py)
+    from bot.warmup import run_warmup
+
     # Webhook disabled by default; enable only if explicitly set
     use_webhook = os.getenv("USE_WEBHOOK", "0").lower() in ("1", "true", "yes")
     if use_webhook:
-        print("🌐 Webhook mode active - do not start polling")
+        print("🌐 Webhook mode active - serving updates via aiohttp")
+        from config.env import get_settings
+        from bot.webhook import run_webhook
+
+        try:
+            # /health answers 503 until the warm-up below marks the process ready
+            await run_webhook(bot, dp, get_settings().telegram, warmup=run_warmup)
+        finally:
+            await _shutdown_services()
         return
 
+    await run_warmup()
+
     # Ensure webhook is removed before polling to avoid conflicts
     try:
         await bot.delete_webhook(drop_pending_updates=True)
@@ -304,13 +274,16 @@ async def main() -> None:
 
     # Start polling for production
     print("📡 Starting polling (Render)")
-    await dp.start_polling(
-        bot,
-        skip_updates=True,
-        handle_signals=False,
-        timeout=20,
-        retry_after=3,
-    )
+    try:
+        await dp.start_polling(
+            bot,
+            skip_updates=True,
+            handle_signals=False,
+            timeout=20,
+            retry_after=3,
+        )
+    finally:
+        await _shutdown_services()
 
 
 if __name__ == "__main__":
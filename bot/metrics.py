@@ -0,0 +1,363 @@
+"""
+📈 Prometheus Metrics - /metrics в текстовом формате exposition 0.0.4
+
+render_metrics() собирает снимок процесса без внешних зависимостей:
+- обновления и гистограммы задержек (engine/latency.py);
+- задержка event loop (bot/loop_monitor.py);
+- глубина очередей: запись аналитики A/B, генерация PDF, исходящие вызовы,
+  слоты планировщика обновлений и отказы в приеме;
+- доля попаданий кешей: каталог, проекции селектора, профили, PDF, URL;
+- размер каталога и число перезагрузок;
+- активные FSM-сессии и RSS процесса (psutil).
+
+Каждый источник читается отдельно: ошибка одного не ломает ответ.
+Отдается aiohttp-сервером (bot/webhook.py) и Flask-приложениями
+render_app.py / start.py.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from engine.latency import PHASE_HANDLER, LatencyHistogram, get_latency_registry
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil есть в requirements
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "skin_advisor_"
+
+# Границы бакетов гистограммы задержек, мс
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+Sample = Tuple[str, Dict[str, str], float]  # (суффикс имени, метки, значение)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Exposition:
+    """Построитель текста exposition: HELP/TYPE, затем сэмплы семейства"""
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str, samples: Iterable[Sample]) -> None:
+        samples = list(samples)
+        if not samples:
+            return
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            series = f"{name}{suffix}{{{label_text}}}" if label_text else f"{name}{suffix}"
+            self.lines.append(f"{series} {_format_value(value)}")
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _histogram_samples(labels: Dict[str, str], histogram: LatencyHistogram) -> List[Sample]:
+    """Бакеты (в секундах), _sum и _count гистограммы задержек"""
+    samples: List[Sample] = []
+    for bound, count in zip(LATENCY_BUCKETS_MS, histogram.cumulative(LATENCY_BUCKETS_MS)):
+        samples.append(("_bucket", {**labels, "le": _format_value(bound / 1000)}, count))
+    samples.append(("_bucket", {**labels, "le": "+Inf"}, histogram.count))
+    samples.append(("_sum", labels, histogram.sum_ms / 1000))
+    samples.append(("_count", labels, histogram.count))
+    return samples
+
+
+# ------------------------------------------------------------- collectors
+
+
+def _collect_updates(out: Exposition) -> None:
+    items = get_latency_registry().items()
+    out.family(
+        PREFIX + "updates_total",
+        "counter",
+        "Processed Telegram updates by handler module and callback prefix.",
+        [
+            ("", {"router": router, "prefix": prefix}, histogram.count)
+            for (router, prefix, phase), histogram in items
+            if phase == PHASE_HANDLER
+        ],
+    )
+
+    samples: List[Sample] = []
+    for (router, prefix, phase), histogram in items:
+        labels = {"router": router, "prefix": prefix, "phase": phase}
+        samples.extend(_histogram_samples(labels, histogram))
+    out.family(
+        PREFIX + "update_latency_seconds",
+        "histogram",
+        "Update handling time and its selector/storage/telegram_api phases.",
+        samples,
+    )
+
+
+def _collect_loop_lag(out: Exposition) -> None:
+    from bot.loop_monitor import get_loop_monitor
+
+    monitor = get_loop_monitor()
+    if not monitor.samples:
+        return
+    out.family(
+        PREFIX + "event_loop_lag_seconds",
+        "gauge",
+        "Latest asyncio sleep drift of the bot event loop.",
+        [("", {}, monitor.last_lag_ms / 1000)],
+    )
+    out.family(
+        PREFIX + "event_loop_lag_max_seconds",
+        "gauge",
+        "Maximum asyncio sleep drift since start.",
+        [("", {}, monitor.max_lag_ms / 1000)],
+    )
+    out.family(
+        PREFIX + "event_loop_blocked_total",
+        "counter",
+        "Event loop stalls longer than the blocking threshold.",
+        [("", {}, monitor.blocked)],
+    )
+
+
+def _collect_queues(out: Exposition) -> None:
+    from bot.ui.report_service import get_report_service
+    from engine import ab_testing
+
+    pdf = get_report_service().get_stats()
+    depths: List[Sample] = [("", {"queue": "pdf_jobs"}, pdf["queued"])]
+    # A/B framework не создаем ради метрик: он читает историю с диска
+    framework = ab_testing._ab_framework
+    if framework is not None:
+        depths.append(("", {"queue": "analytics_writer"}, framework.conversion_writer.pending))
+    out.family(PREFIX + "queue_depth", "gauge", "Items waiting in background queues.", depths)
+    out.family(
+        PREFIX + "pdf_jobs_running",
+        "gauge",
+        "PDF reports being rendered right now.",
+        # включая задачи с истекшим таймаутом, которые еще занимают воркер пула
+        [("", {}, pdf["running"] + pdf["overrunning"])],
+    )
+    out.family(
+        PREFIX + "pdf_jobs_total",
+        "counter",
+        "Finished PDF render jobs by outcome.",
+        [
+            ("", {"status": status}, pdf[status])
+            for status in ("completed", "failed", "timed_out", "rejected")
+        ],
+    )
+
+
+def _collect_outbound(out: Exposition) -> None:
+    from bot.utils.outbound import get_outbound_dispatcher
+
+    stats = get_outbound_dispatcher().snapshot()
+    out.family(
+        PREFIX + "outbound_queue_depth",
+        "gauge",
+        "Bot API calls waiting in the outbound queue.",
+        [("", {}, stats["pending"])],
+    )
+    out.family(
+        PREFIX + "outbound_total",
+        "counter",
+        "Outbound Bot API calls by result (merged/dropped edits never reach Telegram).",
+        [
+            ("", {"result": result}, stats[result])
+            for result in ("sent", "edited", "merged", "dropped", "retried", "failed")
+        ],
+    )
+
+
+def _collect_callbacks(out: Exposition) -> None:
+    from bot.middlewares.callback_coalescing import get_callback_coalescing
+
+    stats = get_callback_coalescing().snapshot()
+    out.family(
+        PREFIX + "callbacks_total",
+        "counter",
+        "Callback queries by coalescing outcome (shared/superseded skipped the handler).",
+        [
+            ("", {"result": result}, stats[result])
+            for result in ("executed", "shared", "superseded", "cancelled")
+        ],
+    )
+
+
+def _collect_scheduler(out: Exposition) -> None:
+    from bot.middlewares.update_scheduler import get_update_scheduler
+
+    scheduler = get_update_scheduler()
+    stats = scheduler.snapshot()
+    out.family(
+        PREFIX + "update_queue_depth",
+        "gauge",
+        "Updates and background jobs waiting for a scheduler slot.",
+        [("", {"priority": name}, n) for name, n in stats["pending"].items()],
+    )
+    out.family(
+        PREFIX + "update_slots_busy",
+        "gauge",
+        "Scheduler slots in use by priority.",
+        [("", {"priority": name}, n) for name, n in stats["running"].items()],
+    )
+    out.family(
+        PREFIX + "update_user_lanes",
+        "gauge",
+        "Users with an update running or queued.",
+        [("", {}, stats["lanes"])],
+    )
+    out.family(
+        PREFIX + "updates_shed_total",
+        "counter",
+        "Updates rejected by admission control.",
+        [
+            ("", {"reason": reason}, stats[f"shed_{reason}"])
+            for reason in ("queue_full", "user_backlog")
+        ],
+    )
+
+    samples: List[Sample] = []
+    for priority, histogram in scheduler.wait_histogram_snapshot().items():
+        samples.extend(_histogram_samples({"priority": priority.name.lower()}, histogram))
+    out.family(
+        PREFIX + "update_queue_wait_seconds",
+        "histogram",
+        "Time from admission to getting a scheduler slot.",
+        samples,
+    )
+
+
+def _cache_stats() -> Dict[str, Tuple[int, int]]:
+    """cache -> (hits, misses)"""
+    from bot.handlers.user_profile_store import get_user_profile_store
+    from bot.ui.report_cache import get_report_cache
+    from engine.catalog_store import CatalogStore
+    from engine.url_intel import get_url_intel
+
+    stats: Dict[str, Tuple[int, int]] = {}
+    store = CatalogStore._instance
+    if store is not None:
+        catalog = store.get_stats()
+        stats["catalog"] = (catalog["hits"], catalog["reloads"])
+        stats["selector_projection"] = (catalog["projection_hits"], catalog["projection_misses"])
+    profiles = get_user_profile_store().get_stats()
+    stats["profile"] = (profiles["hits"], profiles["misses"])
+    # Попадания из воркеров пула процессов добавляет ReportRenderService._finish
+    reports = get_report_cache()
+    stats["report_pdf"] = (reports.hits, reports.misses)
+    for namespace, entry in get_url_intel().get_stats().items():
+        stats[f"url_{namespace}"] = (entry["hits"], entry["misses"])
+    return stats
+
+
+def _collect_caches(out: Exposition) -> None:
+    stats = _cache_stats()
+    out.family(
+        PREFIX + "cache_hits_total",
+        "counter",
+        "Cache hits.",
+        [("", {"cache": name}, hits) for name, (hits, _) in stats.items()],
+    )
+    out.family(
+        PREFIX + "cache_misses_total",
+        "counter",
+        "Cache misses.",
+        [("", {"cache": name}, misses) for name, (_, misses) in stats.items()],
+    )
+    out.family(
+        PREFIX + "cache_hit_ratio",
+        "gauge",
+        "Cache hits / (hits + misses) since start.",
+        [
+            ("", {"cache": name}, hits / (hits + misses))
+            for name, (hits, misses) in stats.items()
+            if hits + misses
+        ],
+    )
+
+
+def _collect_catalog(out: Exposition) -> None:
+    from engine.catalog_store import CatalogStore
+
+    store = CatalogStore._instance
+    if store is None:
+        return
+    stats = store.get_stats()
+    out.family(
+        PREFIX + "catalog_products",
+        "gauge",
+        "Products in the loaded catalog.",
+        [("", {}, stats["products"])],
+    )
+    out.family(
+        PREFIX + "catalog_reloads_total",
+        "counter",
+        "Catalog loads from disk (initial load included).",
+        [("", {}, stats["reloads"])],
+    )
+
+
+def _collect_fsm(out: Exposition) -> None:
+    from bot.handlers.fsm_coordinator import get_fsm_coordinator
+
+    out.family(
+        PREFIX + "fsm_active_sessions",
+        "gauge",
+        "Active questionnaire sessions.",
+        [("", {}, get_fsm_coordinator().get_active_sessions_count())],
+    )
+
+
+def _collect_process(out: Exposition) -> None:
+    if psutil is None:
+        return
+    out.family(
+        "process_resident_memory_bytes",
+        "gauge",
+        "Resident memory size in bytes.",
+        [("", {}, psutil.Process().memory_info().rss)],
+    )
+
+
+COLLECTORS: Tuple[Callable[[Exposition], None], ...] = (
+    _collect_updates,
+    _collect_loop_lag,
+    _collect_queues,
+    _collect_outbound,
+    _collect_callbacks,
+    _collect_scheduler,
+    _collect_caches,
+    _collect_catalog,
+    _collect_fsm,
+    _collect_process,
+)
+
+
+def render_metrics(collectors: Optional[Iterable[Callable[[Exposition], None]]] = None) -> str:
+    """Текст для ответа на GET /metrics"""
+    out = Exposition()
+    for collect in COLLECTORS if collectors is None else collectors:
+        try:
+            collect(out)
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"⚠️ Metrics collector {collect.__name__} failed: {e}")
+    return out.render()
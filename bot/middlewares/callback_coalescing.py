@@ -0,0 +1,201 @@
+"""
+🧲 Callback Coalescing - singleflight и debounce нажатий inline-кнопок
+
+Двойное нажатие или серия нажатий запускают полный обработчик каждый раз:
+загрузка профиля, подбор (select_products_v2), рендер и правка сообщения.
+Outer middleware на dp.callback_query убирает лишнюю работу:
+
+- singleflight: такой же callback (пользователь + data), который еще
+  выполняется, не запускается повторно - он ждет результат первого;
+- debounce для экранов-представлений (вкладки отчета, страницы подбора,
+  карточки): серия нажатий одного действия пользователя в пределах
+  CALLBACK_DEBOUNCE_MS сводится к последнему - первое нажатие выполняется
+  сразу, следующие ждут тишины, а вытесненная работа отменяется;
+- изменяющие действия (cart:inc, cart:add ...) выполняются на каждое
+  нажатие: их дешевая часть - запись в корзину, а правки сообщения
+  склеивает исходящая очередь (bot/utils/outbound.py).
+
+Пропущенные нажатия подтверждаются callback.answer(), чтобы у клиента не
+висели часики; итоговый экран не меняется.
+
+Настройка через переменные окружения:
+    CALLBACK_COALESCING           включить middleware (по умолчанию 1)
+    CALLBACK_DEBOUNCE_MS          окно debounce, мс (300; 0 - выключить)
+    CALLBACK_DEBOUNCE_PREFIXES    префиксы экранов-представлений через запятую
+    CALLBACK_MUTATING_PREFIXES    префиксы изменяющих действий через запятую
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject
+
+
+def _prefixes(raw: str) -> Tuple[str, ...]:
+    return tuple(p.strip() for p in raw.split(",") if p.strip())
+
+
+CALLBACK_COALESCING = os.getenv("CALLBACK_COALESCING", "1").lower() in ("1", "true", "yes")
+CALLBACK_DEBOUNCE_MS = float(os.getenv("CALLBACK_DEBOUNCE_MS", "300"))
+CALLBACK_DEBOUNCE_PREFIXES = _prefixes(
+    os.getenv(
+        "CALLBACK_DEBOUNCE_PREFIXES",
+        "report_tab:,rec:more:,m:cat:,c:cat:,m:prd:,c:prd:,pl:nav:,skincare_result:",
+    )
+)
+CALLBACK_MUTATING_PREFIXES = _prefixes(
+    os.getenv(
+        "CALLBACK_MUTATING_PREFIXES",
+        "cart:inc:,cart:dec:,cart:add:,cart:undo,m:add:,c:add:",
+    )
+)
+
+Handler = Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class CoalescingStats:
+    """Счетчики: выполнено, разделено с выполняющимся, вытеснено, отменено"""
+
+    executed: int = 0
+    shared: int = 0
+    superseded: int = 0
+    cancelled: int = 0
+
+
+@dataclass
+class _Slot:
+    """Последнее нажатие действия пользователя (для debounce)"""
+
+    generation: int
+    tapped_at: float
+    task: Optional[asyncio.Task] = None
+
+
+class CallbackCoalescingMiddleware(BaseMiddleware):
+    """Singleflight одинаковых callback и debounce экранов-представлений"""
+
+    def __init__(
+        self,
+        debounce_ms: float = CALLBACK_DEBOUNCE_MS,
+        debounce_prefixes: Tuple[str, ...] = CALLBACK_DEBOUNCE_PREFIXES,
+        mutating_prefixes: Tuple[str, ...] = CALLBACK_MUTATING_PREFIXES,
+    ):
+        self.debounce = debounce_ms / 1000
+        self.debounce_prefixes = debounce_prefixes
+        self.mutating_prefixes = mutating_prefixes
+        self.stats = CoalescingStats()
+        self._inflight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._slots: Dict[Tuple[int, str], _Slot] = {}
+
+    def debounce_action(self, data: str) -> Optional[str]:
+        """Действие для debounce (совпавший префикс) или None"""
+        if self.debounce <= 0:
+            return None
+        return next((p for p in self.debounce_prefixes if data.startswith(p)), None)
+
+    def is_mutating(self, data: str) -> bool:
+        return data.startswith(self.mutating_prefixes)
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        if not isinstance(event, CallbackQuery) or event.from_user is None:
+            return await handler(event, data)
+
+        payload = event.data or ""
+        action = self.debounce_action(payload)
+        if action is not None:
+            return await self._debounced(handler, event, data, (event.from_user.id, action))
+        if self.is_mutating(payload):
+            self.stats.executed += 1
+            return await handler(event, data)
+        return await self._single_flight(handler, event, data, (event.from_user.id, payload))
+
+    async def _single_flight(
+        self, handler: Handler, event: CallbackQuery, data: Dict[str, Any], key: Tuple[int, str]
+    ) -> Any:
+        leader = self._inflight.get(key)
+        if leader is not None:
+            self.stats.shared += 1
+            result = await asyncio.shield(leader)
+            await _answer(event)
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.stats.executed += 1
+        result = None
+        try:
+            result = await handler(event, data)
+            return result
+        finally:
+            # Ошибку получает только первый вызов, ожидающие - None
+            future.set_result(result)
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _debounced(
+        self, handler: Handler, event: CallbackQuery, data: Dict[str, Any], key: Tuple[int, str]
+    ) -> Any:
+        now = time.monotonic()
+        previous = self._slots.get(key)
+        slot = _Slot(generation=(previous.generation + 1) if previous else 1, tapped_at=now)
+        self._slots[key] = slot
+
+        if previous is not None and now - previous.tapped_at < self.debounce:
+            # Серия нажатий: предыдущее вытеснено, ждем тишины
+            if previous.task is not None and not previous.task.done():
+                previous.task.cancel()
+                self.stats.cancelled += 1
+            await asyncio.sleep(self.debounce)
+            if self._slots.get(key) is not slot:
+                self.stats.superseded += 1
+                await _answer(event)
+                return None
+
+        slot.task = asyncio.ensure_future(handler(event, data))
+        self.stats.executed += 1
+        try:
+            return await slot.task
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            if self._slots.get(key) is slot or (current is not None and current.cancelling()):
+                raise
+            # Отменено более поздним нажатием - не ошибка
+            await _answer(event)
+            return None
+        finally:
+            # Время нажатия хранится до конца окна: быстрый обработчик не
+            # должен сбрасывать debounce для следующего нажатия
+            if self._slots.get(key) is slot:
+                asyncio.get_running_loop().call_later(self.debounce, self._expire, key, slot)
+
+    def _expire(self, key: Tuple[int, str], slot: _Slot) -> None:
+        if self._slots.get(key) is slot:
+            del self._slots[key]
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**asdict(self.stats), "inflight": len(self._inflight)}
+
+
+async def _answer(event: CallbackQuery) -> None:
+    try:
+        await event.answer()
+    except Exception:  # noqa: BLE001 - уже отвечен или бот не привязан
+        pass
+
+
+_middleware: Optional[CallbackCoalescingMiddleware] = None
+
+
+def get_callback_coalescing() -> CallbackCoalescingMiddleware:
+    """Глобальный экземпляр middleware (статистика для /metrics)"""
+    global _middleware
+    if _middleware is None:
+        _middleware = CallbackCoalescingMiddleware()
+    return _middleware
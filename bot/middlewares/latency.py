@@ -0,0 +1,148 @@
+"""
+⏱️ Latency Middleware - время обработки каждого обновления Telegram
+
+Три звена, устанавливаются install_latency_middleware(dp, bot) из
+_ensure_routers_registered:
+
+- UpdateLatencyMiddleware (outer, dp.update) - открывает трассировку,
+  определяет префикс (callback "cart:", команда "/start", "text" ...) и
+  после обработки пишет в гистограммы полное время ("handler") и фазы;
+- HandlerRouterMiddleware (inner, все события) - запоминает, обработчик
+  какого модуля сработал (метка router: cart_v2, skincare_picker ...);
+- TelegramApiLatencyMiddleware (сессия бота) - время ожидания запросов
+  к Bot API (фаза "telegram_api").
+
+Фазы "selector" и "storage" отмечает код движка (engine/latency.py).
+Перцентили отдает /latency (админ) и GET /metrics/latency (webhook).
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject, Update
+
+from engine.latency import (
+    PHASE_HANDLER,
+    PHASE_TELEGRAM_API,
+    current_trace,
+    get_latency_registry,
+    phase,
+    trace_update,
+)
+
+MAX_PREFIX_LENGTH = 32
+
+
+def update_prefix(update: Update) -> str:
+    """Метка обновления: префикс callback_data, команда или тип события"""
+    callback = update.callback_query
+    if callback is not None:
+        data = callback.data or ""
+        head, sep, _ = data.partition(":")
+        return (head + sep)[:MAX_PREFIX_LENGTH] or "callback"
+
+    message = update.message or update.edited_message
+    if message is not None:
+        text = message.text or ""
+        if text.startswith("/"):
+            return text.split(maxsplit=1)[0].split("@", 1)[0][:MAX_PREFIX_LENGTH]
+        return "text" if text else (message.content_type or "message")
+
+    return update.event_type
+
+
+def handler_router_name(handler: Any) -> Optional[str]:
+    """Короткое имя модуля обработчика (bot.handlers.cart_v2 -> cart_v2)"""
+    callback = getattr(handler, "callback", None)
+    module = getattr(callback, "__module__", None)
+    return module.rsplit(".", 1)[-1] if module else None
+
+
+class UpdateLatencyMiddleware(BaseMiddleware):
+    """Outer middleware: полное время обновления и его фазы в гистограммы"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+
+        with trace_update(update_prefix(event)) as trace:
+            started = time.perf_counter()
+            try:
+                return await handler(event, data)
+            finally:
+                total_ms = (time.perf_counter() - started) * 1000
+                registry = get_latency_registry()
+                registry.record(trace.router, trace.prefix, PHASE_HANDLER, total_ms)
+                for name, ms in trace.phases.items():
+                    registry.record(trace.router, trace.prefix, name, ms)
+
+
+class HandlerRouterMiddleware(BaseMiddleware):
+    """Inner middleware: отмечает модуль сработавшего обработчика"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        trace = current_trace()
+        name = handler_router_name(data.get("handler"))
+        if trace is not None and name:
+            trace.router = name
+        return await handler(event, data)
+
+
+class TelegramApiLatencyMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: время ожидания ответа Bot API"""
+
+    async def __call__(self, make_request, bot: Bot, method):
+        with phase(PHASE_TELEGRAM_API):
+            return await make_request(bot, method)
+
+
+def install_latency_middleware(dp: Dispatcher, bot: Optional[Bot] = None) -> None:
+    """Подключить замер задержек к диспетчеру (и к сессии бота, если передан)"""
+    dp.update.outer_middleware(UpdateLatencyMiddleware())
+    # Inner middleware диспетчера наследуются всеми вложенными роутерами
+    router_middleware = HandlerRouterMiddleware()
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(router_middleware)
+    if bot is not None:
+        bot.session.middleware(TelegramApiLatencyMiddleware())
+
+
+def format_latency_report(rows: List[Dict[str, Any]], limit: int = 15) -> str:
+    """Текстовая таблица перцентилей (по строке на router/prefix, фазы ниже)"""
+    handler_rows = [row for row in rows if row["phase"] == PHASE_HANDLER][:limit]
+    if not handler_rows:
+        return "Нет данных: обновления еще не обрабатывались."
+
+    phases: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in rows:
+        if row["phase"] != PHASE_HANDLER:
+            phases.setdefault((row["router"], row["prefix"]), []).append(row)
+
+    lines = ["router/prefix            n     p50     p95     p99  (ms)"]
+    for row in handler_rows:
+        label = f"{row['router']} {row['prefix']}"[:22]
+        lines.append(
+            f"{label:<22} {row['count']:>5} {row['p50']:>7.1f}"
+            f" {row['p95']:>7.1f} {row['p99']:>7.1f}"
+        )
+        for sub in phases.get((row["router"], row["prefix"]), []):
+            lines.append(
+                f"  · {sub['phase']:<18} {sub['count']:>5} {sub['p50']:>7.1f}"
+                f" {sub['p95']:>7.1f} {sub['p99']:>7.1f}"
+            )
+    return "\n".join(lines)
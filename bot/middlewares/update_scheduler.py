@@ -0,0 +1,379 @@
+"""
+🚦 Update Scheduler - ограниченная параллельность обработки обновлений
+
+aiogram запускает каждое обновление отдельной задачей без ограничения, и
+два обновления одного пользователя могут выполняться одновременно (серия
+нажатий +/− в корзине гоняется за одним файлом корзины). UpdateScheduler -
+outer middleware на событиях dp, который пропускает обработчик только
+после получения слота:
+
+- глобальный лимит: одновременно не больше UPDATE_MAX_CONCURRENCY
+  обработчиков;
+- порядок пользователя: у каждого пользователя своя FIFO-очередь (lane),
+  его следующее обновление стартует только после завершения предыдущего;
+- приоритет: свободный слот получает сначала callback-кнопки и другие
+  запросы, которые ждет клиент (INTERACTIVE), затем сообщения (NORMAL),
+  затем служебные обновления и фоновые задачи (BACKGROUND: генерация PDF
+  через slot(), my_chat_member ...), фоновым - не больше
+  UPDATE_BACKGROUND_SHARE слотов;
+- допуск: в ожидании не больше UPDATE_MAX_PENDING обновлений, причем
+  BACKGROUND принимается до половины очереди, NORMAL - до 90%, так что при
+  всплеске первыми отбрасываются менее важные; у одного пользователя в
+  ожидании не больше UPDATE_USER_MAX_PENDING. Отброшенный callback
+  подтверждается коротким ответом "бот перегружен".
+
+Middleware ставится после CallbackCoalescingMiddleware: одинаковые и
+вытесненные нажатия отсеиваются до постановки в очередь. Время ожидания
+слота попадает в фазу "queue" гистограмм задержек (engine/latency.py).
+
+Настройка через переменные окружения:
+    UPDATE_SCHEDULER            включить планировщик (по умолчанию 1)
+    UPDATE_MAX_CONCURRENCY      параллельная обработка (32)
+    UPDATE_MAX_PENDING          максимум обновлений в ожидании (1000)
+    UPDATE_USER_MAX_PENDING     максимум в ожидании у одного пользователя (20)
+    UPDATE_BACKGROUND_SHARE     доля слотов для фоновых задач (0.25)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import (
+    CallbackQuery,
+    InlineQuery,
+    Message,
+    PreCheckoutQuery,
+    ShippingQuery,
+    TelegramObject,
+)
+
+from engine.latency import PHASE_QUEUE, LatencyHistogram, phase
+
+logger = logging.getLogger(__name__)
+
+UPDATE_SCHEDULER = os.getenv("UPDATE_SCHEDULER", "1").lower() in ("1", "true", "yes")
+UPDATE_MAX_CONCURRENCY = int(os.getenv("UPDATE_MAX_CONCURRENCY", "32"))
+UPDATE_MAX_PENDING = int(os.getenv("UPDATE_MAX_PENDING", "1000"))
+UPDATE_USER_MAX_PENDING = int(os.getenv("UPDATE_USER_MAX_PENDING", "20"))
+UPDATE_BACKGROUND_SHARE = float(os.getenv("UPDATE_BACKGROUND_SHARE", "0.25"))
+
+MSG_OVERLOADED = "⏳ Бот сейчас перегружен, нажмите еще раз через пару секунд"
+
+Handler = Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]]
+
+
+class Priority(IntEnum):
+    """Класс обновления: меньше значение - раньше получает слот"""
+
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+# Доля UPDATE_MAX_PENDING, до которой принимаются обновления класса
+ADMISSION_SHARE = {Priority.INTERACTIVE: 1.0, Priority.NORMAL: 0.9, Priority.BACKGROUND: 0.5}
+
+INTERACTIVE_EVENTS = (CallbackQuery, InlineQuery, PreCheckoutQuery, ShippingQuery)
+
+SHED_QUEUE_FULL = "queue_full"
+SHED_USER_BACKLOG = "user_backlog"
+
+
+def event_priority(event: TelegramObject) -> Priority:
+    """Приоритет события: ответа ждет клиент, сообщение или служебное"""
+    if isinstance(event, INTERACTIVE_EVENTS):
+        return Priority.INTERACTIVE
+    if isinstance(event, Message):
+        return Priority.NORMAL
+    return Priority.BACKGROUND
+
+
+def lane_key(data: Dict[str, Any]) -> Optional[int]:
+    """Очередь порядка: пользователь, иначе чат, иначе без упорядочивания"""
+    user = data.get("event_from_user")
+    if user is not None:
+        return user.id
+    chat = data.get("event_chat")
+    return chat.id if chat is not None else None
+
+
+@dataclass
+class SchedulerStats:
+    """Счетчики планировщика"""
+
+    admitted: int = 0
+    completed: int = 0
+    shed_queue_full: int = 0
+    shed_user_backlog: int = 0
+
+
+@dataclass(eq=False)
+class _Ticket:
+    priority: Priority
+    lane: Optional[int]
+    future: asyncio.Future
+    enqueued_at: float
+    started: bool = False
+
+
+class UpdateScheduler(BaseMiddleware):
+    """Слоты обработки: глобальный лимит, FIFO пользователя, приоритеты, допуск"""
+
+    def __init__(
+        self,
+        max_concurrency: int = UPDATE_MAX_CONCURRENCY,
+        max_pending: int = UPDATE_MAX_PENDING,
+        user_max_pending: int = UPDATE_USER_MAX_PENDING,
+        background_share: float = UPDATE_BACKGROUND_SHARE,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pending = max(1, max_pending)
+        self.user_max_pending = max(1, user_max_pending)
+        self.max_background = max(1, int(self.max_concurrency * background_share))
+        self.stats = SchedulerStats()
+        self.wait_histograms = {p: LatencyHistogram() for p in Priority}
+        self._histogram_lock = threading.Lock()
+
+        self._seq = itertools.count()
+        # Готовые к старту: (приоритет, порядковый номер, билет)
+        self._ready: List[Tuple[int, int, _Ticket]] = []
+        # Пользователи, чье обновление готово к старту или выполняется,
+        # и их следующие обновления
+        self._lanes: Dict[int, Deque[_Ticket]] = {}
+        self._waiting = {p: 0 for p in Priority}
+        self._running = {p: 0 for p in Priority}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._idle: Optional[asyncio.Event] = None
+
+    # ------------------------------------------------------------ lifecycle
+
+    @property
+    def active(self) -> bool:
+        """Запущен ли планировщик в текущем event loop"""
+        if self._loop is None:
+            return False
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    @property
+    def pending(self) -> int:
+        return sum(self._waiting.values())
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._idle = asyncio.Event()
+        self._update_idle()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Дождаться обновлений в работе и в очереди, затем выключить планировщик"""
+        if self._idle is not None and self.active:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                print(f"⚠️ Update scheduler stopped with {self.pending} updates pending")
+        self._loop = None
+
+    # ----------------------------------------------------------- middleware
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        if not self.active:
+            return await handler(event, data)
+
+        priority = event_priority(event)
+        lane = lane_key(data)
+        reason = self.admission(priority, lane)
+        if reason is not None:
+            await self._shed(event, priority, reason)
+            return None
+
+        self.stats.admitted += 1
+        async with self._slot(priority, lane):
+            return await handler(event, data)
+
+    def admission(self, priority: Priority, lane: Optional[int]) -> Optional[str]:
+        """Причина отказа в приеме или None"""
+        if self.pending >= self.max_pending * ADMISSION_SHARE[priority]:
+            return SHED_QUEUE_FULL
+        backlog = self._lanes.get(lane) if lane is not None else None
+        if backlog is not None and len(backlog) >= self.user_max_pending:
+            return SHED_USER_BACKLOG
+        return None
+
+    async def _shed(self, event: TelegramObject, priority: Priority, reason: str) -> None:
+        if reason == SHED_QUEUE_FULL:
+            self.stats.shed_queue_full += 1
+        else:
+            self.stats.shed_user_backlog += 1
+        shed = self.stats.shed_queue_full + self.stats.shed_user_backlog
+        if shed == 1 or shed % 100 == 0:
+            logger.warning(
+                f"🚦 Update shed ({reason}, {priority.name.lower()}): "
+                f"{self.pending} pending, {self.running} running, {shed} shed in total"
+            )
+        if isinstance(event, CallbackQuery):
+            try:
+                await event.answer(MSG_OVERLOADED)
+            except Exception:  # noqa: BLE001 - ответ необязателен
+                pass
+
+    # ------------------------------------------------------------------ API
+
+    @asynccontextmanager
+    async def slot(
+        self, priority: Priority = Priority.BACKGROUND, lane: Optional[int] = None
+    ) -> AsyncIterator[None]:
+        """
+        Слот для работы вне обработчиков (фоновые задачи), без контроля допуска.
+
+        Без запущенного планировщика - no-op. Нельзя ждать такой слот изнутри
+        обработчика обновления: при занятых слотах это взаимная блокировка.
+        """
+        if not self.active:
+            yield
+            return
+        async with self._slot(priority, lane):
+            yield
+
+    def wait_histogram_snapshot(self) -> Dict[Priority, LatencyHistogram]:
+        """Копии гистограмм ожидания слота (/metrics читает их из потока)"""
+        with self._histogram_lock:
+            return {p: histogram.copy() for p, histogram in self.wait_histograms.items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **asdict(self.stats),
+            "pending": {p.name.lower(): n for p, n in self._waiting.items()},
+            "running": {p.name.lower(): n for p, n in self._running.items()},
+            "lanes": len(self._lanes),
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+        }
+
+    # ------------------------------------------------------------ internals
+
+    @asynccontextmanager
+    async def _slot(self, priority: Priority, lane: Optional[int]) -> AsyncIterator[None]:
+        ticket = _Ticket(priority, lane, self._loop.create_future(), time.perf_counter())
+        self._waiting[priority] += 1
+        self._enqueue(ticket)
+        with phase(PHASE_QUEUE):
+            try:
+                await ticket.future
+            except asyncio.CancelledError:
+                if ticket.started:
+                    self._release(ticket)
+                else:
+                    self._withdraw(ticket)
+                raise
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    def _enqueue(self, ticket: _Ticket) -> None:
+        if ticket.lane is None:
+            self._push_ready(ticket)
+        elif ticket.lane in self._lanes:
+            self._lanes[ticket.lane].append(ticket)
+        else:
+            self._lanes[ticket.lane] = deque()
+            self._push_ready(ticket)
+        self._dispatch()
+
+    def _push_ready(self, ticket: _Ticket) -> None:
+        heapq.heappush(self._ready, (ticket.priority, next(self._seq), ticket))
+
+    def _dispatch(self) -> None:
+        while self._ready and self.running < self.max_concurrency:
+            priority, _, ticket = self._ready[0]
+            if ticket.future.done():
+                heapq.heappop(self._ready)
+                continue
+            if (
+                priority == Priority.BACKGROUND
+                and self._running[Priority.BACKGROUND] >= self.max_background
+            ):
+                break
+            heapq.heappop(self._ready)
+            self._waiting[ticket.priority] -= 1
+            self._running[ticket.priority] += 1
+            with self._histogram_lock:
+                self.wait_histograms[ticket.priority].record(
+                    (time.perf_counter() - ticket.enqueued_at) * 1000
+                )
+            ticket.started = True
+            ticket.future.set_result(None)
+        self._update_idle()
+
+    def _advance_lane(self, lane: Optional[int]) -> None:
+        """Следующее обновление пользователя становится готовым к старту"""
+        if lane is None:
+            return
+        backlog = self._lanes[lane]
+        if backlog:
+            self._push_ready(backlog.popleft())
+        else:
+            del self._lanes[lane]
+
+    def _release(self, ticket: _Ticket) -> None:
+        self._running[ticket.priority] -= 1
+        self.stats.completed += 1
+        self._advance_lane(ticket.lane)
+        self._dispatch()
+
+    def _withdraw(self, ticket: _Ticket) -> None:
+        """Отмена до старта: билет уходит из очереди пользователя или из готовых"""
+        self._waiting[ticket.priority] -= 1
+        backlog = self._lanes.get(ticket.lane) if ticket.lane is not None else None
+        if backlog is not None and ticket in backlog:
+            backlog.remove(ticket)
+        else:
+            # Был готов к старту (отмененный future из кучи уберет _dispatch)
+            self._advance_lane(ticket.lane)
+        self._dispatch()
+
+    def _update_idle(self) -> None:
+        if self._idle is None:
+            return
+        if self.pending or self.running:
+            self._idle.clear()
+        else:
+            self._idle.set()
+
+
+def install_update_scheduler(dp: Dispatcher, scheduler: Optional[UpdateScheduler] = None) -> None:
+    """Outer middleware на всех событиях dp (кроме update и error)"""
+    scheduler = scheduler or get_update_scheduler()
+    for name, observer in dp.observers.items():
+        if name in ("update", "error"):
+            continue
+        observer.outer_middleware(scheduler)
+
+
+_scheduler: Optional[UpdateScheduler] = None
+
+
+def get_update_scheduler() -> UpdateScheduler:
+    """Глобальный планировщик обработки обновлений"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = UpdateScheduler()
+    return _scheduler
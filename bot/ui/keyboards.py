@@ -8,6 +8,7 @@ from aiogram.types import (
 )
 from typing import Optional
 
+from bot.utils.lazy import LazyProxy
 from services.cart_store import get_cart_store
 
 BTN_PALETTE = "🎨 Тон & сияние"
@@ -23,7 +24,8 @@ BTN_CONFIRM_YES = "✅ Да"
 BTN_CONFIRM_NO = "✖️ Нет"
 BTN_RETRY = "🔁 Повторить"
 
-_store = get_cart_store()
+# Корзины читаются с диска при первом обращении, а не при импорте
+_store = LazyProxy(get_cart_store)
 
 
 def _cart_caption(count: int) -> str:
@@ -45,7 +47,9 @@ def is_cart_button_text(text: Optional[str]) -> bool:
     return bool(text and text.startswith(BTN_CART))
 
 
-def main_menu(cart_count: Optional[int] = None, *, user_id: Optional[int] = None) -> ReplyKeyboardMarkup:
+def main_menu(
+    cart_count: Optional[int] = None, *, user_id: Optional[int] = None
+) -> ReplyKeyboardMarkup:
     count = _resolve_count(cart_count, user_id)
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -60,14 +64,19 @@ def main_menu(cart_count: Optional[int] = None, *, user_id: Optional[int] = None
     )
 
 
-def main_menu_inline(cart_count: Optional[int] = None, *, user_id: Optional[int] = None) -> InlineKeyboardMarkup:
+def main_menu_inline(
+    cart_count: Optional[int] = None, *, user_id: Optional[int] = None
+) -> InlineKeyboardMarkup:
     count = _resolve_count(cart_count, user_id)
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [InlineKeyboardButton(text=BTN_PALETTE, callback_data="start_palette")],
             [InlineKeyboardButton(text=BTN_SKINCARE, callback_data="start_skincare")],
             [InlineKeyboardButton(text=_cart_caption(count), callback_data="cart:open")],
-            [InlineKeyboardButton(text=BTN_ABOUT, callback_data="about"), InlineKeyboardButton(text=BTN_REPORT, callback_data="show_report")],
+            [
+                InlineKeyboardButton(text=BTN_ABOUT, callback_data="about"),
+                InlineKeyboardButton(text=BTN_REPORT, callback_data="show_report"),
+            ],
             [InlineKeyboardButton(text=BTN_SETTINGS, callback_data="settings")],
         ]
     )
@@ -80,7 +89,9 @@ def back_button() -> ReplyKeyboardMarkup:
     )
 
 
-def confirm_buttons(yes_text: str = BTN_CONFIRM_YES, no_text: str = BTN_CONFIRM_NO) -> InlineKeyboardMarkup:
+def confirm_buttons(
+    yes_text: str = BTN_CONFIRM_YES, no_text: str = BTN_CONFIRM_NO
+) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [InlineKeyboardButton(text=yes_text, callback_data="confirm:yes")],
@@ -31,7 +31,19 @@ def save_last_json(uid: int, snapshot: Dict[str, Any]) -> str:
 
 
 def save_text_pdf(uid: int, title: str, body_text: str) -> str:
-    """Save report as PDF (with text fallback if fpdf2 unavailable)"""
+    """Save report as PDF, reusing the cached file when title and text are unchanged"""
+    from bot.ui.report_cache import get_report_cache
+
+    return get_report_cache().render(
+        "text",
+        uid,
+        "last.pdf",
+        {"title": title, "body_text": body_text},
+        lambda: _save_text_pdf(uid, title, body_text),
+    )
+
+
+def _save_text_pdf(uid: int, title: str, body_text: str) -> str:
     try:
         # Create user reports directory
         user_dir = os.path.join("data", "reports", str(uid))
@@ -46,38 +58,13 @@ def save_text_pdf(uid: int, title: str, body_text: str) -> str:
             pdf = FPDF(unit="mm", format="A4")
             pdf.add_page()
 
-            # Try to add Unicode font for Russian text
+            # Try to add Unicode font for Russian text (resolved and parsed once per process)
             try:
-                # Check multiple possible font locations
-                font_paths = [
-                    ".skin-advisor/assets/DejaVuSans.ttf",  # Actual location
-                    "assets/fonts/DejaVuSans.ttf",
-                    "assets/DejaVuSans.ttf",
-                    "fonts/DejaVuSans.ttf",
-                    os.path.join(
-                        os.path.dirname(__file__),
-                        "..",
-                        "..",
-                        ".skin-advisor",
-                        "assets",
-                        "DejaVuSans.ttf",
-                    ),
-                    os.path.join(
-                        os.path.dirname(__file__), "..", "..", "assets", "fonts", "DejaVuSans.ttf"
-                    ),
-                ]
-
-                font_found = False
-                for font_path in font_paths:
-                    if os.path.exists(font_path):
-                        pdf.add_font("DejaVu", "", font_path, uni=True)
-                        pdf.set_font("DejaVu", size=12)
-                        font_found = True
-                        print(f"✅ Using DejaVu font from: {font_path}")
-                        break
-
-                if not font_found:
+                from bot.ui.pdf_fonts import get_font_registry
+
+                if not get_font_registry().apply(pdf, "DejaVu"):
                     raise Exception("DejaVu font not found in any location")
+                pdf.set_font("DejaVu", size=12)
 
             except Exception as e:
                 print(f"⚠️ DejaVu font issue: {e}, falling back to Arial")
@@ -0,0 +1,202 @@
+"""
+🔤 PDF Font Registry - процесс-глобальный кеш шрифтов для генераторов PDF
+
+Раньше каждый отчет заново перебирал ~дюжину путей через os.path.exists и
+парсил TTF через add_font (fontTools: cmap, hmtx, ширины глифов). Реестр
+находит файлы шрифтов один раз, один раз разбирает метрики и байты файла,
+а в каждый новый FPDF документ кладет готовый объект шрифта.
+
+Объект шрифта для документа создается заново (FPDF сабсетит ttfont и
+нумерует дескриптор при output), но дорогие таблицы разделяются между
+документами. Если внутреннее API fpdf2 изменится - откатываемся на add_font.
+"""
+
+from __future__ import annotations
+
+import copy
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional
+
+from fpdf import FPDF
+
+_HERE = os.path.dirname(__file__)
+_PROJECT_ROOT = os.path.join(_HERE, "..", "..")
+
+# Кандидаты в порядке приоритета (объединение путей из pdf, pdf_v2, pdf_v2_simple)
+FONT_CANDIDATES: Dict[str, List[str]] = {
+    "DejaVu": [
+        # Docker системные пути (новые)
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts-dejavu-core/DejaVuSans.ttf",
+        "/usr/share/fonts-dejavu/DejaVuSans.ttf",
+        # Docker системные пути (альтернативные)
+        "/usr/share/fonts/TTF/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/ttf-dejavu/DejaVuSans.ttf",
+        # Локальные пути
+        "assets/fonts/DejaVuSans.ttf",
+        "assets/DejaVuSans.ttf",
+        "fonts/DejaVuSans.ttf",
+        os.path.join(_PROJECT_ROOT, "assets", "fonts", "DejaVuSans.ttf"),
+        # Системные пути Windows
+        "C:/Windows/Fonts/DejaVuSans.ttf",
+        # Резервные пути
+        ".skin-advisor/assets/DejaVuSans.ttf",
+        os.path.join(_PROJECT_ROOT, ".skin-advisor", "assets", "DejaVuSans.ttf"),
+    ],
+    "NotoSans": [
+        "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+        "/usr/share/fonts/noto/NotoSans-Regular.ttf",
+        "/usr/share/fonts/opentype/noto/NotoSans-Regular.ttf",
+        "assets/fonts/NotoSans-Regular.ttf",
+        os.path.join(_PROJECT_ROOT, "assets", "fonts", "NotoSans-Regular.ttf"),
+    ],
+}
+
+
+@dataclass
+class _ParsedFont:
+    """Разобранные один раз данные TTF, общие для всех документов"""
+
+    path: str
+    data: bytes
+    template: object  # fpdf.fonts.TTFFont, созданный в служебном документе
+
+
+class FontRegistry:
+    """Реестр шрифтов: пути ищутся и TTF разбираются один раз на процесс"""
+
+    def __init__(self, candidates: Optional[Dict[str, List[str]]] = None):
+        self.candidates = candidates or FONT_CANDIDATES
+        self._paths: Optional[Dict[str, Optional[str]]] = None
+        self._parsed: Dict[str, _ParsedFont] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self) -> Dict[str, Optional[str]]:
+        """Находит файл для каждого семейства (один раз)"""
+        if self._paths is None:
+            with self._lock:
+                if self._paths is None:
+                    paths: Dict[str, Optional[str]] = {}
+                    for family, candidates in self.candidates.items():
+                        paths[family] = next((p for p in candidates if os.path.exists(p)), None)
+                        if paths[family]:
+                            print(f"✅ PDF fonts: {family} resolved to {paths[family]}")
+                    self._paths = paths
+        return self._paths
+
+    def get_path(self, family: str) -> Optional[str]:
+        return self.resolve().get(family)
+
+    def available(self, family: str) -> bool:
+        return self.get_path(family) is not None
+
+    def warm(self, families: Optional[Iterable[str]] = None) -> None:
+        """Разбирает шрифты заранее (старт приложения, инициализация воркера)"""
+        for family in families or self.candidates.keys():
+            try:
+                self._get_parsed(family)
+            except Exception as e:  # noqa: BLE001
+                print(f"⚠️ PDF fonts: failed to warm {family}: {e}")
+
+    def apply(self, pdf: FPDF, family: str, styles: Iterable[str] = ("",)) -> bool:
+        """
+        Регистрирует семейство в документе. Все стили используют один файл,
+        как и прежний код генераторов. Возвращает False, если шрифта нет.
+        """
+        path = self.get_path(family)
+        if not path:
+            return False
+
+        for style in styles:
+            fontkey = f"{family.lower()}{style}"
+            if fontkey in pdf.fonts:
+                continue
+            try:
+                pdf.fonts[fontkey] = self._clone_for(pdf, family, fontkey, style)
+            except Exception as e:  # noqa: BLE001
+                print(f"⚠️ PDF fonts: cached font unavailable ({e}), using add_font")
+                pdf.add_font(family, style, path)
+        return True
+
+    def _get_parsed(self, family: str) -> Optional[_ParsedFont]:
+        parsed = self._parsed.get(family)
+        if parsed is not None:
+            return parsed
+
+        path = self.get_path(family)
+        if not path:
+            return None
+
+        with self._lock:
+            parsed = self._parsed.get(family)
+            if parsed is None:
+                scratch = FPDF()
+                scratch.add_font(family, "", path)
+                template = scratch.fonts[family.lower()]
+                with open(path, "rb") as f:
+                    data = f.read()
+                parsed = _ParsedFont(path=path, data=data, template=template)
+                self._parsed[family] = parsed
+        return parsed
+
+    def _clone_for(self, pdf: FPDF, family: str, fontkey: str, style: str) -> object:
+        from fontTools import ttLib
+        from fpdf.enums import TextEmphasis
+        from fpdf.fonts import SubsetMap, TTFFont
+
+        parsed = self._get_parsed(family)
+        template = parsed.template
+
+        font = TTFFont.__new__(TTFFont)
+        font.i = len(pdf.fonts) + 1
+        font.type = template.type
+        font.ttffile = template.ttffile
+        font.fontkey = fontkey
+        font.name = template.name
+        font.scale = template.scale
+        font.up = template.up
+        font.ut = template.ut
+        # Таблицы только читаются - разделяем их между документами
+        font.cmap = template.cmap
+        font.glyph_ids = template.glyph_ids
+        font.cw = defaultdict(template.cw.default_factory, template.cw)
+        # Дескриптор получает id и имя при output - нужна своя копия
+        font.desc = copy.copy(template.desc)
+        font.emphasis = TextEmphasis.coerce(style)
+        font.missing_glyphs = []
+        # ttfont сабсетится при output, поэтому свой экземпляр (lazy, из байтов в памяти)
+        font.ttfont = ttLib.TTFont(
+            BytesIO(parsed.data), recalcTimestamp=False, fontNumber=0, lazy=True
+        )
+
+        sbarr = "\x00 \r\n"
+        if pdf.str_alias_nb_pages:
+            sbarr += "0123456789"
+            sbarr += pdf.str_alias_nb_pages
+        font.subset = SubsetMap(font, [ord(char) for char in sbarr])
+        return font
+
+
+# Глобальный экземпляр реестра
+_font_registry: Optional[FontRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_font_registry() -> FontRegistry:
+    """Получить глобальный реестр шрифтов"""
+    global _font_registry
+    if _font_registry is None:
+        with _registry_lock:
+            if _font_registry is None:
+                _font_registry = FontRegistry()
+    return _font_registry
+
+
+def warm_font_registry() -> None:
+    """Находит и разбирает шрифты заранее"""
+    get_font_registry().warm()
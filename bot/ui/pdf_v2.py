@@ -9,6 +9,9 @@ from pathlib import Path
 from fpdf import FPDF
 import re
 
+from bot.ui.pdf_fonts import get_font_registry
+from bot.ui.report_cache import get_report_cache
+
 
 class StructuredPDFGenerator:
     """Генератор структурированных PDF отчетов v2"""
@@ -79,73 +82,13 @@ class StructuredPDFGenerator:
         pdf.add_page()
         pdf.set_margins(self.margin_left, self.margin_top, self.margin_right)
 
-        # Настройка шрифта
+        # Настройка шрифта (пути и разбор TTF кешируются в реестре)
         try:
-            # Попытка загрузить DejaVu шрифт
-            font_paths = [
-                # Docker системные пути (новые)
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                "/usr/share/fonts/dejavu/DejaVuSans.ttf",
-                "/usr/share/fonts-dejavu-core/DejaVuSans.ttf",
-                "/usr/share/fonts-dejavu/DejaVuSans.ttf",
-                # Docker системные пути (альтернативные)
-                "/usr/share/fonts/TTF/DejaVuSans.ttf",
-                "/usr/share/fonts/truetype/ttf-dejavu/DejaVuSans.ttf",
-                # Локальные пути
-                "assets/fonts/DejaVuSans.ttf",
-                os.path.join(
-                    os.path.dirname(__file__), "..", "..", "assets", "fonts", "DejaVuSans.ttf"
-                ),
-                # Системные пути Windows
-                "C:/Windows/Fonts/DejaVuSans.ttf",
-                # Резервные пути
-                ".skin-advisor/assets/DejaVuSans.ttf",
-            ]
-
-            font_found = False
-            for font_path in font_paths:
-                if os.path.exists(font_path):
-                    pdf.add_font("DejaVu", "", font_path)
-                    pdf.add_font("DejaVu", "B", font_path)  # Bold variant
-                    font_found = True
-                    print(f"✅ PDF v2: Using DejaVu font from: {font_path}")
-                    break
-
-            # Если DejaVu не найден, пробуем Noto Sans
-            noto_found = False
-            if not font_found:
-                noto_paths = [
-                    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
-                    "/usr/share/fonts/noto/NotoSans-Regular.ttf",
-                    "/usr/share/fonts/opentype/noto/NotoSans-Regular.ttf",
-                    "assets/fonts/NotoSans-Regular.ttf",
-                    os.path.join(
-                        os.path.dirname(__file__),
-                        "..",
-                        "..",
-                        "assets",
-                        "fonts",
-                        "NotoSans-Regular.ttf",
-                    ),
-                ]
-
-                for noto_path in noto_paths:
-                    if os.path.exists(noto_path):
-                        try:
-                            pdf.add_font("NotoSans", "", noto_path)
-                            noto_found = True
-                            print(f"✅ PDF v2: Using Noto Sans font from: {noto_path}")
-                            break
-                        except Exception as e:
-                            print(f"⚠️ PDF v2: Failed to load Noto font from {noto_path}: {e}")
-
-            # Выбираем шрифт в порядке приоритета
-            if font_found:
+            registry = get_font_registry()
+            if registry.apply(pdf, "DejaVu", styles=("", "B")):
                 pdf.set_font("DejaVu", size=self.font_size_text)
-                print("✅ PDF v2: Using DejaVu font")
-            elif noto_found:
+            elif registry.apply(pdf, "NotoSans"):
                 pdf.set_font("NotoSans", size=self.font_size_text)
-                print("✅ PDF v2: Using Noto Sans font")
             else:
                 pdf.set_font("Arial", size=self.font_size_text)
                 print("⚠️ PDF v2: Using Arial fallback (limited Cyrillic support)")
@@ -786,9 +729,15 @@ def get_pdf_generator() -> StructuredPDFGenerator:
 
 
 def generate_structured_pdf_report(uid: int, snapshot: Dict[str, Any]) -> str:
-    """Основная функция для генерации структурированного PDF"""
+    """Основная функция для генерации структурированного PDF (с кешем по содержимому)"""
     generator = get_pdf_generator()
-    return generator.generate_structured_pdf(uid, snapshot)
+    return get_report_cache().render(
+        "structured",
+        uid,
+        "last_v2.pdf",
+        snapshot,
+        lambda: generator.generate_structured_pdf(uid, snapshot),
+    )
 
 
 if __name__ == "__main__":
@@ -8,9 +8,21 @@ from typing import Dict, Any
 from pathlib import Path
 from fpdf import FPDF
 
+from bot.ui.report_cache import get_report_cache
+
 
 def generate_minimal_pdf(uid: int, snapshot: Dict[str, Any]) -> str:
-    """Генерирует минимальный PDF отчет (только ASCII)"""
+    """Генерирует минимальный PDF отчет (только ASCII, с кешем по содержимому)"""
+    return get_report_cache().render(
+        "minimal",
+        uid,
+        "last_v2_minimal.pdf",
+        snapshot,
+        lambda: _generate_minimal_pdf(uid, snapshot),
+    )
+
+
+def _generate_minimal_pdf(uid: int, snapshot: Dict[str, Any]) -> str:
     try:
         # Создаем директорию
         user_dir = Path("data") / "reports" / str(uid)
@@ -9,6 +9,9 @@ from pathlib import Path
 from fpdf import FPDF
 import re
 
+from bot.ui.pdf_fonts import get_font_registry
+from bot.ui.report_cache import get_report_cache
+
 
 class SimplePDFGenerator:
     """Упрощенный PDF генератор с гарантированной работоспособностью"""
@@ -72,76 +75,12 @@ class SimplePDFGenerator:
             pdf.add_page()
             pdf.set_margins(self.margin, self.margin, self.margin)
 
-            # Настройка шрифта
+            # Настройка шрифта (пути и разбор TTF кешируются в реестре)
             try:
-                # Ищем DejaVu шрифт
-                font_paths = [
-                    # Docker системные пути (новые)
-                    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
-                    "/usr/share/fonts-dejavu-core/DejaVuSans.ttf",
-                    "/usr/share/fonts-dejavu/DejaVuSans.ttf",
-                    # Docker системные пути (альтернативные)
-                    "/usr/share/fonts/TTF/DejaVuSans.ttf",
-                    "/usr/share/fonts/truetype/ttf-dejavu/DejaVuSans.ttf",
-                    # Локальные пути
-                    "assets/fonts/DejaVuSans.ttf",
-                    os.path.join(
-                        os.path.dirname(__file__), "..", "..", "assets", "fonts", "DejaVuSans.ttf"
-                    ),
-                    # Системные пути Windows
-                    "C:/Windows/Fonts/DejaVuSans.ttf",
-                    # Резервные пути
-                    ".skin-advisor/assets/DejaVuSans.ttf",
-                ]
-
-                font_found = False
-                noto_found = False
-
-                # Ищем DejaVu
-                for font_path in font_paths:
-                    if os.path.exists(font_path):
-                        try:
-                            pdf.add_font("DejaVu", "", font_path)
-                            pdf.set_font("DejaVu", size=self.font_size_text)
-                            font_found = True
-                            print(f"✅ Simple PDF: Using DejaVu font from: {font_path}")
-                            break
-                        except Exception as e:
-                            print(f"⚠️ Simple PDF: Failed to load DejaVu from {font_path}: {e}")
-
-                # Если DejaVu не найден, пробуем Noto Sans
-                if not font_found:
-                    noto_paths = [
-                        "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
-                        "/usr/share/fonts/noto/NotoSans-Regular.ttf",
-                        "/usr/share/fonts/opentype/noto/NotoSans-Regular.ttf",
-                        "assets/fonts/NotoSans-Regular.ttf",
-                        os.path.join(
-                            os.path.dirname(__file__),
-                            "..",
-                            "..",
-                            "assets",
-                            "fonts",
-                            "NotoSans-Regular.ttf",
-                        ),
-                    ]
-
-                    for noto_path in noto_paths:
-                        if os.path.exists(noto_path):
-                            try:
-                                pdf.add_font("NotoSans", "", noto_path)
-                                pdf.set_font("NotoSans", size=self.font_size_text)
-                                noto_found = True
-                                print(f"✅ Simple PDF: Using Noto Sans font from: {noto_path}")
-                                break
-                            except Exception as e:
-                                print(f"⚠️ Simple PDF: Failed to load Noto from {noto_path}: {e}")
-
-                # Выбираем шрифт
-                if font_found:
+                registry = get_font_registry()
+                if registry.apply(pdf, "DejaVu"):
                     pdf.set_font("DejaVu", size=self.font_size_text)
-                elif noto_found:
+                elif registry.apply(pdf, "NotoSans"):
                     pdf.set_font("NotoSans", size=self.font_size_text)
                 else:
                     pdf.set_font("Arial", size=self.font_size_text)
@@ -363,9 +302,15 @@ class SimplePDFGenerator:
 
 
 def generate_simple_pdf_report(uid: int, snapshot: Dict[str, Any]) -> str:
-    """Основная функция для генерации упрощенного PDF"""
+    """Основная функция для генерации упрощенного PDF (с кешем по содержимому)"""
     generator = SimplePDFGenerator()
-    return generator.generate_pdf(uid, snapshot)
+    return get_report_cache().render(
+        "simple",
+        uid,
+        "last_v2_simple.pdf",
+        snapshot,
+        lambda: generator.generate_pdf(uid, snapshot),
+    )
 
 
 if __name__ == "__main__":
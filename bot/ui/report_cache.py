@@ -0,0 +1,288 @@
+"""
+🗄️ Report Cache - контентно-адресуемое хранилище PDF отчетов
+
+Отчет однозначно определяется нормализованным snapshot'ом и версией шаблона
+генератора. PDF хранится один раз под своим хешем:
+
+    data/reports/blobs/ab/ab12...ef.pdf
+
+а пользовательский файл (например data/reports/<uid>/last_v2.pdf) - это
+жесткая ссылка на blob (или копия, если ФС не поддерживает ссылки) плюс
+указатель last_v2.pdf.ref с хешем. При совпадении хеша генерация пропускается.
+Blob'ы, на которые не ссылается ни один указатель, удаляет collect_garbage().
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+
+# Версия шаблона каждого генератора: поднимать при изменении верстки,
+# чтобы старые PDF из кеша не отдавались повторно.
+TEMPLATE_VERSIONS: Dict[str, str] = {
+    "structured": "pdf_v2:1",
+    "simple": "pdf_v2_simple:1",
+    "minimal": "pdf_v2_minimal:1",
+    "text": "pdf_text:1",
+}
+
+REF_SUFFIX = ".ref"
+
+
+def normalize_snapshot(payload: Any) -> str:
+    """Стабильное текстовое представление snapshot'а (порядок ключей не важен)"""
+    return json.dumps(
+        payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    )
+
+
+class ReportCache:
+    """Контентно-адресуемый кеш PDF отчетов"""
+
+    def __init__(self, root: str = os.path.join("data", "reports")):
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def compute_key(self, kind: str, payload: Any) -> str:
+        """Хеш нормализованного snapshot'а + версии шаблона"""
+        version = TEMPLATE_VERSIONS.get(kind, kind)
+        digest = hashlib.sha256()
+        digest.update(version.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(normalize_snapshot(payload).encode("utf-8"))
+        return digest.hexdigest()
+
+    def blob_path(self, key: str) -> Path:
+        return self.blobs_dir / key[:2] / f"{key}.pdf"
+
+    def user_path(self, uid: int, filename: str) -> Path:
+        return self.root / str(uid) / filename
+
+    def read_ref(self, uid: int, filename: str) -> Optional[str]:
+        """Хеш отчета, на который указывает пользовательский файл"""
+        ref = self.user_path(uid, filename + REF_SUFFIX)
+        try:
+            return ref.read_text(encoding="utf-8").strip() or None
+        except (FileNotFoundError, OSError):
+            return None
+
+    def checkout(self, uid: int, filename: str, key: str) -> Optional[str]:
+        """
+        При наличии blob'а направляет пользовательский файл на него и
+        возвращает путь; None - промах, отчет нужно сгенерировать.
+        """
+        blob = self.blob_path(key)
+        if not blob.exists():
+            self.misses += 1
+            return None
+
+        target = self.user_path(uid, filename)
+        if self.read_ref(uid, filename) != key or not target.exists():
+            self._link(blob, target)
+            self._write_ref(uid, filename, key)
+        self.hits += 1
+        return str(target)
+
+    def prepare(self, uid: int, filename: str) -> None:
+        """
+        Отвязывает пользовательский файл от blob'а перед генерацией:
+        генераторы пишут прямо в last_*.pdf, и запись в жесткую ссылку
+        испортила бы сохраненный в кеше отчет. Указатель тоже снимаем,
+        чтобы он не описывал файл, которого больше нет.
+        """
+        for path in (self.user_path(uid, filename), self.user_path(uid, filename + REF_SUFFIX)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def commit(self, uid: int, filename: str, key: str, generated_path: str) -> str:
+        """Переносит сгенерированный PDF в хранилище и связывает с пользователем"""
+        blob = self.blob_path(key)
+        target = self.user_path(uid, filename)
+        with self._lock:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            if blob.exists():
+                # Такой же отчет уже сохранен (параллельная генерация)
+                Path(generated_path).unlink(missing_ok=True)
+            else:
+                os.replace(generated_path, blob)
+        self._link(blob, target)
+        self._write_ref(uid, filename, key)
+        return str(target)
+
+    def render(
+        self,
+        kind: str,
+        uid: int,
+        filename: str,
+        payload: Any,
+        generate: Callable[[], str],
+    ) -> str:
+        """Возвращает путь к отчету, генерируя его только при промахе кеша"""
+        try:
+            key = self.compute_key(kind, payload)
+            cached = self.checkout(uid, filename, key)
+            if cached:
+                print(f"♻️ Report cache hit for user {uid}: {filename} ({key[:12]})")
+                return cached
+            self.prepare(uid, filename)
+        except Exception as e:  # noqa: BLE001
+            print(f"⚠️ Report cache unavailable: {e}")
+            self.user_path(uid, filename + REF_SUFFIX).unlink(missing_ok=True)
+            return generate()
+
+        path = generate()
+        if not path:
+            return path
+        try:
+            return self.commit(uid, filename, key, path)
+        except Exception as e:  # noqa: BLE001
+            print(f"⚠️ Failed to store report in cache: {e}")
+            return path
+
+    def collect_garbage(self, min_age: float = 3600.0) -> int:
+        """
+        Удаляет blob'ы, на которые не ссылается ни один указатель *.ref.
+        Свежие blob'ы (моложе min_age) не трогаем - их может коммитить
+        параллельная генерация.
+        """
+        if not self.blobs_dir.exists():
+            return 0
+
+        referenced: Set[str] = set()
+        for ref in self.root.glob(f"*/*{REF_SUFFIX}"):
+            try:
+                referenced.add(ref.read_text(encoding="utf-8").strip())
+            except OSError:
+                continue
+
+        removed = 0
+        now = time.time()
+        for blob in self.blobs_dir.glob("*/*.pdf"):
+            if blob.stem in referenced:
+                continue
+            try:
+                if now - blob.stat().st_mtime < min_age:
+                    continue
+                blob.unlink()
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def _link(self, blob: Path, target: Path) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            shutil.copyfile(blob, tmp)
+        os.replace(tmp, target)
+
+    def _write_ref(self, uid: int, filename: str, key: str) -> None:
+        ref = self.user_path(uid, filename + REF_SUFFIX)
+        tmp = ref.with_name(f".{ref.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(key, encoding="utf-8")
+        os.replace(tmp, ref)
+
+
+def file_content_key(path: str) -> str:
+    """Хеш содержимого файла - для отчетов без указателя .ref (старые файлы)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return "file:" + digest.hexdigest()
+
+
+class TelegramFileIdStore:
+    """
+    Персистентное соответствие хеш отчета -> Telegram file_id.
+
+    После первой загрузки PDF повторные отправки ссылаются на file_id,
+    вместо того чтобы заново выгружать байты.
+    """
+
+    def __init__(
+        self,
+        path: str = os.path.join("data", "reports", "telegram_file_ids.json"),
+        max_entries: int = 5000,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._ids: Optional[Dict[str, str]] = None
+
+    def _load(self) -> Dict[str, str]:
+        if self._ids is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self._ids = (
+                    {str(k): str(v) for k, v in data.items()} if isinstance(data, dict) else {}
+                )
+            except (FileNotFoundError, ValueError, OSError):
+                self._ids = {}
+        return self._ids
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if not key:
+            return None
+        with self._lock:
+            return self._load().get(key)
+
+    def set(self, key: str, file_id: str) -> None:
+        with self._lock:
+            ids = self._load()
+            ids.pop(key, None)
+            ids[key] = file_id
+            # dict хранит порядок вставки - удаляем самые старые записи
+            while len(ids) > self.max_entries:
+                ids.pop(next(iter(ids)))
+            self._save(ids)
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            ids = self._load()
+            if ids.pop(key, None) is not None:
+                self._save(ids)
+
+    def _save(self, ids: Dict[str, str]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(ids, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️ Failed to save Telegram file_id map: {e}")
+
+
+# Глобальные экземпляры
+_report_cache: Optional[ReportCache] = None
+_file_id_store: Optional[TelegramFileIdStore] = None
+
+
+def get_report_cache() -> ReportCache:
+    """Получить глобальный экземпляр кеша отчетов"""
+    global _report_cache
+    if _report_cache is None:
+        _report_cache = ReportCache()
+    return _report_cache
+
+
+def get_file_id_store() -> TelegramFileIdStore:
+    """Получить глобальное хранилище Telegram file_id отчетов"""
+    global _file_id_store
+    if _file_id_store is None:
+        _file_id_store = TelegramFileIdStore()
+    return _file_id_store
@@ -0,0 +1,362 @@
+"""
+📄 Report Render Service - генерация PDF отчетов вне event loop
+
+Все генераторы PDF (pdf_v2, pdf_v2_simple, pdf_v2_minimal, pdf) синхронные:
+FPDF верстка, загрузка шрифтов и запись файла. Сервис выполняет их в пуле
+процессов (или потоков) с ограниченной очередью, таймаутом на задачу и
+статусами задач, чтобы PDF одного пользователя не замораживал остальных.
+
+Настройка через переменные окружения:
+    PDF_EXECUTOR      process | thread (по умолчанию process)
+    PDF_MAX_WORKERS   число параллельных генераций (по умолчанию 2)
+    PDF_QUEUE_SIZE    максимум задач в ожидании (по умолчанию 32)
+    PDF_JOB_TIMEOUT   таймаут одной задачи в секундах (по умолчанию 60)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from enum import Enum
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Зарегистрированные генераторы: kind -> (модуль, функция)
+RENDERERS: Dict[str, Tuple[str, str]] = {
+    "structured": ("bot.ui.pdf_v2", "generate_structured_pdf_report"),
+    "simple": ("bot.ui.pdf_v2_simple", "generate_simple_pdf_report"),
+    "minimal": ("bot.ui.pdf_v2_minimal", "generate_minimal_pdf"),
+    "text": ("bot.ui.pdf", "save_text_pdf"),
+}
+
+
+class ReportJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    TIMEOUT = "timeout"
+
+
+class ReportQueueFullError(RuntimeError):
+    """Очередь генерации переполнена - задача не принята"""
+
+
+@dataclass
+class ReportJob:
+    """Задача генерации отчета"""
+
+    job_id: str
+    kind: str
+    uid: int
+    status: ReportJobStatus = ReportJobStatus.QUEUED
+    submitted_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    path: Optional[str] = None
+    error: Optional[str] = None
+    # Попадания/промахи кеша отчетов внутри процесса-воркера
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["status"] = self.status.value
+        return data
+
+
+def _run_renderer(kind: str, args: tuple, kwargs: dict) -> Tuple[str, Tuple[int, int]]:
+    """
+    Точка входа в воркере (должна быть picklable для пула процессов).
+
+    Возвращает путь и (попадания, промахи) кеша отчетов за эту задачу: в
+    процессе-воркере счетчики ReportCache свои, и родитель иначе их не видит.
+    В потоке и при синхронном вызове кеш общий - возвращается (0, 0).
+    """
+    module_name, func_name = RENDERERS[kind]
+    func = getattr(importlib.import_module(module_name), func_name)
+    if multiprocessing.parent_process() is None:
+        return func(*args, **kwargs), (0, 0)
+
+    from bot.ui.report_cache import get_report_cache
+
+    cache = get_report_cache()
+    hits, misses = cache.hits, cache.misses
+    path = func(*args, **kwargs)
+    return path, (cache.hits - hits, cache.misses - misses)
+
+
+class ReportRenderService:
+    """Пул генерации PDF с ограниченной очередью и статусами задач"""
+
+    def __init__(
+        self,
+        executor: str = "process",
+        max_workers: int = 2,
+        max_queue: int = 32,
+        job_timeout: float = 60.0,
+        history_size: int = 256,
+    ):
+        self.executor_kind = executor
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.job_timeout = job_timeout
+        self.history_size = history_size
+
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._jobs: "OrderedDict[str, ReportJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Future] = {}
+        # Задачи с истекшим таймаутом, чья верстка еще идет в пуле
+        self._overrunning: Set[str] = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+
+    # ------------------------------------------------------------------ API
+
+    def submit(self, kind: str, uid: int, *args: Any, **kwargs: Any) -> ReportJob:
+        """
+        Ставит генерацию в очередь и сразу возвращает задачу (fire-and-forget).
+
+        Первый позиционный аргумент генератора - uid, остальные передаются как есть.
+        Без запущенного event loop генерация выполняется синхронно.
+        """
+        if kind not in RENDERERS:
+            raise ValueError(f"Unknown report kind: {kind}")
+
+        job = self._new_job(kind, uid)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._run_inline(job, (uid, *args), kwargs)
+            return job
+
+        self._tasks[job.job_id] = loop.create_task(self._execute(job, (uid, *args), kwargs))
+        return job
+
+    async def render(self, kind: str, uid: int, *args: Any, **kwargs: Any) -> str:
+        """Генерирует отчет в пуле и возвращает путь к файлу ("" при ошибке)"""
+        job = self.submit(kind, uid, *args, **kwargs)
+        task = self._tasks.get(job.job_id)
+        if task is not None:
+            await asyncio.shield(task)
+        return job.path or ""
+
+    def get_job(self, job_id: str) -> Optional[ReportJob]:
+        """Статус задачи по id"""
+        return self._jobs.get(job_id)
+
+    def get_user_jobs(self, uid: int) -> List[ReportJob]:
+        """Последние задачи пользователя (новые в конце)"""
+        return [job for job in list(self._jobs.values()) if job.uid == uid]
+
+    @property
+    def queue_depth(self) -> int:
+        """Задачи, ожидающие свободного воркера"""
+        return sum(1 for j in list(self._jobs.values()) if j.status == ReportJobStatus.QUEUED)
+
+    @property
+    def running(self) -> int:
+        return sum(1 for j in list(self._jobs.values()) if j.status == ReportJobStatus.RUNNING)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Сводка по очереди для мониторинга"""
+        return {
+            "executor": self.executor_kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queued": self.queue_depth,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "overrunning": len(self._overrunning),
+            "rejected": self.rejected,
+        }
+
+    async def shutdown(self, wait: bool = True) -> None:
+        """Дожидается активных задач и останавливает пул"""
+        if wait and self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait)
+
+    # ------------------------------------------------------------ internals
+
+    def _new_job(self, kind: str, uid: int) -> ReportJob:
+        with self._lock:
+            pending = sum(
+                1
+                for j in self._jobs.values()
+                if j.status in (ReportJobStatus.QUEUED, ReportJobStatus.RUNNING)
+            ) + len(self._overrunning)
+            if pending >= self.max_queue + self.max_workers:
+                self.rejected += 1
+                raise ReportQueueFullError(
+                    f"PDF queue is full ({pending} jobs), rejecting {kind} for user {uid}"
+                )
+
+            job = ReportJob(
+                job_id=f"{kind}-{next(self._ids)}",
+                kind=kind,
+                uid=uid,
+                submitted_at=time.time(),
+            )
+            self._jobs[job.job_id] = job
+            self._trim_history()
+            return job
+
+    def _trim_history(self) -> None:
+        finished = (ReportJobStatus.DONE, ReportJobStatus.FAILED, ReportJobStatus.TIMEOUT)
+        while len(self._jobs) > self.history_size:
+            oldest_id = next(
+                (jid for jid, j in self._jobs.items() if j.status in finished),
+                None,
+            )
+            if oldest_id is None:
+                break
+            del self._jobs[oldest_id]
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                try:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers, initializer=_warm_worker
+                    )
+                except (OSError, NotImplementedError) as e:
+                    print(f"⚠️ Process pool unavailable ({e}), falling back to threads")
+                    self.executor_kind = "thread"
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="pdf-render"
+                )
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Семафор привязан к event loop, поэтому создается в том loop, где используется
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _execute(self, job: ReportJob, args: tuple, kwargs: dict) -> None:
+        from bot.middlewares.update_scheduler import Priority, get_update_scheduler
+
+        loop = asyncio.get_running_loop()
+        future: Optional[asyncio.Future] = None
+        try:
+            # Фоновый слот планировщика: интерактивные обновления стартуют раньше
+            async with get_update_scheduler().slot(Priority.BACKGROUND):
+                slots = self._get_slots()
+                await slots.acquire()
+                try:
+                    job.status = ReportJobStatus.RUNNING
+                    job.started_at = time.time()
+                    future = loop.run_in_executor(
+                        self._get_executor(), _run_renderer, job.kind, args, kwargs
+                    )
+                except BaseException:
+                    slots.release()
+                    raise
+                # Таймаут не прерывает верстку в пуле: слот освобождается, только
+                # когда воркер действительно закончит
+                future.add_done_callback(lambda _: self._release(job, slots))
+                path, cache_counts = await asyncio.wait_for(
+                    asyncio.shield(future), timeout=self.job_timeout
+                )
+            self._finish(job, path, cache_counts)
+        except asyncio.TimeoutError:
+            if future is not None and not future.done():
+                self._overrunning.add(job.job_id)
+            job.status = ReportJobStatus.TIMEOUT
+            job.error = f"timed out after {self.job_timeout}s"
+            job.finished_at = time.time()
+            self.timed_out += 1
+            print(f"⚠️ PDF job {job.job_id} for user {job.uid} timed out")
+        except Exception as e:
+            job.status = ReportJobStatus.FAILED
+            job.error = str(e)
+            job.finished_at = time.time()
+            self.failed += 1
+            print(f"⚠️ PDF job {job.job_id} for user {job.uid} failed: {e}")
+        finally:
+            self._tasks.pop(job.job_id, None)
+
+    def _release(self, job: ReportJob, slots: asyncio.Semaphore) -> None:
+        self._overrunning.discard(job.job_id)
+        slots.release()
+
+    def _run_inline(self, job: ReportJob, args: tuple, kwargs: dict) -> None:
+        job.status = ReportJobStatus.RUNNING
+        job.started_at = time.time()
+        try:
+            self._finish(job, *_run_renderer(job.kind, args, kwargs))
+        except Exception as e:
+            job.status = ReportJobStatus.FAILED
+            job.error = str(e)
+            job.finished_at = time.time()
+            self.failed += 1
+
+    def _finish(self, job: ReportJob, path: str, cache_counts: Tuple[int, int] = (0, 0)) -> None:
+        job.finished_at = time.time()
+        job.path = path or None
+        job.cache_hits, job.cache_misses = cache_counts
+        if job.cache_hits or job.cache_misses:
+            from bot.ui.report_cache import get_report_cache
+
+            # Счетчики из процесса-воркера - в кеш родителя (для /metrics)
+            cache = get_report_cache()
+            cache.hits += job.cache_hits
+            cache.misses += job.cache_misses
+        if path:
+            job.status = ReportJobStatus.DONE
+            self.completed += 1
+        else:
+            # Генераторы сообщают об ошибке пустой строкой
+            job.status = ReportJobStatus.FAILED
+            job.error = job.error or "renderer returned empty path"
+            self.failed += 1
+
+
+def _warm_worker() -> None:
+    """Инициализация воркера пула процессов: импорт генераторов и разбор шрифтов"""
+    try:
+        importlib.import_module("bot.ui.pdf_v2")
+        from bot.ui.pdf_fonts import warm_font_registry
+
+        warm_font_registry()
+    except Exception as e:  # noqa: BLE001
+        print(f"⚠️ PDF worker warm-up failed: {e}")
+
+
+# Глобальный экземпляр сервиса
+_report_service: Optional[ReportRenderService] = None
+
+
+def get_report_service() -> ReportRenderService:
+    """Получить глобальный экземпляр сервиса генерации отчетов"""
+    global _report_service
+    if _report_service is None:
+        _report_service = ReportRenderService(
+            executor=os.getenv("PDF_EXECUTOR", "process").lower(),
+            max_workers=int(os.getenv("PDF_MAX_WORKERS", "2")),
+            max_queue=int(os.getenv("PDF_QUEUE_SIZE", "32")),
+            job_timeout=float(os.getenv("PDF_JOB_TIMEOUT", "60")),
+        )
+    return _report_service
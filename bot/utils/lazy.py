@@ -0,0 +1,55 @@
+"""
+💤 Lazy singletons - отложенное создание модульных объектов
+
+Модульные синглтоны обработчиков (корзина, A/B framework, селектор) читают
+файлы при создании. LazyProxy откладывает это до первого обращения к
+атрибуту, чтобы импорт роутеров не делал I/O:
+
+    ab_framework = LazyProxy(get_ab_testing_framework)
+    ab_framework.log_button_click(...)   # объект создается здесь
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+_UNSET = object()
+
+
+class LazyProxy(Generic[T]):
+    """Прокси, создающий объект фабрикой при первом обращении"""
+
+    __slots__ = ("_factory", "_value", "_lock")
+
+    def __init__(self, factory: Callable[[], T]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_value", _UNSET)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not _UNSET
+
+    def resolve(self) -> T:
+        value = self._value
+        if value is _UNSET:
+            with self._lock:
+                value = self._value
+                if value is _UNSET:
+                    value = self._factory()
+                    object.__setattr__(self, "_value", value)
+        return value
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.resolve(), name, value)
+
+    def __repr__(self) -> str:
+        if not self.loaded:
+            return f"<LazyProxy {getattr(self._factory, '__qualname__', self._factory)}>"
+        return repr(self._value)
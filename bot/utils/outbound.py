@@ -0,0 +1,361 @@
+"""
+📤 Outbound Queue - исходящие вызовы Bot API с лимитами и склейкой правок
+
+OutboundRequestMiddleware на сессии бота (install_outbound_queue(bot) из
+main) направляет через OutboundDispatcher все вызовы, отправляющие или
+меняющие сообщения в чате (send*, edit*, copy*, forward*, delete*, pin*):
+safe_send_message, message.answer, callback.message.edit_text и т.д.
+
+- у каждого чата своя FIFO-очередь и свой token bucket (приватный чат -
+  OUTBOUND_CHAT_RATE в секунду, группа - OUTBOUND_GROUP_RATE), плюс общий
+  bucket на весь бот (OUTBOUND_GLOBAL_RATE, лимит Telegram ~30/сек);
+- TelegramRetryAfter приостанавливает чат на retry_after секунд, вызов
+  повторяется (до OUTBOUND_MAX_RETRIES раз);
+- несколько editMessageText одного message_id, ждущих в очереди,
+  склеиваются в последнюю (merged): серия нажатий +/− в корзине или
+  листание подбора дает одну правку;
+- правка, совпадающая с только что отправленной тем же способом
+  (в пределах OUTBOUND_DEDUP_SECONDS), не отправляется (dropped) - Telegram
+  все равно ответил бы "message is not modified".
+
+Мимо очереди идут вызовы без числового chat_id (answerCallbackQuery,
+getUpdates, inline_message_id, @username), запросы чтения (getChat ...) и
+sendChatAction. Без запущенного диспетчера (скрипты, тесты) вызовы идут
+напрямую.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import EditMessageText
+
+logger = logging.getLogger(__name__)
+
+OUTBOUND_QUEUE = os.getenv("OUTBOUND_QUEUE", "1").lower() in ("1", "true", "yes")
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", "30"))
+OUTBOUND_CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+OUTBOUND_CHAT_BURST = int(os.getenv("OUTBOUND_CHAT_BURST", "3"))
+OUTBOUND_GROUP_RATE = float(os.getenv("OUTBOUND_GROUP_RATE", str(20 / 60)))
+OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "3"))
+OUTBOUND_DEDUP_SECONDS = float(os.getenv("OUTBOUND_DEDUP_SECONDS", "3"))
+
+_DEDUP_MAX_ENTRIES = 10_000
+
+# Методы Bot API, которые идут через очередь чата (по префиксу имени)
+QUEUED_METHOD_PREFIXES = ("send", "edit", "copy", "forward", "delete", "pin", "unpin")
+UNQUEUED_METHODS = frozenset({"sendChatAction"})
+
+# Вызов уже выполняется воркером очереди - middleware пропускает его напрямую
+_in_worker: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "outbound_in_worker", default=False
+)
+
+ApiCall = Callable[[], Awaitable[Any]]
+MessageKey = Tuple[int, int]  # (chat_id, message_id)
+
+
+class TokenBucket:
+    """Token bucket с резервированием: токен можно взять в долг и подождать"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Взять токен; вернуть, сколько секунд подождать до его появления"""
+        self._refill(time.monotonic())
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Не выдавать токены seconds секунд (ответ retry_after)"""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+    @property
+    def idle(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+@dataclass
+class OutboundStats:
+    """Счетчики исходящей очереди"""
+
+    sent: int = 0
+    edited: int = 0
+    merged: int = 0
+    dropped: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+@dataclass
+class _Job:
+    chat_id: int
+    call: ApiCall
+    future: asyncio.Future
+    message_id: Optional[int] = None
+    fingerprint: Optional[str] = None
+    # Контекст вызывающего (трассировка обновления для фазы telegram_api):
+    # воркер чата создан первым вызовом и иначе выполнял бы все в его контексте
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+
+def edit_fingerprint(text: str, **kwargs: Any) -> str:
+    """Отпечаток содержимого правки (текст, разметка, клавиатура)"""
+    payload = {"text": text}
+    for name, value in kwargs.items():
+        if hasattr(value, "model_dump"):
+            value = value.model_dump(exclude_none=True)
+        payload[name] = value
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class OutboundDispatcher:
+    """Очереди исходящих вызовов по чатам с лимитами Telegram"""
+
+    def __init__(
+        self,
+        global_rate: float = OUTBOUND_GLOBAL_RATE,
+        chat_rate: float = OUTBOUND_CHAT_RATE,
+        chat_burst: int = OUTBOUND_CHAT_BURST,
+        group_rate: float = OUTBOUND_GROUP_RATE,
+        max_retries: int = OUTBOUND_MAX_RETRIES,
+        dedup_seconds: float = OUTBOUND_DEDUP_SECONDS,
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.dedup_seconds = dedup_seconds
+        self.stats = OutboundStats()
+
+        self._global = TokenBucket(global_rate, global_rate)
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._queues: Dict[int, Deque[_Job]] = {}
+        self._queued_edits: Dict[MessageKey, _Job] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        # (chat_id, message_id) -> (отпечаток, время) последней отправленной правки
+        self._applied: "OrderedDict[MessageKey, Tuple[str, float]]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def active(self) -> bool:
+        """Запущен ли диспетчер в текущем event loop"""
+        if self._loop is None:
+            return False
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    @property
+    def pending(self) -> int:
+        return sum(len(queue) for queue in list(self._queues.values()))
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        """Дождаться отправки очереди и выключить диспетчер"""
+        workers = list(self._workers.values())
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+        self._loop = None
+
+    # ----------------------------------------------------------------- API
+
+    async def send(self, chat_id: int, call: ApiCall) -> Any:
+        """Поставить вызов в очередь чата и дождаться результата"""
+        job = _Job(chat_id, call, self._loop.create_future())
+        self._enqueue(job)
+        return await asyncio.shield(job.future)
+
+    async def edit(
+        self, chat_id: int, message_id: int, call: ApiCall, fingerprint: Optional[str] = None
+    ) -> Any:
+        """Правка сообщения: ждущая в очереди правка того же сообщения заменяется"""
+        key = (chat_id, message_id)
+        queued = self._queued_edits.get(key)
+        if queued is not None:
+            queued.call = call
+            queued.fingerprint = fingerprint
+            queued.context = contextvars.copy_context()
+            self.stats.merged += 1
+            return await asyncio.shield(queued.future)
+
+        job = _Job(chat_id, call, self._loop.create_future(), message_id, fingerprint)
+        self._queued_edits[key] = job
+        self._enqueue(job)
+        return await asyncio.shield(job.future)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**asdict(self.stats), "pending": self.pending, "chats": len(self._queues)}
+
+    # ------------------------------------------------------------ internals
+
+    def _enqueue(self, job: _Job) -> None:
+        self._queues.setdefault(job.chat_id, deque()).append(job)
+        if job.chat_id not in self._workers:
+            self._workers[job.chat_id] = self._loop.create_task(self._worker(job.chat_id))
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = self._buckets[chat_id] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    async def _worker(self, chat_id: int) -> None:
+        queue = self._queues[chat_id]
+        try:
+            while queue:
+                job = queue.popleft()
+                if job.message_id is not None:
+                    # Правка ушла в работу: следующие правки встают в очередь заново
+                    self._queued_edits.pop((chat_id, job.message_id), None)
+                await self._execute(job)
+        finally:
+            del self._queues[chat_id]
+            del self._workers[chat_id]
+            if self._buckets.get(chat_id) is not None and self._buckets[chat_id].idle:
+                del self._buckets[chat_id]
+
+    def _is_duplicate_edit(self, job: _Job) -> bool:
+        if job.fingerprint is None:
+            return False
+        applied = self._applied.get((job.chat_id, job.message_id))
+        return (
+            applied is not None
+            and applied[0] == job.fingerprint
+            and time.monotonic() - applied[1] < self.dedup_seconds
+        )
+
+    def _remember_edit(self, job: _Job) -> None:
+        if job.fingerprint is None:
+            return
+        key = (job.chat_id, job.message_id)
+        self._applied[key] = (job.fingerprint, time.monotonic())
+        self._applied.move_to_end(key)
+        while len(self._applied) > _DEDUP_MAX_ENTRIES:
+            self._applied.popitem(last=False)
+
+    async def _execute(self, job: _Job) -> None:
+        if job.message_id is not None and self._is_duplicate_edit(job):
+            self.stats.dropped += 1
+            job.future.set_result(None)
+            return
+
+        bucket = self._bucket(job.chat_id)
+        for attempt in range(self.max_retries + 1):
+            delay = max(bucket.reserve(), self._global.reserve())
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                result = await self._loop.create_task(_run_in_worker(job.call), context=job.context)
+            except TelegramRetryAfter as e:
+                if attempt >= self.max_retries:
+                    self.stats.failed += 1
+                    job.future.set_exception(e)
+                    return
+                self.stats.retried += 1
+                logger.warning(f"⏳ Flood limit for chat {job.chat_id}: retry in {e.retry_after}s")
+                bucket.pause(e.retry_after)
+            except Exception as e:  # noqa: BLE001 - ошибку получает вызывающий код
+                self.stats.failed += 1
+                job.future.set_exception(e)
+                return
+            else:
+                if job.message_id is None:
+                    self.stats.sent += 1
+                else:
+                    self.stats.edited += 1
+                    self._remember_edit(job)
+                job.future.set_result(result)
+                return
+
+
+async def _run_in_worker(call: ApiCall) -> Any:
+    _in_worker.set(True)
+    return await call()
+
+
+def is_queued_method(method: Any) -> bool:
+    """Отправляет или меняет ли вызов сообщение в чате с числовым chat_id"""
+    name = getattr(method, "__api_method__", "")
+    chat_id = getattr(method, "chat_id", None)
+    return (
+        isinstance(chat_id, int)
+        and name.startswith(QUEUED_METHOD_PREFIXES)
+        and name not in UNQUEUED_METHODS
+    )
+
+
+def method_fingerprint(method: EditMessageText) -> str:
+    """Отпечаток editMessageText (см. edit_fingerprint)"""
+    fields = method.model_dump(
+        exclude={"chat_id", "message_id", "inline_message_id", "text"}, exclude_none=True
+    )
+    return edit_fingerprint(method.text, **fields)
+
+
+class OutboundRequestMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: вызовы, отправляющие сообщения, идут через очередь чата"""
+
+    def __init__(self, dispatcher: Optional[OutboundDispatcher] = None):
+        self._dispatcher = dispatcher
+
+    async def __call__(self, make_request, bot: Bot, method):
+        dispatcher = self._dispatcher or get_outbound_dispatcher()
+        if not dispatcher.active or _in_worker.get() or not is_queued_method(method):
+            return await make_request(bot, method)
+
+        call = partial(make_request, bot, method)
+        if isinstance(method, EditMessageText) and method.message_id is not None:
+            return await dispatcher.edit(
+                method.chat_id, method.message_id, call, method_fingerprint(method)
+            )
+        return await dispatcher.send(method.chat_id, call)
+
+
+_dispatcher: Optional[OutboundDispatcher] = None
+
+
+def get_outbound_dispatcher() -> OutboundDispatcher:
+    """Глобальный диспетчер исходящих вызовов"""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = OutboundDispatcher()
+    return _dispatcher
+
+
+def install_outbound_queue(bot: Bot) -> OutboundDispatcher:
+    """Запустить диспетчер и подключить его middleware к сессии бота"""
+    dispatcher = get_outbound_dispatcher()
+    dispatcher.start()
+    bot.session.middleware(OutboundRequestMiddleware(dispatcher))
+    return dispatcher
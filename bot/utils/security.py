@@ -5,6 +5,9 @@ Contains security-related utilities for bot protection:
 - Message sanitization
 - Anti-spam filtering
 - Pin control helpers
+
+Send/edit calls are rate-limited by the outbound queue middleware on the bot
+session (bot/utils/outbound.py).
 """
 
 import re
@@ -77,9 +80,13 @@ class AntiSpamGuard:
     """Anti-spam protection for pinned messages"""
 
     def __init__(self):
-        self.settings = get_settings()
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def settings(self):
+        # Cached singleton: picks up /reload_settings without recreating the guard
+        return get_settings()
+
     def is_spam_content(self, text: str) -> bool:
         """
         Check if message content contains spam keywords
@@ -136,9 +143,13 @@ class ChatWhitelistFilter:
     """Filters incoming messages based on chat whitelist"""
 
     def __init__(self):
-        self.settings = get_settings()
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def settings(self):
+        # Cached singleton: picks up /reload_settings without recreating the guard
+        return get_settings()
+
     def is_chat_allowed(self, chat_id: int) -> bool:
         """
         Check if chat is allowed to receive bot messages
@@ -0,0 +1,175 @@
+"""
+🔥 Startup Warm-up - прогрев кешей до приема обновлений
+
+Без прогрева первый пользователь после деплоя платит за разбор YAML
+каталога и правил, поиск шрифтов, загрузку A/B назначений и корзин.
+run_warmup() выполняет эти инициализаторы параллельно в пуле потоков до
+старта polling/webhook, логирует время каждого и выставляет флаг
+готовности, который отдает /health (503, пока прогрев не завершен).
+
+Ошибка одного компонента не останавливает старт: он прогреется лениво
+при первом обращении, как раньше.
+
+Настройка через переменные окружения:
+    WARMUP_WORKERS   число потоков прогрева (по умолчанию - по числу компонентов)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", "0"))
+
+
+@dataclass
+class ComponentResult:
+    """Результат прогрева одного компонента"""
+
+    name: str
+    seconds: float
+    ok: bool
+    detail: Optional[str] = None
+
+
+@dataclass
+class WarmupState:
+    """Флаг готовности и тайминги прогрева процесса"""
+
+    ready: bool = False
+    started_at: Optional[float] = None
+    seconds: Optional[float] = None
+    components: List[ComponentResult] = field(default_factory=list)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "seconds": self.seconds,
+            "components": [asdict(c) for c in self.components],
+        }
+
+
+_state = WarmupState()
+
+
+def get_warmup_state() -> WarmupState:
+    """Состояние прогрева текущего процесса"""
+    return _state
+
+
+def is_ready() -> bool:
+    return _state.ready
+
+
+# ------------------------------------------------------------- components
+
+
+def _warm_catalog() -> str:
+    from config.env import get_settings
+    from engine.catalog_store import CatalogStore
+
+    store = CatalogStore.instance(get_settings().catalog_path)
+    return f"{len(store.get())} products"
+
+
+def _warm_engine_rules() -> str:
+    from engine.engine_context import get_engine_context
+
+    rules = get_engine_context().rules
+    return f"{len(rules.matrix)} rule pairs"
+
+
+def _warm_pdf_fonts() -> None:
+    from bot.ui.pdf_fonts import warm_font_registry
+
+    warm_font_registry()
+
+
+def _warm_ab_assignments() -> str:
+    from engine.ab_testing import get_ab_testing_framework
+
+    framework = get_ab_testing_framework()
+    return f"{len(framework.user_assignments)} users"
+
+
+def _warm_carts() -> None:
+    from services.cart_store import get_cart_store
+
+    get_cart_store()
+
+
+def _collect_report_cache() -> str:
+    from bot.ui.report_cache import get_report_cache
+
+    return f"removed {get_report_cache().collect_garbage()} unreferenced PDFs"
+
+
+DEFAULT_COMPONENTS: Dict[str, Callable[[], Any]] = {
+    "catalog": _warm_catalog,
+    "engine_rules": _warm_engine_rules,
+    "pdf_fonts": _warm_pdf_fonts,
+    "ab_assignments": _warm_ab_assignments,
+    "carts": _warm_carts,
+    "report_cache_gc": _collect_report_cache,
+}
+
+
+def _run_component(name: str, init: Callable[[], Any]) -> ComponentResult:
+    started = time.perf_counter()
+    try:
+        detail = init()
+        ok = True
+    except Exception as e:  # noqa: BLE001
+        detail = f"{type(e).__name__}: {e}"
+        ok = False
+    return ComponentResult(
+        name=name,
+        seconds=round(time.perf_counter() - started, 4),
+        ok=ok,
+        detail=None if detail is None else str(detail),
+    )
+
+
+def _log_component(result: ComponentResult) -> None:
+    icon = "✅" if result.ok else "⚠️"
+    suffix = f" ({result.detail})" if result.detail else ""
+    print(f"{icon} Warm-up {result.name}: {result.seconds * 1000:.0f} ms{suffix}")
+
+
+async def run_warmup(
+    components: Optional[Dict[str, Callable[[], Any]]] = None,
+    max_workers: int = WARMUP_WORKERS,
+) -> WarmupState:
+    """Параллельно прогреть компоненты и выставить флаг готовности"""
+    components = DEFAULT_COMPONENTS if components is None else components
+    state = get_warmup_state()
+    state.ready = False
+    state.started_at = time.time()
+    started = time.perf_counter()
+    print(f"🔥 Warm-up started: {', '.join(components)}")
+
+    loop = asyncio.get_running_loop()
+    workers = max_workers or max(1, min(len(components), 8))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup") as pool:
+        futures = [
+            loop.run_in_executor(pool, _run_component, name, init)
+            for name, init in components.items()
+        ]
+        # Логируем из event loop по мере готовности, чтобы строки потоков не смешивались
+        for finished in asyncio.as_completed(futures):
+            _log_component(await finished)
+        results = [future.result() for future in futures]
+
+    state.components = results
+    state.seconds = round(time.perf_counter() - started, 4)
+    state.ready = True
+    failed = [r.name for r in results if not r.ok]
+    print(
+        f"🔥 Warm-up finished in {state.seconds * 1000:.0f} ms"
+        + (f", failed: {', '.join(failed)}" if failed else "")
+    )
+    return state
@@ -0,0 +1,238 @@
+"""
+🌐 Webhook Server - прием обновлений Telegram через aiohttp
+
+Заменяет Flask + поток с polling: /health и webhook обслуживаются одним
+aiohttp-приложением в том же event loop, что и диспетчер aiogram.
+
+Обновление подтверждается ответом 200 сразу после разбора тела запроса,
+а обрабатывается в фоне: одновременно не больше WEBHOOK_MAX_CONCURRENCY
+обновлений, в ожидании - не больше WEBHOOK_MAX_PENDING. Сверх этого
+отвечаем 429, и Telegram повторит доставку позже. При запущенном
+планировщике (bot/middlewares/update_scheduler.py) параллельность и порядок
+обновлений пользователя определяет он, а здесь остается только лимит ожидания.
+
+/health отвечает 503, пока не завершен прогрев (bot/warmup.py); webhook
+регистрируется в Telegram только после прогрева.
+
+GET /metrics/latency - перцентили обработки обновлений (JSON, см.
+bot/middlewares/latency.py); GET /metrics - Prometheus (bot/metrics.py).
+
+Настройки берутся из TelegramConfig (webhook_base, webhook_path,
+webhook_secret, webapp_port) и переменных окружения:
+    WEBHOOK_MAX_CONCURRENCY   параллельная обработка (по умолчанию 32)
+    WEBHOOK_MAX_PENDING       максимум обновлений в работе (по умолчанию 1000)
+    WEBHOOK_DRAIN_TIMEOUT     ожидание незавершенных обновлений при остановке, сек (10)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from bot.metrics import CONTENT_TYPE, render_metrics
+from bot.middlewares.update_scheduler import get_update_scheduler
+from bot.warmup import get_warmup_state
+from config.env import TelegramConfig
+from engine.latency import get_latency_registry
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "32"))
+WEBHOOK_MAX_PENDING = int(os.getenv("WEBHOOK_MAX_PENDING", "1000"))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "10"))
+
+
+@dataclass
+class WebhookStats:
+    """Счетчики webhook-обработчика"""
+
+    received: int = 0
+    processed: int = 0
+    failed: int = 0
+    rejected: int = 0
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """SimpleRequestHandler с ограничением параллельной фоновой обработки"""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        *,
+        max_concurrency: int = WEBHOOK_MAX_CONCURRENCY,
+        max_pending: int = WEBHOOK_MAX_PENDING,
+        secret_token: Optional[str] = None,
+        **data: Any,
+    ) -> None:
+        super().__init__(
+            dispatcher, bot, handle_in_background=True, secret_token=secret_token, **data
+        )
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pending = max(self.max_concurrency, max_pending)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.stats = WebhookStats()
+
+    @property
+    def pending(self) -> int:
+        """Обновления, принятые, но еще не обработанные"""
+        return len(self._background_feed_update_tasks)
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        async with self._semaphore:
+            try:
+                await super()._background_feed_update(bot, update)
+                self.stats.processed += 1
+            except Exception as e:  # noqa: BLE001
+                self.stats.failed += 1
+                logger.exception(f"❌ Update {update.get('update_id')} failed: {e}")
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        if self.pending >= self.max_pending:
+            self.stats.rejected += 1
+            return web.Response(status=429, headers={"Retry-After": "1"})
+        self.stats.received += 1
+        return await super()._handle_request_background(bot, request)
+
+    async def drain(self, timeout: float = WEBHOOK_DRAIN_TIMEOUT) -> None:
+        """Дождаться обновлений в работе (при остановке сервера)"""
+        tasks = set(self._background_feed_update_tasks)
+        if tasks:
+            print(f"⏳ Waiting for {len(tasks)} in-flight updates...")
+            await asyncio.wait(tasks, timeout=timeout)
+
+    async def close(self) -> None:
+        await self.drain()
+        await super().close()
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**asdict(self.stats), "pending": self.pending}
+
+
+# Ключ приложения с обработчиком webhook (статистика, drain)
+WEBHOOK_HANDLER = web.AppKey("webhook_handler", BoundedRequestHandler)
+
+
+def webhook_url(telegram: TelegramConfig) -> Optional[str]:
+    """Публичный URL webhook (None, если webhook_base не задан)"""
+    if not telegram.webhook_base:
+        return None
+    return telegram.webhook_base.rstrip("/") + "/" + telegram.webhook_path.lstrip("/")
+
+
+def build_webhook_app(
+    bot: Bot,
+    dp: Dispatcher,
+    telegram: TelegramConfig,
+    *,
+    max_concurrency: int = WEBHOOK_MAX_CONCURRENCY,
+    max_pending: int = WEBHOOK_MAX_PENDING,
+    register_webhook: bool = True,
+) -> web.Application:
+    """aiohttp-приложение: POST webhook_path для Telegram и GET /health"""
+    app = web.Application()
+    handler = BoundedRequestHandler(
+        dp,
+        bot,
+        max_concurrency=max_concurrency,
+        max_pending=max_pending,
+        secret_token=telegram.webhook_secret,
+    )
+    handler.register(app, path=telegram.webhook_path)
+    app[WEBHOOK_HANDLER] = handler
+    started_at = time.monotonic()
+
+    async def health(request: web.Request) -> web.Response:
+        # 503 до конца прогрева: балансировщик не шлет трафик на холодный процесс
+        warmup = get_warmup_state()
+        return web.json_response(
+            {
+                "status": "OK" if warmup.ready else "WARMING_UP",
+                "mode": "webhook",
+                "ready": warmup.ready,
+                "uptime": round(time.monotonic() - started_at, 1),
+                "updates": handler.snapshot(),
+                "warmup": warmup.snapshot(),
+            },
+            status=200 if warmup.ready else 503,
+        )
+
+    async def latency(request: web.Request) -> web.Response:
+        return web.json_response({"histograms": get_latency_registry().snapshot()})
+
+    async def metrics(request: web.Request) -> web.Response:
+        body = await asyncio.to_thread(render_metrics)
+        return web.Response(body=body.encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics/latency", latency)
+    app.router.add_get("/metrics", metrics)
+
+    if register_webhook:
+
+        async def on_startup(app: web.Application) -> None:
+            await register_telegram_webhook(bot, dp, telegram)
+
+        app.on_startup.append(on_startup)
+
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def register_telegram_webhook(bot: Bot, dp: Dispatcher, telegram: TelegramConfig) -> None:
+    """Сообщить Telegram URL webhook (если задан webhook_base)"""
+    url = webhook_url(telegram)
+    if not url:
+        print("⚠️ WEBHOOK_BASE is not set - webhook is not registered in Telegram")
+        return
+    await bot.set_webhook(
+        url,
+        secret_token=telegram.webhook_secret,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    print(f"🌐 Webhook registered: {url}")
+
+
+async def run_webhook(
+    bot: Bot,
+    dp: Dispatcher,
+    telegram: TelegramConfig,
+    warmup: Optional[Callable[[], Awaitable[Any]]] = None,
+) -> None:
+    """
+    Запустить webhook-сервер на 0.0.0.0:webapp_port и работать до отмены.
+
+    Сервер поднимается сразу (/health отвечает 503), затем выполняется
+    warmup, и только после него webhook регистрируется в Telegram.
+    """
+    # Запущенный планировщик сам ограничивает параллельность и держит очереди
+    # пользователей: семафор webhook не должен задерживать чужие обновления
+    scheduler = get_update_scheduler()
+    max_concurrency = WEBHOOK_MAX_PENDING if scheduler.active else WEBHOOK_MAX_CONCURRENCY
+    app = build_webhook_app(
+        bot, dp, telegram, register_webhook=False, max_concurrency=max_concurrency
+    )
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host="0.0.0.0", port=telegram.webapp_port)
+    await site.start()
+    print(
+        f"🌐 Webhook server listening on 0.0.0.0:{telegram.webapp_port}"
+        f"{telegram.webhook_path} (max {app[WEBHOOK_HANDLER].max_concurrency} concurrent)"
+    )
+    try:
+        if warmup is not None:
+            await warmup()
+        await register_telegram_webhook(bot, dp, telegram)
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        print("🛑 Webhook server stopped")
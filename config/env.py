@@ -6,10 +6,15 @@ All secrets and configuration should be read from ENV variables only.
 """
 
 import os
-from typing import List, Optional
+import threading
+from functools import cached_property
+from typing import Callable, List, Optional
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings
-from dotenv import load_dotenv
+from dotenv import dotenv_values, load_dotenv
+
+# Keys that come from .env rather than the real process environment (refreshed on reload)
+_DOTENV_KEYS = {key for key in dotenv_values() if key not in os.environ}
 
 # Load .env file at module import
 load_dotenv()
@@ -204,7 +209,7 @@ class Settings(BaseSettings):
             webapp_port=self.webapp_port,
         )
 
-    @property
+    @cached_property
     def partner(self) -> PartnerConfig:
         """Get Partner configuration"""
         return PartnerConfig(
@@ -216,7 +221,7 @@ class Settings(BaseSettings):
             owner_commission=self.owner_commission,
         )
 
-    @property
+    @cached_property
     def catalog(self) -> CatalogConfig:
         """Get Catalog configuration"""
         return CatalogConfig(catalog_path=self.catalog_path)
@@ -256,7 +261,7 @@ class Settings(BaseSettings):
         except ValueError:
             return []
 
-    @property
+    @cached_property
     def security(self) -> SecurityConfig:
         """Get Security configuration"""
         # Parse whitelists from comma-separated strings
@@ -295,14 +300,60 @@ class Settings(BaseSettings):
 
 
 # Global settings instance
-def get_settings() -> Settings:
-    """Get settings instance (singleton pattern)"""
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+_reload_hooks: List[Callable[[Settings], None]] = []
+
+
+def _build_settings() -> Settings:
     try:
         return Settings()
     except Exception as e:
         raise RuntimeError(f"Failed to load environment configuration: {e}")
 
 
+def get_settings() -> Settings:
+    """Get settings instance (singleton pattern, see reload_settings)"""
+    global _settings
+    settings = _settings
+    if settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = _build_settings()
+            settings = _settings
+    return settings
+
+
+def on_settings_reload(hook: Callable[[Settings], None]) -> None:
+    """Register a callback invoked with the new Settings after reload_settings()"""
+    if hook not in _reload_hooks:
+        _reload_hooks.append(hook)
+
+
+def reload_settings() -> Settings:
+    """
+    Re-read .env and the environment, swap the cached Settings and notify hooks.
+
+    Values from the real process environment keep precedence over .env.
+    """
+    global _settings
+    for key, value in dotenv_values().items():
+        if value is not None and (key in _DOTENV_KEYS or key not in os.environ):
+            os.environ[key] = value
+            _DOTENV_KEYS.add(key)
+
+    settings = _build_settings()
+    with _settings_lock:
+        _settings = settings
+    for hook in list(_reload_hooks):
+        try:
+            hook(settings)
+        except Exception as e:  # noqa: BLE001
+            print(f"⚠️ Settings reload hook {getattr(hook, '__name__', hook)} failed: {e}")
+    print("🔄 Settings reloaded")
+    return settings
+
+
 # Convenience function for backwards compatibility
 def load_env():
     """Load and validate environment configuration"""
@@ -3,8 +3,11 @@
 Позволяет тестировать разные варианты подсказок, explain и интерфейса
 """
 
+import atexit
 import hashlib
 import json
+import queue
+import threading
 import time
 import csv
 import os
@@ -84,6 +87,181 @@ class ABConversionMetric:
     session_duration: Optional[float] = None  # Время сессии в секундах
 
 
+CONVERSION_FIELDNAMES = [
+    "user_id",
+    "test_id",
+    "variant_id",
+    "timestamp",
+    "event_type",
+    "category_count",
+    "items_added",
+    "session_duration",
+]
+
+
+class ConversionMetricsWriter:
+    """
+    Буферизованная запись метрик конверсии в CSV.
+
+    Вызывающий код только кладет строку в очередь (без I/O), фоновый поток
+    забирает строки пачками и пишет их через один долгоживущий дескриптор.
+    Поддерживает ротацию по размеру (как RotatingFileHandler) и сброс
+    остатка буфера при завершении процесса.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        batch_size: int = 100,
+        flush_interval: float = 2.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+    ):
+        self.path = Path(path)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._file = None
+        self._writer: Optional[csv.DictWriter] = None
+        self._io_lock = threading.Lock()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        # Статистика для мониторинга
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rotations = 0
+
+    @property
+    def pending(self) -> int:
+        """Количество строк, ожидающих записи"""
+        return self._queue.qsize()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        """Кладет строку в буфер; никогда не блокирует на диске"""
+        if self._closed:
+            return
+        self._ensure_thread()
+        self._queue.put(row)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Синхронно дожидается записи всех строк, поставленных до вызова"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put({"__flush__": done})
+        return done.wait(timeout)
+
+    async def aflush(self, timeout: float = 5.0) -> bool:
+        """Асинхронный вариант flush() - ожидание вынесено из event loop"""
+        import asyncio
+
+        return await asyncio.to_thread(self.flush, timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Сбрасывает буфер и закрывает файл"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+        with self._io_lock:
+            self._close_file()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ab-conversion-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        stop = False
+        while not stop:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            flush_event = None
+            if item is None:
+                stop = True
+            elif isinstance(item, dict) and "__flush__" in item:
+                flush_event = item["__flush__"]
+            elif item is not False:
+                batch.append(item)
+
+            if (
+                stop
+                or flush_event is not None
+                or len(batch) >= self.batch_size
+                or time.monotonic() >= deadline
+            ):
+                if batch:
+                    self._write_batch(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+            if flush_event is not None:
+                flush_event.set()
+
+    def _write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        with self._io_lock:
+            try:
+                self._open_file()
+                self._writer.writerows(rows)
+                self._file.flush()
+                self.rows_written += len(rows)
+                self.batches_written += 1
+                if self.max_bytes and self._file.tell() >= self.max_bytes:
+                    self._rotate()
+            except Exception as e:
+                print(f"⚠️ Failed to write A/B conversion metrics: {e}")
+                self._close_file()
+
+    def _open_file(self) -> None:
+        if self._file is not None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        needs_header = not self.path.exists() or self.path.stat().st_size == 0
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=CONVERSION_FIELDNAMES)
+        if needs_header:
+            self._writer.writeheader()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+        self._file = None
+        self._writer = None
+
+    def _rotate(self) -> None:
+        """conversion_metrics.csv -> .1 -> .2 ...; каждый файл со своим заголовком"""
+        self._close_file()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = self.path.with_name(f"{self.path.name}.{i}")
+                if src.exists():
+                    os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+        self.rotations += 1
+
+
 class ABTestingFramework:
     """Фреймворк для A/B тестирования"""
 
@@ -106,6 +284,9 @@ class ABTestingFramework:
         # Создаем CSV файл если не существует
         self._ensure_csv_headers()
 
+        # Буферизованная запись метрик конверсии (без I/O в обработчиках)
+        self.conversion_writer = ConversionMetricsWriter(self.conversion_metrics_file)
+
     def create_test(
         self, test_id: str, name: str, description: str, variants: List[ABVariant]
     ) -> ABTest:
@@ -199,32 +380,27 @@ class ABTestingFramework:
         return variant.content.get(content_key, default_value)
 
     def log_conversion_metric(self, metric: ABConversionMetric):
-        """Записывает метрику конверсии в CSV"""
-        with open(self.conversion_metrics_file, "a", newline="", encoding="utf-8") as csvfile:
-            fieldnames = [
-                "user_id",
-                "test_id",
-                "variant_id",
-                "timestamp",
-                "event_type",
-                "category_count",
-                "items_added",
-                "session_duration",
-            ]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-            writer.writerow(
-                {
-                    "user_id": metric.user_id,
-                    "test_id": metric.test_id,
-                    "variant_id": metric.variant_id,
-                    "timestamp": metric.timestamp,
-                    "event_type": metric.event_type,
-                    "category_count": metric.category_count,
-                    "items_added": metric.items_added,
-                    "session_duration": metric.session_duration,
-                }
-            )
+        """Записывает метрику конверсии в CSV (через буфер, пачками)"""
+        self.conversion_writer.write(
+            {
+                "user_id": metric.user_id,
+                "test_id": metric.test_id,
+                "variant_id": metric.variant_id,
+                "timestamp": metric.timestamp,
+                "event_type": metric.event_type,
+                "category_count": metric.category_count,
+                "items_added": metric.items_added,
+                "session_duration": metric.session_duration,
+            }
+        )
+
+    def flush_conversion_metrics(self, timeout: float = 5.0) -> bool:
+        """Дожидается записи всех накопленных метрик конверсии"""
+        return self.conversion_writer.flush(timeout)
+
+    def close(self) -> None:
+        """Сбрасывает буферы и закрывает файлы"""
+        self.conversion_writer.close()
 
     def get_ab_flag(self, flag_name: str, default_value: str = "A") -> str:
         """Получает значение A/B флага из переменных окружения"""
@@ -441,17 +617,7 @@ class ABTestingFramework:
         """Создает CSV файл с заголовками если он не существует"""
         if not self.conversion_metrics_file.exists():
             with open(self.conversion_metrics_file, "w", newline="", encoding="utf-8") as csvfile:
-                fieldnames = [
-                    "user_id",
-                    "test_id",
-                    "variant_id",
-                    "timestamp",
-                    "event_type",
-                    "category_count",
-                    "items_added",
-                    "session_duration",
-                ]
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer = csv.DictWriter(csvfile, fieldnames=CONVERSION_FIELDNAMES)
                 writer.writeheader()
 
     def _load_tests(self) -> Dict[str, ABTest]:
@@ -547,6 +713,15 @@ def get_ab_testing_framework() -> ABTestingFramework:
     return _ab_framework
 
 
+def shutdown_ab_testing_framework() -> None:
+    """Сбрасывает буфер метрик конверсии глобального экземпляра (при остановке бота)"""
+    if _ab_framework is not None:
+        _ab_framework.close()
+
+
+atexit.register(shutdown_ab_testing_framework)
+
+
 def setup_default_ab_tests():
     """Настраивает дефолтные A/B тесты для подсказок и explain"""
 
@@ -8,6 +8,7 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 from config.env import get_settings
 from engine.analytics import AnalyticsTracker
+from engine.url_intel import get_url_intel
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,9 +32,11 @@ class AffiliateManager:
     def __init__(self):
         self.settings = get_settings()
         self.analytics = AnalyticsTracker()
+        self.affiliate_configs = self._build_affiliate_configs()
 
+    def _build_affiliate_configs(self) -> Dict[str, Dict[str, Any]]:
         # Конфигурация партнерских параметров для разных источников
-        self.affiliate_configs = {
+        return {
             "goldapple": {
                 "aff_param": "partner",
                 "campaign_param": "utm_campaign",
@@ -70,6 +73,12 @@ class AffiliateManager:
             },
         }
 
+    def reload_settings(self) -> None:
+        """Перечитать партнерские коды и сбросить закешированные ссылки"""
+        self.settings = get_settings()
+        self.affiliate_configs = self._build_affiliate_configs()
+        get_url_intel().invalidate("affiliate")
+
     def add_affiliate_params(self, url: str, source: str, campaign: Optional[str] = None) -> str:
         """Добавляет партнерские параметры к URL
 
@@ -91,22 +100,9 @@ class AffiliateManager:
             return url
 
         try:
-            parsed = urllib.parse.urlparse(url)
-            params = urllib.parse.parse_qs(parsed.query)
-
-            # Добавляем партнерские параметры
-            params[config["aff_param"]] = [config["partner_code"]]
-            params[config["source_param"]] = [source]
-            params[config["medium_param"]] = ["affiliate"]
-
-            if campaign:
-                params[config["campaign_param"]] = [campaign]
-            else:
-                params[config["campaign_param"]] = [config["campaign"]]
-
-            # Реконструируем URL
-            new_query = urllib.parse.urlencode(params, doseq=True)
-            new_url = parsed._replace(query=new_query).geturl()
+            # Шаблон параметров и готовая ссылка кешируются в url_intel
+            intel = get_url_intel()
+            new_url = intel.affiliate_url(url, intel.template(source, config), campaign)
 
             logger.info(f"Affiliate URL generated: {source} -> {new_url}")
             return new_url
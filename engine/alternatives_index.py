@@ -0,0 +1,214 @@
+"""
+🔄 Alternatives Index - заранее посчитанные замены для товаров не в наличии
+
+Строится при загрузке каталога (см. CatalogStore). Для каждого товара
+хранится ранжированный список кандидатов из той же категории:
+
+    same_brand       тот же бренд
+    neighbor_shade   соседние оттенки (по карте соседей ShadeNormalizer)
+    same_depth       та же глубина оттенка
+    season_universal универсальные оттенки сезона (добавляются при запросе)
+    other_brand      остальные бренды категории
+
+Внутри уровня кандидаты упорядочены по приоритету источника, затем по
+порядку каталога. Наличие хранится отдельно: смена in_stock - это O(1)
+обновление, а недоступные кандидаты пропускаются при выдаче.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import Product
+from .shade_normalization import ShadeInfo, ShadeNormalizer, get_shade_normalizer
+
+SAME_BRAND = "same_brand"
+NEIGHBOR_SHADE = "neighbor_shade"
+SAME_DEPTH = "same_depth"
+SEASON_UNIVERSAL = "season_universal"
+OTHER_BRAND = "other_brand"
+
+
+@dataclass(frozen=True)
+class Alternative:
+    """Кандидат на замену и причина, по которой он подобран"""
+
+    product: Product
+    reason: str
+
+
+def _category_key(category: Any) -> str:
+    return str(category or "").lower()
+
+
+def _brand_key(brand: Any) -> str:
+    return str(brand or "").lower()
+
+
+class AlternativesIndex:
+    """Индекс замен для товаров каталога"""
+
+    def __init__(
+        self,
+        catalog: Iterable[Product],
+        normalizer: Optional[ShadeNormalizer] = None,
+        priority: Optional[Callable[[Product], int]] = None,
+    ):
+        self._normalizer = normalizer or get_shade_normalizer()
+        self._priority = priority or (lambda product: 0)
+        self._shade_by_name: Dict[str, ShadeInfo] = {}
+        self._lock = threading.Lock()
+
+        self._products: Dict[str, Product] = {}
+        self._in_stock: Dict[str, bool] = {}
+        self._shades: Dict[str, ShadeInfo] = {}
+        # category -> ключи в порядке (приоритет источника, порядок каталога)
+        self._by_category: Dict[str, List[str]] = defaultdict(list)
+        self._by_category_shade: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+        # key -> ((candidate_key, reason), ...) без season_universal
+        self._ranked: Dict[str, Tuple[Tuple[str, str], ...]] = {}
+
+        self._build(list(catalog))
+
+    # -------------------------------------------------------------- build
+
+    def _build(self, catalog: List[Product]) -> None:
+        order: Dict[str, Tuple[int, int]] = {}
+        for position, product in enumerate(catalog):
+            key = getattr(product, "key", None)
+            if not key or key in self._products:
+                continue
+            self._products[key] = product
+            self._in_stock[key] = bool(product.in_stock)
+            self._shades[key] = self.shade_info(product)
+            order[key] = (self._priority(product), position)
+
+        for key in sorted(self._products, key=order.__getitem__):
+            product = self._products[key]
+            category = _category_key(product.category)
+            self._by_category[category].append(key)
+            self._by_category_shade[(category, self._shades[key].shade_id)].append(key)
+
+        for key in self._products:
+            self._ranked[key] = self._rank(key)
+
+    def _rank(self, key: str) -> Tuple[Tuple[str, str], ...]:
+        product = self._products[key]
+        category = _category_key(product.category)
+        brand = _brand_key(product.brand)
+        shade = self._shades[key]
+        candidates = [c for c in self._by_category[category] if c != key]
+
+        ranked: List[Tuple[str, str]] = []
+        seen: Set[str] = set()
+
+        def add(candidate_keys: Iterable[str], reason: str) -> None:
+            for candidate in candidate_keys:
+                if candidate not in seen and candidate != key:
+                    seen.add(candidate)
+                    ranked.append((candidate, reason))
+
+        add((c for c in candidates if _brand_key(self._products[c].brand) == brand), SAME_BRAND)
+        if not shade.shade_id.startswith("unknown"):
+            for neighbor_id in self._normalizer.get_shade_neighbors(shade.shade_id):
+                add(self._by_category_shade.get((category, neighbor_id), ()), NEIGHBOR_SHADE)
+        if shade.depth:
+            add((c for c in candidates if self._shades[c].depth == shade.depth), SAME_DEPTH)
+        add(candidates, OTHER_BRAND)
+        return tuple(ranked)
+
+    # ------------------------------------------------------------- lookup
+
+    def get_product(self, key: str) -> Optional[Product]:
+        return self._products.get(key)
+
+    def shade_info(self, product: Any) -> ShadeInfo:
+        """Нормализованный оттенок (нормализация выполняется один раз на имя)"""
+        name = getattr(product, "shade_name", None) or ""
+        info = self._shade_by_name.get(name)
+        if info is None:
+            info = self._normalizer.normalize_shade(name)
+            with self._lock:
+                self._shade_by_name[name] = info
+        return info
+
+    def is_available(self, key: str) -> bool:
+        return self._in_stock.get(key, False)
+
+    def set_in_stock(self, key: str, in_stock: bool) -> bool:
+        """Обновляет наличие товара; True, если значение изменилось"""
+        if key not in self._in_stock:
+            return False
+        changed = self._in_stock[key] != bool(in_stock)
+        self._in_stock[key] = bool(in_stock)
+        return changed
+
+    def alternatives(
+        self, key: str, limit: Optional[int] = 3, season: Optional[str] = None
+    ) -> List[Alternative]:
+        """Доступные замены для товара каталога (лучшие первыми; limit=None - все)"""
+        ranked = self._ranked.get(key)
+        if ranked is None:
+            return []
+
+        universals: Tuple[Tuple[str, str], ...] = ()
+        if season:
+            category = _category_key(self._products[key].category)
+            universals = tuple(
+                (candidate, SEASON_UNIVERSAL)
+                for shade_id in self._normalizer.get_season_universals(season)
+                for candidate in self._by_category_shade.get((category, shade_id), ())
+            )
+
+        result: List[Alternative] = []
+        seen: Set[str] = set()
+        for candidate, reason in self._with_universals(ranked, universals):
+            if limit is not None and len(result) >= limit:
+                break
+            if candidate in seen or candidate == key or not self._in_stock.get(candidate):
+                continue
+            seen.add(candidate)
+            result.append(Alternative(self._products[candidate], reason))
+        return result
+
+    def category_alternatives(
+        self,
+        category: str,
+        brand: Optional[str] = None,
+        exclude: Optional[str] = None,
+        limit: Optional[int] = 3,
+    ) -> List[Alternative]:
+        """Замены для товара вне каталога: сначала тот же бренд, затем остальные"""
+        keys = [k for k in self._by_category.get(_category_key(category), ()) if k != exclude]
+        brand_key = _brand_key(brand)
+        same_brand = [k for k in keys if brand and _brand_key(self._products[k].brand) == brand_key]
+        others = [k for k in keys if k not in same_brand]
+
+        result: List[Alternative] = []
+        for candidates, reason in ((same_brand, SAME_BRAND), (others, OTHER_BRAND)):
+            for candidate in candidates:
+                if limit is not None and len(result) >= limit:
+                    return result
+                if self._in_stock.get(candidate):
+                    result.append(Alternative(self._products[candidate], reason))
+        return result
+
+    @staticmethod
+    def _with_universals(
+        ranked: Tuple[Tuple[str, str], ...], universals: Tuple[Tuple[str, str], ...]
+    ) -> Iterable[Tuple[str, str]]:
+        # Универсальные оттенки сезона идут перед остальными брендами категории
+        if not universals:
+            yield from ranked
+            return
+        inserted = False
+        for item in ranked:
+            if not inserted and item[1] == OTHER_BRAND:
+                yield from universals
+                inserted = True
+            yield item
+        if not inserted:
+            yield from universals
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-import yaml
 from typing import Dict, List, Any, Tuple
 from pathlib import Path
 
 from .models import UserProfile, Product, ReportData, Undertone
+from .engine_context import get_engine_context
+from .rule_engine import DONT, CompiledRules
 
 
 class AnswerExpanderV2:
@@ -12,50 +13,27 @@ class AnswerExpanderV2:
 
     def __init__(self, rules_path: str = "deliverables/Engine_v2/RULES"):
         self.rules_path = Path(rules_path)
-        self._compatibility_rules = self._load_compatibility_rules()
-        self._layering_rules = self._load_layering_rules()
-        self._cautions = self._load_cautions()
-
-    def _load_compatibility_rules(self) -> Dict[str, Any]:
-        """Load active ingredient compatibility matrix"""
-        try:
-            with open(self.rules_path / "compatibility_matrix.yaml", "r", encoding="utf-8") as f:
-                return yaml.safe_load(f) or {}
-        except Exception:
-            return {
-                "incompatible_pairs": [
-                    ["retinol", "vitamin_c"],
-                    ["retinol", "aha"],
-                    ["retinol", "bha"],
-                    ["vitamin_c", "niacinamide"],
-                    ["benzoyl_peroxide", "retinol"],
-                ],
-                "avoid_with_sensitive": ["retinol", "aha", "bha", "fragrance"],
-            }
+        self._rules_key = str(rules_path)
 
-    def _load_layering_rules(self) -> Dict[str, Any]:
-        """Load product layering order rules"""
-        try:
-            with open(self.rules_path / "layering_order.yaml", "r", encoding="utf-8") as f:
-                return yaml.safe_load(f) or {}
-        except Exception:
-            return {
-                "morning_order": ["cleanser", "toner", "serum", "moisturizer", "spf"],
-                "evening_order": ["cleanser", "toner", "treatment", "serum", "moisturizer", "oil"],
-                "ph_order": ["low_ph_first", "water_based", "oil_based", "occlusive"],
-            }
+    # Правила компилируются один раз на процесс (engine.engine_context)
+    @property
+    def _rules(self) -> CompiledRules:
+        return get_engine_context(self._rules_key).rules
 
-    def _load_cautions(self) -> Dict[str, Any]:
-        """Load cautions and warnings"""
-        try:
-            with open(self.rules_path / "cautions.yaml", "r", encoding="utf-8") as f:
-                return yaml.safe_load(f) or {}
-        except Exception:
-            return {
-                "pregnancy_avoid": ["retinol", "retinoids", "high_salicylic_acid", "hydroquinone"],
-                "sensitive_skin_avoid": ["fragrance", "essential_oils", "high_alcohol"],
-                "sun_sensitivity": ["retinol", "aha", "bha", "vitamin_c"],
-            }
+    @property
+    def _compatibility_rules(self) -> Dict[str, Any]:
+        """Active ingredient compatibility matrix"""
+        return self._rules.compatibility
+
+    @property
+    def _layering_rules(self) -> Dict[str, Any]:
+        """Product layering order rules"""
+        return self._rules.layering
+
+    @property
+    def _cautions(self) -> Dict[str, Any]:
+        """Cautions and warnings"""
+        return self._rules.cautions
 
     def generate_tldr_report(self, report_data: ReportData) -> str:
         """Generate TL;DR (short) report"""
@@ -418,9 +396,15 @@ class AnswerExpanderV2:
         for product in products:
             actives_used.extend(product.actives)
 
-        for pair in self._compatibility_rules.get("incompatible_pairs", []):
-            if all(any(active.lower() in pair for active in actives_used) for active in pair):
-                warnings.append(f"⚠️ Не используйте {pair[0]} и {pair[1]} одновременно")
+        for conflict in self._rules.conflicts(actives_used):
+            if conflict.level == DONT:
+                warnings.append(
+                    f"⚠️ Не используйте {conflict.first} и {conflict.second} одновременно"
+                )
+            else:
+                warnings.append(
+                    f"⚠️ {conflict.first} и {conflict.second}: с осторожностью, лучше разносить"
+                )
 
         if warnings:
             return "# ⚠️ ВАЖНЫЕ ПРЕДУПРЕЖДЕНИЯ\n\n" + "\n".join(warnings)
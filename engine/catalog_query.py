@@ -0,0 +1,292 @@
+"""
+🔎 Catalog Query - компонуемые запросы к каталогу по инвертированным индексам
+
+CatalogIndex строится при загрузке каталога (см. CatalogStore) и хранит
+posting lists - отсортированные позиции продуктов каталога:
+
+    category / subcategory / finish   значение в нижнем регистре -> позиции
+    tags / actives                    каждый тег / актив -> позиции
+    undertone                         undertone_match -> позиции
+    in_stock                          позиции товаров в наличии
+    price                             позиции, отсортированные по цене
+
+CatalogQuery неизменяем: каждый предикат возвращает новый запрос.
+
+    store.query().category("serum").actives_any(["bha"]).in_stock().page(1, 8)
+
+При выполнении каждый предикат дает posting list (any-предикаты - слияние
+списков значений), списки пересекаются от самого короткого, а продукты
+выдаются лениво в порядке каталога.
+"""
+
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .models import Product
+
+Posting = Sequence[int]
+
+
+def _key(value: Any) -> str:
+    value = getattr(value, "value", value)
+    return str(value).strip().lower()
+
+
+def _union(postings: Iterable[Posting]) -> List[int]:
+    """Объединение отсортированных списков без повторов"""
+    result: List[int] = []
+    for position in heapq.merge(*postings):
+        if not result or result[-1] != position:
+            result.append(position)
+    return result
+
+
+def _intersect(small: Posting, large: Posting) -> List[int]:
+    """Пересечение отсортированных списков (small - более короткий)"""
+    if len(small) * 8 < len(large):
+        # Короткий список: бинарный поиск каждой позиции в длинном
+        result = []
+        lo = 0
+        for position in small:
+            lo = bisect_left(large, position, lo)
+            if lo == len(large):
+                break
+            if large[lo] == position:
+                result.append(position)
+        return result
+
+    result, i, j = [], 0, 0
+    while i < len(small) and j < len(large):
+        if small[i] == large[j]:
+            result.append(small[i])
+            i += 1
+            j += 1
+        elif small[i] < large[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+@dataclass
+class Page:
+    """Страница результатов (page уже приведен к диапазону 1..pages)"""
+
+    items: List[Product]
+    page: int
+    pages: int
+    total: int
+
+
+class CatalogIndex:
+    """Инвертированные индексы одного снимка каталога"""
+
+    def __init__(self, catalog: Iterable[Product]):
+        self.products: List[Product] = list(catalog)
+        self._fields: Dict[str, Dict[str, List[int]]] = {
+            "category": {},
+            "subcategory": {},
+            "finish": {},
+            "undertone": {},
+            "tags": {},
+            "actives": {},
+        }
+        self._in_stock: List[int] = []
+        self._prices: List[Tuple[float, int]] = []
+        # id(product) -> позиция (для точечного обновления наличия)
+        self._positions: Dict[int, int] = {}
+
+        for position, product in enumerate(self.products):
+            self._positions[id(product)] = position
+            self._add("category", product.category, position)
+            self._add("subcategory", product.subcategory, position)
+            self._add("finish", product.finish, position)
+            self._add("undertone", product.undertone_match, position)
+            for tag in set(map(_key, product.tags or [])):
+                self._add("tags", tag, position)
+            for active in set(map(_key, product.actives or [])):
+                self._add("actives", active, position)
+            if product.in_stock:
+                self._in_stock.append(position)
+            if product.price is not None:
+                self._prices.append((float(product.price), position))
+        self._prices.sort()
+
+    def _add(self, field_name: str, value: Any, position: int) -> None:
+        if value is None or value == "":
+            return
+        self._fields[field_name].setdefault(_key(value), []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    # ------------------------------------------------------------ postings
+
+    def posting(self, field_name: str, values: Iterable[Any]) -> List[int]:
+        """Позиции продуктов, у которых поле совпадает с любым из значений"""
+        index = self._fields[field_name]
+        return _union(index.get(_key(v), ()) for v in values)
+
+    def posting_containing(self, field_name: str, fragments: Iterable[str]) -> List[int]:
+        """Позиции, у которых значение поля содержит любой из фрагментов"""
+        fragments = [_key(f) for f in fragments]
+        index = self._fields[field_name]
+        return _union(
+            positions
+            for value, positions in index.items()
+            if any(fragment in value for fragment in fragments)
+        )
+
+    def in_stock_posting(self) -> List[int]:
+        return self._in_stock
+
+    def price_posting(self, low: Optional[float], high: Optional[float]) -> List[int]:
+        start = 0 if low is None else bisect_left(self._prices, (float(low), -1))
+        end = (
+            len(self._prices)
+            if high is None
+            else bisect_right(self._prices, (float(high), len(self)))
+        )
+        return sorted(position for _, position in self._prices[start:end])
+
+    def set_in_stock(self, product: Product, in_stock: bool) -> None:
+        """Инкрементально обновить posting list наличия"""
+        position = self._positions.get(id(product))
+        if position is None or self.products[position] is not product:
+            return
+        i = bisect_left(self._in_stock, position)
+        present = i < len(self._in_stock) and self._in_stock[i] == position
+        if in_stock and not present:
+            insort(self._in_stock, position)
+        elif not in_stock and present:
+            del self._in_stock[i]
+
+    def query(self) -> "CatalogQuery":
+        return CatalogQuery(self)
+
+
+# Предикат: индекс -> posting list; residual - проверка продукта после пересечения
+_Predicate = Callable[[CatalogIndex], Posting]
+
+
+@dataclass(frozen=True)
+class CatalogQuery:
+    """Неизменяемый запрос к CatalogIndex"""
+
+    index: CatalogIndex
+    predicates: Tuple[_Predicate, ...] = ()
+    residuals: Tuple[Callable[[Product], bool], ...] = ()
+    _cache: Dict[str, List[int]] = field(default_factory=dict, compare=False, repr=False)
+
+    def _with(
+        self,
+        predicate: Optional[_Predicate] = None,
+        residual: Optional[Callable[[Product], bool]] = None,
+    ) -> "CatalogQuery":
+        return CatalogQuery(
+            self.index,
+            self.predicates + ((predicate,) if predicate else ()),
+            self.residuals + ((residual,) if residual else ()),
+        )
+
+    # ---------------------------------------------------------- predicates
+
+    def category(self, *values: str, exact: bool = False) -> "CatalogQuery":
+        """Категория из списка (без учета регистра; exact=True - точное совпадение)"""
+        residual = None
+        if exact:
+            allowed = set(values)
+            residual = lambda p: p.category in allowed  # noqa: E731
+        return self._with(lambda idx: idx.posting("category", values), residual)
+
+    def category_contains(self, *fragments: str) -> "CatalogQuery":
+        """Категория содержит любой из фрагментов (как SelectorV2._matches_category)"""
+        return self._with(lambda idx: idx.posting_containing("category", fragments))
+
+    def subcategory(self, *values: str) -> "CatalogQuery":
+        return self._with(lambda idx: idx.posting("subcategory", values))
+
+    def tags_any(self, tags: Iterable[str]) -> "CatalogQuery":
+        tags = tuple(tags)
+        return self._with(lambda idx: idx.posting("tags", tags)) if tags else self
+
+    def actives_any(self, actives: Iterable[str]) -> "CatalogQuery":
+        actives = tuple(actives)
+        return self._with(lambda idx: idx.posting("actives", actives)) if actives else self
+
+    def finish_in(self, finishes: Iterable[str]) -> "CatalogQuery":
+        finishes = tuple(finishes)
+        return self._with(lambda idx: idx.posting("finish", finishes)) if finishes else self
+
+    def undertone(self, undertone: Any) -> "CatalogQuery":
+        return self._with(lambda idx: idx.posting("undertone", [undertone]))
+
+    def in_stock(self) -> "CatalogQuery":
+        return self._with(CatalogIndex.in_stock_posting)
+
+    def price_between(
+        self, low: Optional[float] = None, high: Optional[float] = None
+    ) -> "CatalogQuery":
+        return self._with(lambda idx: idx.price_posting(low, high))
+
+    def where(self, check: Callable[[Product], bool]) -> "CatalogQuery":
+        """Произвольная проверка продукта (выполняется после индексных предикатов)"""
+        return self._with(residual=check)
+
+    # ----------------------------------------------------------- execution
+
+    def positions(self) -> List[int]:
+        """Позиции подходящих продуктов в порядке каталога"""
+        cached = self._cache.get("positions")
+        if cached is not None:
+            return cached
+
+        postings = sorted((predicate(self.index) for predicate in self.predicates), key=len)
+        if postings:
+            result = list(postings[0])
+            for posting in postings[1:]:
+                if not result:
+                    break
+                result = _intersect(result, posting)
+        else:
+            result = list(range(len(self.index)))
+
+        if self.residuals:
+            products = self.index.products
+            result = [
+                position
+                for position in result
+                if all(check(products[position]) for check in self.residuals)
+            ]
+        self._cache["positions"] = result
+        return result
+
+    def __iter__(self) -> Iterator[Product]:
+        products = self.index.products
+        return (products[position] for position in self.positions())
+
+    def count(self) -> int:
+        return len(self.positions())
+
+    def first(self, n: int = 1) -> List[Product]:
+        products = self.index.products
+        return [products[position] for position in self.positions()[:n]]
+
+    def page(self, page: int = 1, per_page: int = 8) -> Page:
+        """Страница результатов; номер страницы приводится к 1..pages"""
+        positions = self.positions()
+        total = len(positions)
+        pages = max(1, (total + per_page - 1) // per_page)
+        page = max(1, min(page, pages))
+        start = (page - 1) * per_page
+        products = self.index.products
+        return Page(
+            items=[products[p] for p in positions[start : start + per_page]],
+            page=page,
+            pages=pages,
+            total=total,
+        )
@@ -2,10 +2,25 @@ from __future__ import annotations
 
 import os
 import threading
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 
+from config.env import PartnerConfig, get_settings, on_settings_reload
+
+from .alternatives_index import AlternativesIndex
 from .catalog import load_catalog
+from .catalog_query import CatalogIndex, CatalogQuery
 from .models import Product
+from .product_search import ProductSearchIndex
+from .product_view import ProductProjection
+
+
+def partner_link_params() -> Tuple[str, Optional[str]]:
+    """(partner_code, redirect_base) из текущих настроек - для них ссылки считаются заранее"""
+    try:
+        partner = get_settings().partner
+    except Exception:  # noqa: BLE001 - настройки не загружаются (нет BOT_TOKEN в скриптах)
+        partner = PartnerConfig()
+    return partner.partner_code, partner.redirect_base or None
 
 
 class CatalogStore:
@@ -18,7 +33,20 @@ class CatalogStore:
         self.path = path
         self._catalog: List[Product] = []
         self._sig: Optional[Tuple[int, float]] = None
+        # id(product) -> (product, проекция); продукт держим, чтобы id не переиспользовался
+        self._projections: Dict[int, Tuple[Product, ProductProjection]] = {}
+        self._summaries: List[Mapping[str, Any]] = []
+        # id(product) -> позиция сводки в _summaries (точечные обновления)
+        self._summary_positions: Dict[int, int] = {}
+        self._alternatives: Optional[AlternativesIndex] = None
+        self._index = CatalogIndex([])
+        self._search = ProductSearchIndex([])
         self._catalog_lock = threading.Lock()
+        # Статистика для /metrics
+        self.hits = 0
+        self.reloads = 0
+        self.projection_hits = 0
+        self.projection_misses = 0
 
     @classmethod
     def instance(cls, path: str) -> "CatalogStore":
@@ -26,6 +54,8 @@ class CatalogStore:
             if cls._instance is None:
                 cls._instance = cls(path)
                 cls._instance._load_if_needed(force=True)
+                # Партнерский код меняется вместе с настройками (/reload_settings, SIGHUP)
+                on_settings_reload(_refresh_partner_links)
             return cls._instance
 
     def _filesig(self) -> Optional[Tuple[int, float]]:
@@ -39,9 +69,142 @@ class CatalogStore:
         with self._catalog_lock:
             sig = self._filesig()
             if force or (sig and sig != self._sig):
-                self._catalog = load_catalog(self.path)
+                catalog = load_catalog(self.path)
+                self._build_projections(catalog)
+                self._build_alternatives(catalog)
+                self._index = CatalogIndex(catalog)
+                self._search = ProductSearchIndex(catalog)
+                self._catalog = catalog
                 self._sig = sig
+                self.reloads += 1
+            else:
+                self.hits += 1
+
+    def _build_projections(self, catalog: List[Product]) -> None:
+        """Профиль-независимые проекции продуктов: один раз на загрузку каталога"""
+        projections: Dict[int, Tuple[Product, ProductProjection]] = {}
+        partner_code, redirect_base = partner_link_params()
+        for product in catalog:
+            try:
+                projection = ProductProjection.from_product(product)
+                projection.ref_link(partner_code, redirect_base)
+            except Exception as e:  # noqa: BLE001
+                print(f"⚠️ Could not project product {getattr(product, 'key', '?')}: {e}")
+                continue
+            projections[id(product)] = (product, projection)
+        self._projections = projections
+        self._summaries = [projection.summary for _, projection in projections.values()]
+        self._summary_positions = {key: position for position, key in enumerate(projections)}
+
+    def _build_alternatives(self, catalog: List[Product]) -> None:
+        """Индекс замен для товаров не в наличии"""
+
+        def priority(product: Product) -> int:
+            projection = self.projection(product)
+            return projection.source_priority if projection else 999
+
+        try:
+            self._alternatives = AlternativesIndex(catalog, priority=priority)
+        except Exception as e:  # noqa: BLE001
+            print(f"⚠️ Could not build alternatives index: {e}")
+            self._alternatives = None
 
     def get(self) -> List[Product]:
         self._load_if_needed(force=False)
         return self._catalog
+
+    def refresh_partner_links(self) -> None:
+        """Пересобрать проекции с партнерскими ссылками из текущих настроек"""
+        with self._catalog_lock:
+            self._build_projections(self._catalog)
+
+    def projection(self, product: Product) -> Optional[ProductProjection]:
+        """Готовая проекция для продукта из этого каталога (None для чужих объектов)"""
+        entry = self._projections.get(id(product))
+        if entry is not None and entry[0] is product:
+            return entry[1]
+        return None
+
+    def alternatives(self) -> Optional[AlternativesIndex]:
+        """Индекс замен текущего каталога"""
+        self._load_if_needed(force=False)
+        return self._alternatives
+
+    def set_in_stock(self, key: str, in_stock: bool) -> bool:
+        """
+        Точечно меняет наличие товара без перезагрузки каталога: продукт,
+        его проекция и индекс замен обновляются инкрементально.
+        """
+        with self._catalog_lock:
+            index = self._alternatives
+            product = index.get_product(key) if index else None
+            if product is None:
+                product = next((p for p in self._catalog if p.key == key), None)
+            if product is None:
+                return False
+
+            product.in_stock = in_stock
+            if index is not None:
+                index.set_in_stock(key, in_stock)
+            self._index.set_in_stock(product, in_stock)
+            entry = self._projections.get(id(product))
+            if entry is not None:
+                projection = ProductProjection.from_product(product)
+                projection.ref_link(*partner_link_params())
+                self._projections[id(product)] = (product, projection)
+                self._summaries[self._summary_positions[id(product)]] = projection.summary
+            return True
+
+    def query(self) -> CatalogQuery:
+        """Запрос к текущему каталогу по инвертированным индексам (см. catalog_query)"""
+        self._load_if_needed(force=False)
+        return self._index.query()
+
+    def search(self, text: str, limit: int = 10, *, require_all: bool = False) -> List[Product]:
+        """Полнотекстовый поиск по бренду, названию, категории, тегам и активам"""
+        self._load_if_needed(force=False)
+        return self._search.search(text, limit, require_all=require_all)
+
+    def unique_match(self, text: str) -> Optional[Product]:
+        """Единственный продукт, точно совпавший со всеми словами (см. ProductSearchIndex)"""
+        self._load_if_needed(force=False)
+        return self._search.unique(text)
+
+    def summaries(self) -> List[Mapping[str, Any]]:
+        """Read-only сводки продуктов каталога (id, name, price, ...) в порядке каталога"""
+        self._load_if_needed(force=False)
+        return self._summaries
+
+    def get_stats(self) -> Dict[str, int]:
+        """Размер каталога и счетчики кеша для мониторинга"""
+        return {
+            "products": len(self._catalog),
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "projection_hits": self.projection_hits,
+            "projection_misses": self.projection_misses,
+        }
+
+
+def _refresh_partner_links(settings: Any) -> None:
+    store = CatalogStore._instance
+    if store is not None:
+        store.refresh_partner_links()
+
+
+def get_alternatives_index() -> Optional[AlternativesIndex]:
+    """Индекс замен глобального каталога (None, если каталог еще не загружен)"""
+    store = CatalogStore._instance
+    return store.alternatives() if store is not None else None
+
+
+def get_product_projection(product: Product) -> ProductProjection:
+    """Проекция из загруженного каталога; для прочих продуктов считается на лету"""
+    store = CatalogStore._instance
+    if store is not None:
+        projection = store.projection(product)
+        if projection is not None:
+            store.projection_hits += 1
+            return projection
+        store.projection_misses += 1
+    return ProductProjection.from_product(product)
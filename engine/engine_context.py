@@ -0,0 +1,136 @@
+"""
+🧩 Engine Context - общий неизменяемый контекст SelectorV2 / AnswerExpanderV2
+
+Таблицы категорий и сезонов и скомпилированные правила (engine.rule_engine)
+собираются один раз на процесс. Конструкторы SelectorV2 и AnswerExpanderV2
+ничего не читают с диска и не строят словари - они ссылаются на текущий
+EngineContext. При изменении файлов правил контекст пересобирается и
+подменяется целиком: запрос, уже получивший контекст, дорабатывает со старым.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
+
+from .rule_engine import DEFAULT_RULES_PATH, CompiledRules, get_rule_engine
+
+# Extended category mappings for 15 makeup + 7 skincare categories
+MAKEUP_CATEGORIES = {
+    "foundation": ["foundation", "bb_cream", "cc_cream", "тональный"],
+    "concealer": ["concealer", "консилер"],
+    "corrector": ["corrector", "корректор"],
+    "powder": ["powder", "пудра"],
+    "blush": ["blush", "румяна"],
+    "bronzer": ["bronzer", "бронзатор"],
+    "contour": ["contour", "скульптор"],
+    "highlighter": ["highlighter", "хайлайтер"],
+    "eyebrow": ["eyebrow", "brow", "брови"],
+    "mascara": ["mascara", "тушь"],
+    "eyeshadow": ["eyeshadow", "тени"],
+    "eyeliner": ["eyeliner", "каял", "подводка"],
+    "lipstick": ["lipstick", "помада"],
+    "lip_gloss": ["lip_gloss", "блеск"],
+    "lip_liner": ["lip_liner", "карандаш_губы"],
+}
+
+SKINCARE_CATEGORIES = {
+    "cleanser": ["cleanser", "очищение", "гель", "пенка"],
+    "toner": ["toner", "тоник", "эксфолиант"],
+    "serum": ["serum", "сыворотка", "концентрат"],
+    "moisturizer": ["moisturizer", "крем", "эмульсия"],
+    "eye_cream": ["eye_cream", "крем_глаз", "крем для глаз"],
+    "sunscreen": ["sunscreen", "spf", "санскрин"],
+    "mask": ["mask", "маска"],
+}
+
+# Season-specific makeup preferences
+SEASON_PREFERENCES = {
+    "spring": {
+        "colors": ["coral", "peach", "bright pink", "warm beige", "golden"],
+        "intensity": {"high": "bright", "medium": "moderate", "low": "subtle"},
+        "finishes": ["dewy", "natural", "luminous"],
+    },
+    "summer": {
+        "colors": ["berry", "plum", "dusty rose", "mauve", "soft pink"],
+        "intensity": {"high": "muted bright", "medium": "medium", "low": "very soft"},
+        "finishes": ["matte", "satin", "semi-matte"],
+    },
+    "autumn": {
+        "colors": ["rust", "bronze", "deep orange", "warm brown", "golden"],
+        "intensity": {"high": "rich", "medium": "warm", "low": "earthy"},
+        "finishes": ["matte", "velvet", "semi-matte"],
+    },
+    "winter": {
+        "colors": ["deep red", "burgundy", "cool pink", "icy blue", "silver"],
+        "intensity": {"high": "dramatic", "medium": "bold", "low": "classic"},
+        "finishes": ["matte", "metallic", "satin"],
+    },
+}
+
+# Enhanced category priorities and rules
+CATEGORY_RULES = {
+    "foundation": {"priority": 1, "required_match": ["undertone", "season"]},
+    "concealer": {"priority": 2, "required_match": ["undertone"]},
+    "corrector": {"priority": 3, "required_match": ["concerns"]},
+    "powder": {"priority": 4, "required_match": ["skin_type"]},
+    "blush": {"priority": 5, "required_match": ["season", "contrast"]},
+    "bronzer": {"priority": 6, "required_match": ["season", "undertone"]},
+    "contour": {"priority": 7, "required_match": ["contrast"]},
+    "highlighter": {"priority": 8, "required_match": ["season", "contrast"]},
+    "eyebrow": {"priority": 9, "required_match": ["hair_color"]},
+    "mascara": {"priority": 10, "required_match": ["eye_color"]},
+    "eyeshadow": {"priority": 11, "required_match": ["season", "eye_color", "contrast"]},
+    "eyeliner": {"priority": 12, "required_match": ["eye_color", "contrast"]},
+    "lipstick": {"priority": 13, "required_match": ["season", "undertone", "contrast"]},
+    "lip_gloss": {"priority": 14, "required_match": ["season", "undertone"]},
+    "lip_liner": {"priority": 15, "required_match": ["undertone"]},
+}
+
+
+def _freeze(value: Any) -> Any:
+    """dict -> MappingProxyType, list -> tuple (рекурсивно)"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+_FROZEN_TABLES = {
+    "makeup_categories": _freeze(MAKEUP_CATEGORIES),
+    "skincare_categories": _freeze(SKINCARE_CATEGORIES),
+    "season_preferences": _freeze(SEASON_PREFERENCES),
+    "category_rules": _freeze(CATEGORY_RULES),
+}
+
+
+@dataclass(frozen=True)
+class EngineContext:
+    """Снимок правил и таблиц категорий; безопасно читать из любого потока"""
+
+    rules: CompiledRules
+    makeup_categories: Mapping[str, Any]
+    skincare_categories: Mapping[str, Any]
+    season_preferences: Mapping[str, Any]
+    category_rules: Mapping[str, Any]
+
+
+# Глобальные контексты по каталогу правил
+_contexts: Dict[str, EngineContext] = {}
+_contexts_lock = threading.Lock()
+
+
+def get_engine_context(rules_path: str = DEFAULT_RULES_PATH) -> EngineContext:
+    """Текущий контекст; пересобирается, если правила были перезагружены"""
+    rules = get_rule_engine(rules_path).rules
+    context = _contexts.get(rules_path)
+    if context is None or context.rules is not rules:
+        with _contexts_lock:
+            context = _contexts.get(rules_path)
+            if context is None or context.rules is not rules:
+                context = EngineContext(rules=rules, **_FROZEN_TABLES)
+                _contexts[rules_path] = context
+    return context
@@ -0,0 +1,239 @@
+"""
+⏱️ Latency - гистограммы задержек обработки обновлений
+
+LatencyHistogram - лог-линейные бакеты в стиле HdrHistogram: значения в
+микросекундах, 2^SUB_BITS подбакетов на каждую октаву (относительная
+ошибка перцентиля не больше ~6%), разреженное хранение счетчиков.
+
+Трассировка обновления: middleware (bot/middlewares/latency.py) открывает
+UpdateTrace в contextvar, а код движка помечает фазы:
+
+    @timed_phase("selector")
+    def select_products_v2(...): ...
+
+    with phase("storage"):
+        path.write_text(...)
+
+Время фаз суммируется по обновлению и попадает в гистограммы с метками
+(router, prefix, phase); фаза "handler" - полное время обработки.
+Вложенные вызовы одной фазы не считаются дважды. Фаза "queue" - ожидание
+слота планировщика (bot/middlewares/update_scheduler.py).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+SUB_BITS = 4
+SUB_COUNT = 1 << SUB_BITS
+
+PHASE_HANDLER = "handler"
+PHASE_SELECTOR = "selector"
+PHASE_STORAGE = "storage"
+PHASE_TELEGRAM_API = "telegram_api"
+PHASE_QUEUE = "queue"
+
+
+def _bucket_index(value: int) -> int:
+    if value < SUB_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return SUB_COUNT + shift * SUB_COUNT + ((value >> shift) - SUB_COUNT)
+
+
+def _bucket_high(index: int) -> int:
+    """Наибольшее значение, попадающее в бакет"""
+    if index < SUB_COUNT:
+        return index
+    shift, sub = divmod(index - SUB_COUNT, SUB_COUNT)
+    return ((sub + SUB_COUNT + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Гистограмма задержек (значения в миллисекундах, хранение в мкс)"""
+
+    __slots__ = ("counts", "count", "total_us", "max_us")
+
+    def __init__(self) -> None:
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def record(self, ms: float) -> None:
+        value = max(0, int(ms * 1000))
+        index = _bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_us += value
+        if value > self.max_us:
+            self.max_us = value
+
+    def percentile(self, q: float) -> float:
+        """Перцентиль в мс (q от 0 до 100)"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(q / 100 * self.count + 0.5 - 1e-9)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_bucket_high(index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def cumulative(self, bounds_ms: List[float]) -> List[int]:
+        """Число значений <= каждой границы (для экспорта в Prometheus)"""
+        bounds_us = [b * 1000 for b in bounds_ms]
+        result = [0] * len(bounds_us)
+        for index, n in self.counts.items():
+            high = _bucket_high(index)
+            for i, bound in enumerate(bounds_us):
+                if high <= bound:
+                    result[i] += n
+        return result
+
+    def copy(self) -> "LatencyHistogram":
+        """Независимая копия (для чтения из другого потока)"""
+        clone = LatencyHistogram()
+        clone.counts = dict(self.counts)
+        clone.count = self.count
+        clone.total_us = self.total_us
+        clone.max_us = self.max_us
+        return clone
+
+    @property
+    def sum_ms(self) -> float:
+        return self.total_us / 1000
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max_us / 1000,
+        }
+
+
+Labels = Tuple[str, str, str]  # (router, prefix, phase)
+
+
+class LatencyRegistry:
+    """Гистограммы задержек процесса по меткам (router, prefix, phase)"""
+
+    def __init__(self) -> None:
+        self._histograms: Dict[Labels, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, router: str, prefix: str, phase_name: str, ms: float) -> None:
+        key = (router, prefix, phase_name)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(ms)
+
+    def items(self) -> List[Tuple[Labels, LatencyHistogram]]:
+        """Копии гистограмм, снятые под блокировкой: /metrics читает их из потока"""
+        with self._lock:
+            return sorted((key, histogram.copy()) for key, histogram in self._histograms.items())
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Перцентили по всем меткам (в порядке убывания числа обновлений)"""
+        rows = [
+            {"router": router, "prefix": prefix, "phase": phase_name, **histogram.summary()}
+            for (router, prefix, phase_name), histogram in self.items()
+        ]
+        return sorted(rows, key=lambda row: (-row["count"], row["router"], row["prefix"]))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+_registry = LatencyRegistry()
+
+
+def get_latency_registry() -> LatencyRegistry:
+    """Глобальный реестр гистограмм задержек"""
+    return _registry
+
+
+# ------------------------------------------------------------------ tracing
+
+
+@dataclass
+class UpdateTrace:
+    """Время фаз одного обновления"""
+
+    prefix: str
+    router: str = "unhandled"
+    phases: Dict[str, float] = field(default_factory=dict)
+    active: Set[str] = field(default_factory=set)
+
+    def add(self, phase_name: str, ms: float) -> None:
+        self.phases[phase_name] = self.phases.get(phase_name, 0.0) + ms
+
+
+_current_trace: ContextVar[Optional[UpdateTrace]] = ContextVar("latency_trace", default=None)
+
+
+def current_trace() -> Optional[UpdateTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_update(prefix: str) -> Iterator[UpdateTrace]:
+    """Открыть трассировку обновления (используется middleware)"""
+    trace = UpdateTrace(prefix=prefix)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Учесть время блока в фазе текущего обновления (вне обновления - no-op)"""
+    trace = _current_trace.get()
+    if trace is None or name in trace.active:
+        yield
+        return
+    trace.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.active.discard(name)
+        trace.add(name, (time.perf_counter() - started) * 1000)
+
+
+def timed_phase(name: str) -> Callable[[Callable], Callable]:
+    """Декоратор: время вызова (sync или async) учитывается в фазе name"""
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with phase(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -35,3 +35,20 @@ def get_catalog_logger() -> logging.Logger:
     logger.setLevel(logging.INFO)
     logger.addHandler(handler)
     return logger
+
+
+def get_loop_lag_logger() -> logging.Logger:
+    logger = logging.getLogger("loop_lag")
+    if logger.handlers:
+        return logger
+    os.makedirs("logs", exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        filename="logs/loop_lag.jsonl",
+        maxBytes=2_000_000,
+        backupCount=5,
+        encoding="utf-8",
+    )
+    handler.setFormatter(JSONLineFormatter())
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    return logger
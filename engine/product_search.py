@@ -0,0 +1,200 @@
+"""
+🔍 Product Search - полнотекстовый поиск по каталогу в памяти
+
+ProductSearchIndex строится при загрузке каталога (см. CatalogStore) по полям
+brand, title, category, tags и actives:
+
+    токен -> {позиция продукта: вес поля}    инвертированный индекс
+    отсортированный словарь                  поиск по префиксу (bisect)
+    триграмма -> токены словаря              fallback для опечаток
+
+Нормализация одинакова для каталога и запроса: casefold, ё -> е, разбиение
+на буквенно-цифровые слова (кириллица и латиница). Каждое слово запроса
+ищется точно, затем по префиксу, затем по похожести триграмм (коэффициент
+Дайса); выше ранжируются продукты, совпавшие по большему числу слов.
+
+    store.search("ла рош сыворотка", limit=8)
+"""
+
+from __future__ import annotations
+
+import heapq
+import re
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import Product
+
+# Вес совпадения в зависимости от поля продукта
+FIELD_WEIGHTS: Dict[str, float] = {
+    "title": 3.0,
+    "brand": 2.0,
+    "actives": 1.5,
+    "category": 1.0,
+    "tags": 1.0,
+}
+
+# Множители для неточных совпадений слова запроса
+PREFIX_FACTOR = 0.7
+FUZZY_FACTOR = 0.5
+
+MIN_PREFIX_LENGTH = 2
+MAX_EXPANSIONS = 32
+MIN_SIMILARITY = 0.5
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def normalize_text(text: object) -> str:
+    """casefold + ё -> е"""
+    if text is None:
+        return ""
+    text = str(getattr(text, "value", text))
+    return text.casefold().replace("ё", "е")
+
+
+def tokenize(text: object) -> List[str]:
+    """Слова нормализованного текста (разделители - все небуквенные символы, включая _)"""
+    return _WORD_RE.findall(normalize_text(text))
+
+
+def trigrams(token: str) -> Set[str]:
+    """Триграммы слова с границами: 'крем' -> {' кр', 'кре', 'рем', 'ем '}"""
+    padded = f" {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """Результат поиска: продукт, число совпавших слов запроса и суммарный вес"""
+
+    product: Product
+    matched: int
+    score: float
+
+
+class ProductSearchIndex:
+    """Инвертированный индекс одного снимка каталога"""
+
+    def __init__(self, catalog: Iterable[Product]):
+        self.products: List[Product] = list(catalog)
+        self._postings: Dict[str, Dict[int, float]] = {}
+
+        for position, product in enumerate(self.products):
+            self._add(position, product.title, FIELD_WEIGHTS["title"])
+            self._add(position, product.brand, FIELD_WEIGHTS["brand"])
+            self._add(position, product.category, FIELD_WEIGHTS["category"])
+            self._add(position, product.subcategory, FIELD_WEIGHTS["category"])
+            for tag in product.tags or []:
+                self._add(position, tag, FIELD_WEIGHTS["tags"])
+            for active in product.actives or []:
+                self._add(position, active, FIELD_WEIGHTS["actives"])
+
+        self._vocabulary: List[str] = sorted(self._postings)
+        self._trigrams: Dict[str, List[str]] = {}
+        for token in self._vocabulary:
+            for gram in trigrams(token):
+                self._trigrams.setdefault(gram, []).append(token)
+
+    def _add(self, position: int, text: object, weight: float) -> None:
+        for token in tokenize(text):
+            posting = self._postings.setdefault(token, {})
+            if posting.get(position, 0.0) < weight:
+                posting[position] = weight
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    # ------------------------------------------------------------- lookup
+
+    def _prefixed(self, token: str) -> List[str]:
+        """Токены словаря, начинающиеся с token (кроме самого token)"""
+        result = []
+        i = bisect_left(self._vocabulary, token)
+        while i < len(self._vocabulary) and len(result) < MAX_EXPANSIONS:
+            candidate = self._vocabulary[i]
+            if not candidate.startswith(token):
+                break
+            if candidate != token:
+                result.append(candidate)
+            i += 1
+        return result
+
+    def _similar(self, token: str) -> List[Tuple[str, float]]:
+        """Токены словаря с похожими триграммами (коэффициент Дайса >= MIN_SIMILARITY)"""
+        grams = trigrams(token)
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+        similar = []
+        for candidate, common in shared.items():
+            # у слова с границами столько же триграмм, сколько символов
+            similarity = 2.0 * common / (len(grams) + len(candidate))
+            if similarity >= MIN_SIMILARITY:
+                similar.append((candidate, similarity))
+        return heapq.nlargest(MAX_EXPANSIONS, similar, key=lambda item: item[1])
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """Варианты слова запроса с множителем: точное, префиксы, затем опечатки"""
+        expansions: List[Tuple[str, float]] = []
+        if token in self._postings:
+            expansions.append((token, 1.0))
+        if len(token) >= MIN_PREFIX_LENGTH:
+            expansions.extend((candidate, PREFIX_FACTOR) for candidate in self._prefixed(token))
+        if not expansions and len(token) >= 3:
+            expansions = [
+                (candidate, FUZZY_FACTOR * similarity)
+                for candidate, similarity in self._similar(token)
+            ]
+        return expansions
+
+    def hits(self, query: str, limit: int = 10, *, require_all: bool = False) -> List[SearchHit]:
+        """Лучшие совпадения: сначала по числу совпавших слов, затем по весу и порядку каталога"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or limit <= 0:
+            return []
+
+        matched: Counter = Counter()
+        scores: Dict[int, float] = {}
+        for token in tokens:
+            best: Dict[int, float] = {}
+            for candidate, factor in self._expand(token):
+                for position, weight in self._postings[candidate].items():
+                    score = weight * factor
+                    if score > best.get(position, 0.0):
+                        best[position] = score
+            for position, score in best.items():
+                matched[position] += 1
+                scores[position] = scores.get(position, 0.0) + score
+
+        required = len(tokens) if require_all else 1
+        ranked = heapq.nsmallest(
+            limit,
+            (position for position, count in matched.items() if count >= required),
+            key=lambda position: (-matched[position], -scores[position], position),
+        )
+        return [SearchHit(self.products[p], matched[p], scores[p]) for p in ranked]
+
+    def search(self, query: str, limit: int = 10, *, require_all: bool = False) -> List[Product]:
+        """Продукты по свободному тексту (см. hits)"""
+        return [hit.product for hit in self.hits(query, limit, require_all=require_all)]
+
+    def best(self, query: str) -> Optional[Product]:
+        """Единственный лучший продукт, совпавший со всеми словами запроса"""
+        found = self.search(query, limit=1, require_all=True)
+        return found[0] if found else None
+
+    def unique(self, query: str) -> Optional[Product]:
+        """Единственный продукт со всеми словами запроса без префиксов и опечаток"""
+        tokens = set(tokenize(query))
+        if not tokens:
+            return None
+        positions: Optional[Set[int]] = None
+        for token in tokens:
+            posting = self._postings.get(token)
+            if not posting:
+                return None
+            positions = set(posting) if positions is None else positions & posting.keys()
+        return self.products[positions.pop()] if positions and len(positions) == 1 else None
@@ -0,0 +1,268 @@
+"""
+🪶 Product View - представления продукта для карточек
+
+ProductProjection - профиль-независимая часть карточки (id, бренд, цена,
+источник, партнерская ссылка). Строится один раз при загрузке каталога
+(см. CatalogStore) и не меняется.
+
+LazyProductDict - словарь продукта с отложенными полями. Селектор
+возвращает по 3-5 продуктов на каждую из 22 категорий, а UI показывает
+одну страницу категории. Дорогие поля карточки (explain, match_reason,
+ref_link, source_*) вычисляются только при первом чтении и запоминаются.
+
+Для вызывающего кода это обычный dict: get, [], in, items, json.dumps,
+pickle и копирование работают как раньше - полная итерация просто
+досчитывает оставшиеся поля.
+"""
+
+from __future__ import annotations
+
+import urllib.parse
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+_MISSING = object()
+
+
+def with_affiliate(link: str | None, partner_code: str, redirect_base: str | None) -> str | None:
+    """Партнерская ссылка: через redirect_base или параметром aff"""
+    if not link:
+        return None
+    if redirect_base:
+        url = urllib.parse.quote(link, safe="")
+        return f"{redirect_base}?url={url}&aff={urllib.parse.quote(partner_code)}"
+    sep = "&" if ("?" in link) else "?"
+    return f"{link}{sep}aff={urllib.parse.quote(partner_code)}"
+
+
+@dataclass(frozen=True)
+class ProductProjection:
+    """Неизменяемая профиль-независимая проекция продукта"""
+
+    product_id: str
+    brand: str
+    name: str
+    category: str
+    price: Optional[float]
+    price_currency: str
+    link: Optional[str]
+    actives: Tuple[str, ...]
+    tags: Tuple[str, ...]
+    in_stock: Optional[bool]
+    source_priority: int
+    source_name: str
+    source_category: str
+    # Краткая сводка для списков без персонализации (read-only)
+    summary: Mapping[str, Any] = field(compare=False, repr=False)
+    # Партнерские ссылки: (partner_code, redirect_base) -> ссылка
+    _ref_links: Dict[Tuple[str, Optional[str]], Optional[str]] = field(
+        default_factory=dict, compare=False, repr=False
+    )
+
+    @classmethod
+    def from_product(cls, product: Any) -> "ProductProjection":
+        from .source_prioritizer import get_source_prioritizer
+
+        link = getattr(product, "buy_url", getattr(product, "link", None))
+        source_info = get_source_prioritizer().get_source_info(link) if link else None
+        product_id = getattr(product, "key", getattr(product, "id", ""))
+        name = getattr(product, "title", getattr(product, "name", ""))
+
+        return cls(
+            product_id=product_id,
+            brand=product.brand,
+            name=name,
+            category=product.category,
+            price=product.price,
+            price_currency=getattr(product, "price_currency", "RUB"),
+            link=link,
+            actives=tuple(product.actives or ()),
+            tags=tuple(product.tags or ()),
+            in_stock=product.in_stock,
+            source_priority=source_info.priority if source_info else 999,
+            source_name=source_info.name if source_info else "Неизвестный источник",
+            source_category=source_info.category if source_info else "unknown",
+            summary=MappingProxyType(
+                {
+                    "id": product_id,
+                    "name": name,
+                    "price": product.price or 0,
+                    "category": product.category,
+                    "brand": product.brand,
+                    "image_url": getattr(product, "image_url", None),
+                    "source": getattr(product, "source", None),
+                }
+            ),
+        )
+
+    def ref_link(self, partner_code: str, redirect_base: Optional[str] = None) -> Optional[str]:
+        """Партнерская ссылка (запоминается для каждого партнерского кода)"""
+        key = (partner_code, redirect_base)
+        try:
+            return self._ref_links[key]
+        except KeyError:
+            link = with_affiliate(self.link, partner_code, redirect_base)
+            self._ref_links[key] = link
+            return link
+
+    def card(
+        self, partner_code: str, redirect_base: Optional[str] = None, formula: bool = True
+    ) -> Dict[str, Any]:
+        """Новый dict карточки; профильные поля (explain и т.п.) добавляет вызывающий"""
+        card: Dict[str, Any] = {
+            "id": self.product_id,
+            "brand": self.brand,
+            "name": self.name,
+            "category": self.category,
+            "price": self.price,
+            "price_currency": self.price_currency,
+            "link": self.link,
+            "ref_link": self.ref_link(partner_code, redirect_base),
+        }
+        if formula:
+            card["actives"] = list(self.actives)
+            card["tags"] = list(self.tags)
+        card["in_stock"] = self.in_stock
+        card["source_priority"] = self.source_priority
+        card["source_name"] = self.source_name
+        card["source_category"] = self.source_category
+        return card
+
+
+class LazyProductDict(dict):
+    """dict, часть значений которого вычисляется при первом обращении"""
+
+    __slots__ = ("_lazy",)
+
+    def __init__(
+        self,
+        data: Optional[Dict[str, Any]] = None,
+        lazy: Optional[Dict[str, Callable[[], Any]]] = None,
+    ):
+        super().__init__(data or {})
+        # key -> функция без аргументов; после вычисления ключ удаляется
+        self._lazy: Dict[str, Callable[[], Any]] = dict(lazy or {})
+        for key in self._lazy:
+            dict.pop(self, key, None)
+
+    # ----------------------------------------------------------- вычисление
+
+    @property
+    def pending_keys(self) -> frozenset:
+        """Поля, которые еще не вычислялись"""
+        return frozenset(self._lazy)
+
+    def _resolve(self, key: Any) -> Any:
+        value = self._lazy[key]()
+        self._lazy.pop(key, None)
+        dict.__setitem__(self, key, value)
+        return value
+
+    def materialize(self) -> "LazyProductDict":
+        """Вычисляет все отложенные поля"""
+        for key in list(self._lazy):
+            self._resolve(key)
+        return self
+
+    # ------------------------------------------------------------ чтение
+
+    def __missing__(self, key: Any) -> Any:
+        if key in self._lazy:
+            return self._resolve(key)
+        raise KeyError(key)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        value = dict.get(self, key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if key in self._lazy:
+            return self._resolve(key)
+        return default
+
+    def __contains__(self, key: Any) -> bool:
+        return dict.__contains__(self, key) or key in self._lazy
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + len(self._lazy)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.keys())
+
+    def keys(self):
+        self.materialize()
+        return dict.keys(self)
+
+    def values(self):
+        self.materialize()
+        return dict.values(self)
+
+    def items(self):
+        self.materialize()
+        return dict.items(self)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    # ----------------------------------------------------------- запись
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._lazy.pop(key, None)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        if self._lazy.pop(key, None) is None:
+            dict.__delitem__(self, key)
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        if key in self._lazy:
+            return self._lazy.pop(key)()
+        return dict.pop(self, key, *default)
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        if key in self:
+            return self[key]
+        dict.__setitem__(self, key, default)
+        return default
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def popitem(self):
+        self.materialize()
+        return dict.popitem(self)
+
+    def clear(self) -> None:
+        self._lazy.clear()
+        dict.clear(self)
+
+    # ---------------------------------------------------- сравнение/копия
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, dict):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other: Any) -> bool:
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __reduce__(self):
+        # Отложенные функции не сериализуются: pickle/deepcopy получают обычный dict
+        return (dict, (dict(self.items()),))
+
+    def __repr__(self) -> str:
+        return dict.__repr__(self.materialize())
+
+    def __or__(self, other: Any) -> Dict[str, Any]:
+        if not isinstance(other, dict):
+            return NotImplemented
+        merged = self.copy()
+        merged.update(other)
+        return merged
@@ -0,0 +1,283 @@
+"""
+🧪 Rule Engine - скомпилированные правила совместимости активов
+
+Файлы RULES (compatibility_matrix.yaml, layering_order.yaml, cautions.yaml)
+читаются один раз на процесс и компилируются в неизменяемый CompiledRules:
+
+    aliases   сырое название актива -> канонический id (salicylic -> bha)
+    groups    канонический id -> группы (aha -> acids), матрица может
+              ссылаться как на актив, так и на группу
+    matrix    симметричная смежность id -> {id: DO | CAUTION | DONT}
+
+Проверка набора продуктов обходит только соседей его активов, поэтому
+стоимость пропорциональна числу активов набора, а не размеру матрицы.
+
+Файлы перечитываются при изменении (размер/mtime проверяются не чаще
+RULES_RELOAD_INTERVAL секунд); новый CompiledRules подменяет старый целиком.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+import yaml
+
+DEFAULT_RULES_PATH = "deliverables/Engine_v2/RULES"
+RULE_FILES = ("compatibility_matrix.yaml", "layering_order.yaml", "cautions.yaml")
+
+DO = "DO"
+CAUTION = "CAUTION"
+DONT = "DONT"
+_SEVERITY = {DO: 0, CAUTION: 1, DONT: 2}
+
+# Используются, если файла правил нет или он не читается
+_DEFAULT_COMPATIBILITY = {
+    "incompatible_pairs": [
+        ["retinol", "vitamin_c"],
+        ["retinol", "aha"],
+        ["retinol", "bha"],
+        ["vitamin_c", "niacinamide"],
+        ["benzoyl_peroxide", "retinol"],
+    ],
+    "avoid_with_sensitive": ["retinol", "aha", "bha", "fragrance"],
+}
+_DEFAULT_LAYERING = {
+    "morning_order": ["cleanser", "toner", "serum", "moisturizer", "spf"],
+    "evening_order": ["cleanser", "toner", "treatment", "serum", "moisturizer", "oil"],
+    "ph_order": ["low_ph_first", "water_based", "oil_based", "occlusive"],
+}
+_DEFAULT_CAUTIONS = {
+    "pregnancy_avoid": ["retinol", "retinoids", "high_salicylic_acid", "hydroquinone"],
+    "sensitive_skin_avoid": ["fragrance", "essential_oils", "high_alcohol"],
+    "sun_sensitivity": ["retinol", "aha", "bha", "vitamin_c"],
+}
+
+# Базовые синонимы; секция aliases в compatibility_matrix.yaml их дополняет
+_DEFAULT_ALIASES = {
+    "retinoids": ["retinol", "retinal", "retinoid", "retinaldehyde", "tretinoin", "adapalene"],
+    "vitc_laa": ["l_ascorbic_acid", "ascorbic_acid", "laa"],
+    "aha": ["glycolic", "glycolic_acid", "lactic", "lactic_acid", "mandelic", "mandelic_acid"],
+    "bha": ["salicylic", "salicylic_acid"],
+    "benzoyl_peroxide": ["bpo"],
+    "hyaluronic": ["hyaluronic_acid", "sodium_hyaluronate"],
+    "ceramides": ["ceramide"],
+    "peptides": ["peptide"],
+}
+_DEFAULT_GROUPS = {
+    "aha": ["acids"],
+    "bha": ["acids"],
+    "pha": ["acids"],
+    "vitc_laa": ["vitamin_c"],
+}
+
+
+def normalize_active(active: Any) -> str:
+    """Название актива в виде ключа: нижний регистр, '_' вместо пробелов и '-'"""
+    return str(active or "").strip().lower().replace("-", "_").replace(" ", "_")
+
+
+@dataclass(frozen=True)
+class Conflict:
+    """Пара активов (канонические id или группы) с уровнем DO/CAUTION/DONT"""
+
+    first: str
+    second: str
+    level: str
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    """Неизменяемый снимок правил; безопасно читать из любого потока"""
+
+    aliases: Mapping[str, str]
+    groups: Mapping[str, FrozenSet[str]]
+    matrix: Mapping[str, Mapping[str, str]]
+    legend: Mapping[str, str]
+    compatibility: Mapping[str, Any]
+    layering: Mapping[str, Any]
+    cautions: Mapping[str, Any]
+    signature: Tuple[Any, ...] = ()
+
+    def canonical(self, active: Any) -> str:
+        key = normalize_active(active)
+        return self.aliases.get(key, key)
+
+    def expand(self, actives: Iterable[Any]) -> FrozenSet[str]:
+        """Канонические id активов вместе с их группами"""
+        ids = set()
+        for active in actives:
+            canonical = self.canonical(active)
+            if canonical:
+                ids.add(canonical)
+                ids.update(self.groups.get(canonical, ()))
+        return frozenset(ids)
+
+    def level(self, first: Any, second: Any) -> Optional[str]:
+        """Самый строгий уровень для пары активов (None - правил нет)"""
+        levels = [
+            level
+            for a in self.expand([first])
+            for b in self.expand([second])
+            if (level := self.matrix.get(a, {}).get(b)) is not None
+        ]
+        return max(levels, key=_SEVERITY.__getitem__) if levels else None
+
+    def conflicts(self, actives: Iterable[Any], min_level: str = CAUTION) -> List[Conflict]:
+        """Конфликты внутри набора активов, самые строгие первыми"""
+        return self._conflicts(self.expand(actives), min_level)
+
+    def _conflicts(self, ids: FrozenSet[str], min_level: str) -> List[Conflict]:
+        threshold = _SEVERITY[min_level]
+        found: Dict[FrozenSet[str], Conflict] = {}
+        for active in sorted(ids):
+            for other, level in self.matrix.get(active, {}).items():
+                if other not in ids or other == active or _SEVERITY[level] < threshold:
+                    continue
+                pair = frozenset((active, other))
+                current = found.get(pair)
+                if current is None or _SEVERITY[level] > _SEVERITY[current.level]:
+                    found[pair] = Conflict(active, other, level)
+        return sorted(found.values(), key=lambda c: (-_SEVERITY[c.level], c.first, c.second))
+
+
+def _read_yaml(path: Path, default: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    except Exception:
+        return default
+
+
+def compile_rules(
+    compatibility: Dict[str, Any],
+    layering: Dict[str, Any],
+    cautions: Dict[str, Any],
+    signature: Tuple[Any, ...] = (),
+) -> CompiledRules:
+    """Собрать CompiledRules из разобранных YAML"""
+    aliases: Dict[str, str] = {}
+    alias_source = dict(_DEFAULT_ALIASES)
+    alias_source.update(compatibility.get("aliases") or {})
+    for canonical, raw_names in alias_source.items():
+        canonical_key = normalize_active(canonical)
+        for raw in raw_names or []:
+            aliases[normalize_active(raw)] = canonical_key
+
+    group_source = dict(_DEFAULT_GROUPS)
+    group_source.update(compatibility.get("groups") or {})
+    groups = {
+        normalize_active(active): frozenset(normalize_active(g) for g in names or [])
+        for active, names in group_source.items()
+    }
+
+    def canonical(active: Any) -> str:
+        key = normalize_active(active)
+        return aliases.get(key, key)
+
+    matrix: Dict[str, Dict[str, str]] = {}
+
+    def link(first: Any, second: Any, level: Any) -> None:
+        level = str(level).upper()
+        if level not in _SEVERITY:
+            return
+        a, b = canonical(first), canonical(second)
+        for x, y in ((a, b), (b, a)):
+            current = matrix.setdefault(x, {}).get(y)
+            if current is None or _SEVERITY[level] > _SEVERITY[current]:
+                matrix[x][y] = level
+
+    for active, spec in (compatibility.get("pairs") or {}).items():
+        for other, level in ((spec or {}).get("with") or {}).items():
+            link(active, other, level)
+    # Старый формат: список несовместимых пар
+    for pair in compatibility.get("incompatible_pairs") or []:
+        if len(pair) >= 2:
+            link(pair[0], pair[1], DONT)
+
+    return CompiledRules(
+        aliases=MappingProxyType(aliases),
+        groups=MappingProxyType(groups),
+        matrix=MappingProxyType({k: MappingProxyType(v) for k, v in matrix.items()}),
+        legend=MappingProxyType(dict(compatibility.get("legend") or {})),
+        compatibility=MappingProxyType(compatibility),
+        layering=MappingProxyType(layering),
+        cautions=MappingProxyType(cautions),
+        signature=signature,
+    )
+
+
+class RuleEngine:
+    """Правила одного каталога RULES с перезагрузкой при изменении файлов"""
+
+    def __init__(self, rules_path: str = DEFAULT_RULES_PATH, reload_interval: float = 2.0):
+        self.rules_path = Path(rules_path)
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._rules = self._compile(self._signature())
+        self.reloads = 0
+
+    def _signature(self) -> Tuple[Any, ...]:
+        sig = []
+        for name in RULE_FILES:
+            try:
+                st = os.stat(self.rules_path / name)
+                sig.append((int(st.st_size), float(st.st_mtime)))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    def _compile(self, signature: Tuple[Any, ...]) -> CompiledRules:
+        return compile_rules(
+            _read_yaml(self.rules_path / "compatibility_matrix.yaml", _DEFAULT_COMPATIBILITY),
+            _read_yaml(self.rules_path / "layering_order.yaml", _DEFAULT_LAYERING),
+            _read_yaml(self.rules_path / "cautions.yaml", _DEFAULT_CAUTIONS),
+            signature,
+        )
+
+    @property
+    def rules(self) -> CompiledRules:
+        """Актуальные правила (файлы проверяются не чаще reload_interval)"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            self.reload()
+        return self._rules
+
+    def reload(self, force: bool = False) -> bool:
+        """Перекомпилировать правила, если файлы изменились; True - правила заменены"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            signature = self._signature()
+            if not force and signature == self._rules.signature:
+                return False
+            self._rules = self._compile(signature)
+            self.reloads += 1
+        print(f"🔄 Rules reloaded from {self.rules_path}")
+        return True
+
+
+# Глобальные экземпляры по каталогу правил
+_engines: Dict[str, RuleEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_rule_engine(rules_path: str = DEFAULT_RULES_PATH) -> RuleEngine:
+    """Получить общий RuleEngine для каталога правил"""
+    engine = _engines.get(rules_path)
+    if engine is None:
+        with _engines_lock:
+            # Один движок на каталог, как бы ни был записан путь
+            key = str(Path(rules_path).resolve())
+            engine = _engines.get(key)
+            if engine is None:
+                interval = float(os.getenv("RULES_RELOAD_INTERVAL", "2.0"))
+                engine = RuleEngine(rules_path, reload_interval=interval)
+                _engines[key] = engine
+            _engines[rules_path] = engine
+    return engine
@@ -1,24 +1,20 @@
 from __future__ import annotations
 
-import urllib.parse
-from typing import Dict, List, Optional
+import heapq
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 from .shade_normalization import get_shade_normalizer
 from .explain_generator import get_explain_generator
+from .product_view import LazyProductDict, with_affiliate as _with_affiliate  # noqa: F401
+from .catalog_store import get_alternatives_index, get_product_projection
+from .engine_context import EngineContext, get_engine_context
+from .latency import PHASE_SELECTOR, timed_phase
+from .rule_engine import DONT, get_rule_engine
 from pathlib import Path
-import yaml
 
 from .models import Product, UserProfile
 
 
-def _with_affiliate(link: str | None, partner_code: str, redirect_base: str | None) -> str | None:
-    if not link:
-        return None
-    if redirect_base:
-        return f"{redirect_base}?url={urllib.parse.quote(link, safe='')}\u0026aff={urllib.parse.quote(partner_code)}"
-    sep = "&" if ("?" in link) else "?"
-    return f"{link}{sep}aff={urllib.parse.quote(partner_code)}"
-
-
 def _filter_catalog(
     catalog: List[Product],
     *,
@@ -55,6 +51,67 @@ def _filter_catalog(
     return result
 
 
+@dataclass(frozen=True)
+class _SlotQuery:
+    """Слот legacy select_products: фильтр как в _filter_catalog и top-k"""
+
+    category: str
+    actives: Tuple[str, ...] = ()
+    undertone: Any = None
+    limit: int = 1
+
+
+def _select_slots(catalog: List[Product], slots: Dict[str, _SlotQuery]) -> Dict[str, List[Product]]:
+    """Все слоты запроса за один проход по каталогу
+
+    Результат каждого слота совпадает с _pick_top(_filter_catalog(...), limit):
+    те же фильтры в том же порядке, затем стабильный top-k по приоритету
+    источника (заранее посчитан в проекции продукта). Слоты с одинаковым
+    фильтром (cleanser утром и вечером) делят одну корзину.
+    """
+    filters: Dict[str, List[Tuple[Any, frozenset, Any]]] = {}
+    buckets: Dict[Any, List[Product]] = {}
+    for slot in slots.values():
+        wanted = frozenset(a.lower() for a in slot.actives)
+        key = (slot.category.lower(), wanted, slot.undertone)
+        if key not in buckets:
+            buckets[key] = []
+            filters.setdefault(key[0], []).append((key, wanted, slot.undertone))
+
+    for p in catalog:
+        category_filters = filters.get(str(p.category).lower())
+        if not category_filters:
+            continue
+        actives_lower = None
+        for key, wanted, undertone in category_filters:
+            if wanted:
+                if actives_lower is None:
+                    actives_lower = set(map(str.lower, p.actives or []))
+                if actives_lower.isdisjoint(wanted):
+                    continue
+            if undertone and p.shade:
+                if str(p.shade.undertone).lower() != undertone.lower():
+                    continue
+            if p.in_stock is False:
+                continue
+            buckets[key].append(p)
+
+    priorities: Dict[int, int] = {}
+
+    def priority(p: Product) -> int:
+        value = priorities.get(id(p))
+        if value is None:
+            value = priorities[id(p)] = get_product_projection(p).source_priority
+        return value
+
+    result: Dict[str, List[Product]] = {}
+    for name, slot in slots.items():
+        key = (slot.category.lower(), frozenset(a.lower() for a in slot.actives), slot.undertone)
+        # nsmallest стабилен: то же, что sorted(...)[:limit]
+        result[name] = heapq.nsmallest(slot.limit, buckets[key], key=priority)
+    return result
+
+
 def _filter_catalog_with_fallback(
     catalog: List[Product],
     *,
@@ -108,29 +165,35 @@ def _filter_catalog_with_fallback(
     result = in_stock_results.copy()
 
     if target_shade_info and target_shade_info.shade_id != "unknown":
-        # Step 1: Try neighboring shades
-        neighbors = normalizer.get_shade_neighbors(target_shade_info.shade_id)
+        # Оттенки нормализуем один раз на товар (кеш индекса замен), а не
+        # заново для каждого соседнего и универсального оттенка
+        index = get_alternatives_index()
+        shade_of = (
+            index.shade_info if index else (lambda p: normalizer.normalize_shade(p.shade_name))
+        )
+        in_stock_shades = [(p, shade_of(p)) for p in all_matches if p.in_stock]
+        by_shade_id: Dict[str, List[Product]] = {}
+        for p, info in in_stock_shades:
+            by_shade_id.setdefault(info.shade_id, []).append(p)
+
+        # Step 1: Try neighboring shades (hand-written map, then closest by ΔE2000)
+        neighbors = list(normalizer.get_shade_neighbors(target_shade_info.shade_id))
+        neighbors += [
+            shade_id
+            for shade_id in normalizer.get_perceptual_neighbors(target_shade_info.shade_id, limit)
+            if shade_id not in neighbors
+        ]
         for neighbor_id in neighbors:
             if len(result) >= limit:
                 break
-
-            neighbor_products = [
-                p
-                for p in all_matches
-                if p.in_stock and normalizer.normalize_shade(p.shade_name).shade_id == neighbor_id
-            ]
-            result.extend(neighbor_products)
+            result.extend(by_shade_id.get(neighbor_id, []))
 
         # Step 2: Try same category/finish alternatives
         if len(result) < limit:
             same_category = [
                 p
-                for p in all_matches
-                if p.in_stock
-                and (
-                    not target_shade_info.depth
-                    or normalizer.normalize_shade(p.shade_name).depth == target_shade_info.depth
-                )
+                for p, info in in_stock_shades
+                if not target_shade_info.depth or info.depth == target_shade_info.depth
             ]
             result.extend(same_category)
 
@@ -140,14 +203,7 @@ def _filter_catalog_with_fallback(
             for universal_id in universals:
                 if len(result) >= limit:
                     break
-
-                universal_products = [
-                    p
-                    for p in all_matches
-                    if p.in_stock
-                    and normalizer.normalize_shade(p.shade_name).shade_id == universal_id
-                ]
-                result.extend(universal_products)
+                result.extend(by_shade_id.get(universal_id, []))
 
     # Final fallback: any in-stock product from same category
     if len(result) < limit:
@@ -162,95 +218,34 @@ class SelectorV2:
 
     def __init__(self, rules_path: str = "deliverables/Engine_v2/RULES"):
         self.rules_path = Path(rules_path)
-        self._compatibility_rules = self._load_compatibility_rules()
-
-        # Extended category mappings for 15 makeup + 7 skincare categories
-        self.makeup_categories = {
-            "foundation": ["foundation", "bb_cream", "cc_cream", "тональный"],
-            "concealer": ["concealer", "консилер"],
-            "corrector": ["corrector", "корректор"],
-            "powder": ["powder", "пудра"],
-            "blush": ["blush", "румяна"],
-            "bronzer": ["bronzer", "бронзатор"],
-            "contour": ["contour", "скульптор"],
-            "highlighter": ["highlighter", "хайлайтер"],
-            "eyebrow": ["eyebrow", "brow", "брови"],
-            "mascara": ["mascara", "тушь"],
-            "eyeshadow": ["eyeshadow", "тени"],
-            "eyeliner": ["eyeliner", "каял", "подводка"],
-            "lipstick": ["lipstick", "помада"],
-            "lip_gloss": ["lip_gloss", "блеск"],
-            "lip_liner": ["lip_liner", "карандаш_губы"],
-        }
+        self._rules_key = str(rules_path)
+        self._rule_engine = get_rule_engine(self._rules_key)
 
-        self.skincare_categories = {
-            "cleanser": ["cleanser", "очищение", "гель", "пенка"],
-            "toner": ["toner", "тоник", "эксфолиант"],
-            "serum": ["serum", "сыворотка", "концентрат"],
-            "moisturizer": ["moisturizer", "крем", "эмульсия"],
-            "eye_cream": ["eye_cream", "крем_глаз", "крем для глаз"],
-            "sunscreen": ["sunscreen", "spf", "санскрин"],
-            "mask": ["mask", "маска"],
-        }
+    # Таблицы и правила общие на процесс: конструктор ничего не строит
+    @property
+    def _context(self) -> EngineContext:
+        return get_engine_context(self._rules_key)
 
-        # Season-specific makeup preferences
-        self.season_preferences = {
-            "spring": {
-                "colors": ["coral", "peach", "bright pink", "warm beige", "golden"],
-                "intensity": {"high": "bright", "medium": "moderate", "low": "subtle"},
-                "finishes": ["dewy", "natural", "luminous"],
-            },
-            "summer": {
-                "colors": ["berry", "plum", "dusty rose", "mauve", "soft pink"],
-                "intensity": {"high": "muted bright", "medium": "medium", "low": "very soft"},
-                "finishes": ["matte", "satin", "semi-matte"],
-            },
-            "autumn": {
-                "colors": ["rust", "bronze", "deep orange", "warm brown", "golden"],
-                "intensity": {"high": "rich", "medium": "warm", "low": "earthy"},
-                "finishes": ["matte", "velvet", "semi-matte"],
-            },
-            "winter": {
-                "colors": ["deep red", "burgundy", "cool pink", "icy blue", "silver"],
-                "intensity": {"high": "dramatic", "medium": "bold", "low": "classic"},
-                "finishes": ["matte", "metallic", "satin"],
-            },
-        }
+    @property
+    def makeup_categories(self) -> Mapping[str, Any]:
+        return self._context.makeup_categories
 
-        # Enhanced category priorities and rules
-        self.category_rules = {
-            "foundation": {"priority": 1, "required_match": ["undertone", "season"]},
-            "concealer": {"priority": 2, "required_match": ["undertone"]},
-            "corrector": {"priority": 3, "required_match": ["concerns"]},
-            "powder": {"priority": 4, "required_match": ["skin_type"]},
-            "blush": {"priority": 5, "required_match": ["season", "contrast"]},
-            "bronzer": {"priority": 6, "required_match": ["season", "undertone"]},
-            "contour": {"priority": 7, "required_match": ["contrast"]},
-            "highlighter": {"priority": 8, "required_match": ["season", "contrast"]},
-            "eyebrow": {"priority": 9, "required_match": ["hair_color"]},
-            "mascara": {"priority": 10, "required_match": ["eye_color"]},
-            "eyeshadow": {"priority": 11, "required_match": ["season", "eye_color", "contrast"]},
-            "eyeliner": {"priority": 12, "required_match": ["eye_color", "contrast"]},
-            "lipstick": {"priority": 13, "required_match": ["season", "undertone", "contrast"]},
-            "lip_gloss": {"priority": 14, "required_match": ["season", "undertone"]},
-            "lip_liner": {"priority": 15, "required_match": ["undertone"]},
-        }
+    @property
+    def skincare_categories(self) -> Mapping[str, Any]:
+        return self._context.skincare_categories
 
-    def _load_compatibility_rules(self) -> Dict:
-        """Load compatibility rules"""
-        try:
-            with open(self.rules_path / "compatibility_matrix.yaml", "r", encoding="utf-8") as f:
-                return yaml.safe_load(f) or {}
-        except Exception:
-            return {
-                "incompatible_pairs": [
-                    ["retinol", "vitamin_c"],
-                    ["retinol", "aha"],
-                    ["retinol", "bha"],
-                    ["vitamin_c", "niacinamide"],
-                    ["benzoyl_peroxide", "retinol"],
-                ]
-            }
+    @property
+    def season_preferences(self) -> Mapping[str, Any]:
+        return self._context.season_preferences
+
+    @property
+    def category_rules(self) -> Mapping[str, Any]:
+        return self._context.category_rules
+
+    @property
+    def _compatibility_rules(self) -> Dict:
+        """Compatibility rules (compiled once per process, hot-reloaded)"""
+        return self._context.rules.compatibility
 
     def _get_skin_priorities(self, profile: UserProfile) -> List[str]:
         """Determine skincare priorities based on profile"""
@@ -506,6 +501,7 @@ class SelectorV2:
 
         return min(max(score, 0.0), max_score)
 
+    @timed_phase(PHASE_SELECTOR)
     def select_products_v2(
         self,
         profile: UserProfile,
@@ -532,7 +528,9 @@ class SelectorV2:
         return {
             "skincare": skincare_results,
             "makeup": makeup_results,
-            "compatibility_warnings": self._check_compatibility(skincare_products),
+            "compatibility_warnings": self._check_compatibility(
+                [card for cards in skincare_results.values() for card in cards]
+            ),
             "routine_suggestions": self._generate_routine_suggestions(profile),
         }
 
@@ -644,37 +642,24 @@ class SelectorV2:
         is_fallback: bool = False,
         fallback_reason: Optional[str] = None,
     ) -> Dict:
-        """Convert product to dict with affiliate links and explanation"""
-        from engine.source_prioritizer import get_source_prioritizer
-
-        explain_generator = get_explain_generator()
-        source_prioritizer = get_source_prioritizer()
-
-        # Get source prioritization info
-        original_link = getattr(product, "buy_url", getattr(product, "link", None))
-        source_info = source_prioritizer.get_source_info(original_link) if original_link else None
-
-        return {
-            "id": getattr(product, "key", getattr(product, "id", "")),
-            "brand": product.brand,
-            "name": getattr(product, "title", getattr(product, "name", "")),
-            "category": product.category,
-            "price": product.price,
-            "price_currency": getattr(product, "price_currency", "RUB"),
-            "link": original_link,
-            "ref_link": _with_affiliate(original_link, partner_code, redirect_base),
-            "actives": product.actives,
-            "tags": product.tags,
-            "in_stock": product.in_stock,
-            "explain": explain_generator.generate_explain(
-                product, profile, is_fallback, fallback_reason
-            ),
-            "match_reason": self._get_match_reason(product, profile),
-            # NEW: Source prioritization info
-            "source_priority": source_info.priority if source_info else 999,
-            "source_name": source_info.name if source_info else "Неизвестный источник",
-            "source_category": source_info.category if source_info else "unknown",
-        }
+        """
+        Convert product to dict with affiliate links and explanation.
+
+        Профиль-независимые поля берутся из проекции CatalogStore, а explain
+        и match_reason вычисляются лениво - только для карточек, которые
+        реально показываются или попадают в PDF.
+        """
+        # Статичная часть карточки посчитана при загрузке каталога
+        card = get_product_projection(product).card(partner_code, redirect_base)
+        return LazyProductDict(
+            card,
+            lazy={
+                "explain": lambda: get_explain_generator().generate_explain(
+                    product, profile, is_fallback, fallback_reason
+                ),
+                "match_reason": lambda: self._get_match_reason(product, profile),
+            },
+        )
 
     def _get_match_reason(self, product: Product, profile: UserProfile) -> str:
         """Generate reason why this product was selected"""
@@ -769,19 +754,26 @@ class SelectorV2:
         """Fallback to enhanced method"""
         return self._select_makeup_v2_enhanced(profile, products, partner_code, redirect_base)
 
-    def _check_compatibility(self, products: List[Product]) -> List[str]:
-        """Check for incompatible ingredient combinations"""
-        warnings = []
-        all_actives = []
-
+    def _check_compatibility(self, products: List[Product | Dict]) -> List[str]:
+        """Check for incompatible ingredient combinations among selected products"""
+        actives = []
         for product in products:
-            all_actives.extend([a.lower() for a in product.actives])
-
-        # Check for incompatible pairs
-        for pair in self._compatibility_rules.get("incompatible_pairs", []):
-            if all(any(active in pair for active in all_actives) for active in pair):
-                warnings.append(f"Избегайте одновременного использования {pair[0]} и {pair[1]}")
+            if isinstance(product, dict):
+                actives.extend(product.get("actives") or [])
+            else:
+                actives.extend(product.actives or [])
 
+        warnings = []
+        for conflict in self._context.rules.conflicts(actives):
+            if conflict.level == DONT:
+                warnings.append(
+                    f"Избегайте одновременного использования {conflict.first} и {conflict.second}"
+                )
+            else:
+                warnings.append(
+                    f"Сочетайте {conflict.first} и {conflict.second} с осторожностью: "
+                    "лучше разносить по времени"
+                )
         return warnings
 
     def _generate_routine_suggestions(self, profile: UserProfile) -> Dict[str, List[str]]:
@@ -807,32 +799,7 @@ class SelectorV2:
         }
 
 
-def _pick_top(products: List[Product], limit: int = 3) -> List[Product]:
-    """Pick top products with source prioritization"""
-    if not products:
-        return []
-
-    from engine.source_prioritizer import get_source_prioritizer
-
-    prioritizer = get_source_prioritizer()
-
-    # Convert to dict format for prioritization
-    product_dicts = []
-    for p in products:
-        product_dict = {
-            "link": getattr(p, "buy_url", getattr(p, "link", None)),
-            "product": p,  # Keep reference to original product
-        }
-        product_dicts.append(product_dict)
-
-    # Sort by source priority
-    sorted_dicts = prioritizer.sort_products_by_source_priority(product_dicts)
-
-    # Extract original products and limit
-    sorted_products = [pd["product"] for pd in sorted_dicts]
-    return sorted_products[:limit]
-
-
+@timed_phase(PHASE_SELECTOR)
 def select_products(
     user_profile: UserProfile,
     catalog: List[Product],
@@ -864,80 +831,55 @@ def select_products(
     if skin_type == "dry":
         wanted_actives.extend(["ceramide", "squalane", "panthenol", "hyaluronic"])
 
-    # AM routine (english categories to align with tests)
-    am_cleanser = _pick_top(_filter_catalog(catalog, category="cleanser"), 1)
-    am_toner = _pick_top(_filter_catalog(catalog, category="toner", actives=wanted_actives), 1)
-    am_serum = _pick_top(_filter_catalog(catalog, category="serum", actives=wanted_actives), 2)
-    am_moist = _pick_top(
-        _filter_catalog(catalog, category="moisturizer", actives=wanted_actives), 1
-    )
-    am_spf = _pick_top(_filter_catalog(catalog, category="sunscreen"), 1)
-
-    # PM routine
-    pm_cleanser = _pick_top(_filter_catalog(catalog, category="cleanser"), 1)
-    pm_treatment = _pick_top(_filter_catalog(catalog, category="serum", actives=wanted_actives), 2)
-    pm_moist = _pick_top(
-        _filter_catalog(catalog, category="moisturizer", actives=wanted_actives), 1
-    )
-
-    # Weekly
-    weekly_exf = _pick_top(_filter_catalog(catalog, category="peeling", actives=wanted_actives), 1)
-    weekly_mask = _pick_top(_filter_catalog(catalog, category="mask", actives=wanted_actives), 1)
-
-    # Makeup selection based on undertone
-    if undertone:
-        face_products = _pick_top(
-            _filter_catalog(catalog, category="foundation", undertone=undertone), 2
-        )
-        brow_products = _pick_top(_filter_catalog(catalog, category="brow"), 1)
-        eye_products = _pick_top(_filter_catalog(catalog, category="eyeshadow"), 1)
-        mascara_products = _pick_top(_filter_catalog(catalog, category="mascara"), 1)
-        lip_products = _pick_top(
-            _filter_catalog(catalog, category="lipstick", undertone=undertone), 2
-        )
-    else:
-        face_products = _pick_top(_filter_catalog(catalog, category="foundation"), 2)
-        brow_products = _pick_top(_filter_catalog(catalog, category="brow"), 1)
-        eye_products = _pick_top(_filter_catalog(catalog, category="eyeshadow"), 1)
-        mascara_products = _pick_top(_filter_catalog(catalog, category="mascara"), 1)
-        lip_products = _pick_top(_filter_catalog(catalog, category="lipstick"), 2)
+    actives = tuple(wanted_actives)
+    slots = {
+        # AM routine (english categories to align with tests)
+        "am_cleanser": _SlotQuery("cleanser"),
+        "am_toner": _SlotQuery("toner", actives),
+        "am_serum": _SlotQuery("serum", actives, limit=2),
+        "am_moist": _SlotQuery("moisturizer", actives),
+        "am_spf": _SlotQuery("sunscreen"),
+        # PM routine
+        "pm_cleanser": _SlotQuery("cleanser"),
+        "pm_treatment": _SlotQuery("serum", actives, limit=2),
+        "pm_moist": _SlotQuery("moisturizer", actives),
+        # Weekly
+        "weekly_exf": _SlotQuery("peeling", actives),
+        "weekly_mask": _SlotQuery("mask", actives),
+        # Makeup selection based on undertone
+        "face": _SlotQuery("foundation", undertone=undertone, limit=2),
+        "brows": _SlotQuery("brow"),
+        "eyes": _SlotQuery("eyeshadow"),
+        "mascara": _SlotQuery("mascara"),
+        "lips": _SlotQuery("lipstick", undertone=undertone, limit=2),
+    }
+    picked = _select_slots(catalog, slots)
 
     def _as_dict(p: Product) -> Dict:
-        from engine.source_prioritizer import get_source_prioritizer
-
-        explain_generator = get_explain_generator()
-        source_prioritizer = get_source_prioritizer()
-
-        # Get prioritized links for this product
-        original_link = getattr(p, "buy_url", getattr(p, "link", None))
-        source_info = source_prioritizer.get_source_info(original_link) if original_link else None
-
-        return {
-            "id": getattr(p, "key", getattr(p, "id", "")),
-            "brand": p.brand,
-            "name": getattr(p, "title", getattr(p, "name", "")),
-            "category": p.category,
-            "price": p.price,
-            "price_currency": getattr(p, "price_currency", "RUB"),
-            "link": original_link,
-            "ref_link": _with_affiliate(original_link, partner_code, redirect_base),
-            "in_stock": p.in_stock,
-            "explain": explain_generator.generate_explain(p, user_profile),
-            # NEW: Source prioritization info
-            "source_priority": source_info.priority if source_info else 999,
-            "source_name": source_info.name if source_info else "Неизвестный источник",
-            "source_category": source_info.category if source_info else "unknown",
-        }
+        card = get_product_projection(p).card(partner_code, redirect_base, formula=False)
+        # Объяснение считается при первом чтении
+        return LazyProductDict(
+            card,
+            lazy={"explain": lambda: get_explain_generator().generate_explain(p, user_profile)},
+        )
 
     # Fill skincare
-    skincare["AM"] = [_as_dict(p) for p in am_cleanser + am_toner + am_serum + am_moist + am_spf]
-    skincare["PM"] = [_as_dict(p) for p in pm_cleanser + pm_treatment + pm_moist]
-    skincare["weekly"] = [_as_dict(p) for p in weekly_exf + weekly_mask]
+    skincare["AM"] = [
+        _as_dict(p)
+        for slot in ("am_cleanser", "am_toner", "am_serum", "am_moist", "am_spf")
+        for p in picked[slot]
+    ]
+    skincare["PM"] = [
+        _as_dict(p) for slot in ("pm_cleanser", "pm_treatment", "pm_moist") for p in picked[slot]
+    ]
+    skincare["weekly"] = [
+        _as_dict(p) for slot in ("weekly_exf", "weekly_mask") for p in picked[slot]
+    ]
 
     # Fill makeup
-    makeup["face"] = [_as_dict(p) for p in face_products]
-    makeup["brows"] = [_as_dict(p) for p in brow_products]
-    makeup["eyes"] = [_as_dict(p) for p in eye_products + mascara_products]
-    makeup["lips"] = [_as_dict(p) for p in lip_products]
+    makeup["face"] = [_as_dict(p) for p in picked["face"]]
+    makeup["brows"] = [_as_dict(p) for p in picked["brows"]]
+    makeup["eyes"] = [_as_dict(p) for slot in ("eyes", "mascara") for p in picked[slot]]
+    makeup["lips"] = [_as_dict(p) for p in picked["lips"]]
 
     return {"skincare": skincare, "makeup": makeup}
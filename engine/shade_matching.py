@@ -0,0 +1,268 @@
+"""
+🎨 Shade Matching - перцептивный подбор оттенков по цвету (CIELAB, ΔE2000)
+
+hex оттенков переводится в CIELAB один раз при построении индекса. Запрос
+k ближайших оттенков:
+
+    до BRUTE_FORCE_LIMIT оттенков   точный перебор по ΔE2000
+    больше                          KD-дерево по Lab: пул ближайших по
+                                    евклидову ΔE76, затем пересортировка по ΔE2000
+
+ΔE76 и ΔE2000 на близких цветах упорядочивают оттенки почти одинаково,
+поэтому пула в несколько раз больше k хватает для точного топа на
+тональных палитрах из тысяч оттенков.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, Union
+
+Lab = Tuple[float, float, float]
+
+BRUTE_FORCE_LIMIT = 256
+# Пул кандидатов KD-дерева для пересортировки по ΔE2000: max(k * POOL_FACTOR, MIN_POOL)
+POOL_FACTOR = 4
+MIN_POOL = 16
+# Дальше этого ΔE2000 оттенок не считается похожим (для сопоставления hex -> оттенок)
+MAX_MATCH_DELTA_E = 20.0
+
+_HEX_RE = re.compile(r"^#?([0-9a-f]{6}|[0-9a-f]{3})$", re.IGNORECASE)
+
+# Белая точка D65
+_XN, _YN, _ZN = 0.95047, 1.0, 1.08883
+
+
+def parse_hex(value: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    """'#RRGGBB' / 'RGB' -> (r, g, b); None, если строка не hex-цвет"""
+    if not value:
+        return None
+    match = _HEX_RE.match(value.strip())
+    if not match:
+        return None
+    digits = match.group(1)
+    if len(digits) == 3:
+        digits = "".join(ch * 2 for ch in digits)
+    return int(digits[0:2], 16), int(digits[2:4], 16), int(digits[4:6], 16)
+
+
+def hex_to_lab(value: Optional[str]) -> Optional[Lab]:
+    """hex sRGB -> CIELAB (D65); None для некорректного цвета"""
+    rgb = parse_hex(value)
+    if rgb is None:
+        return None
+
+    def linear(channel: int) -> float:
+        c = channel / 255.0
+        return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+    r, g, b = (linear(c) for c in rgb)
+    x = (0.4124564 * r + 0.3575761 * g + 0.1804375 * b) / _XN
+    y = (0.2126729 * r + 0.7151522 * g + 0.0721750 * b) / _YN
+    z = (0.0193339 * r + 0.1191920 * g + 0.9503041 * b) / _ZN
+
+    def f(t: float) -> float:
+        return t ** (1.0 / 3.0) if t > 216.0 / 24389.0 else (24389.0 / 27.0 * t + 16.0) / 116.0
+
+    fx, fy, fz = f(x), f(y), f(z)
+    return 116.0 * fy - 16.0, 500.0 * (fx - fy), 200.0 * (fy - fz)
+
+
+def delta_e_2000(lab1: Lab, lab2: Lab) -> float:
+    """Цветовое различие CIEDE2000 (kL = kC = kH = 1)"""
+    l1, a1, b1 = lab1
+    l2, a2, b2 = lab2
+
+    c1 = math.hypot(a1, b1)
+    c2 = math.hypot(a2, b2)
+    c_bar7 = ((c1 + c2) / 2.0) ** 7
+    g = 0.5 * (1.0 - math.sqrt(c_bar7 / (c_bar7 + 25.0**7)))
+    a1p, a2p = a1 * (1.0 + g), a2 * (1.0 + g)
+    c1p, c2p = math.hypot(a1p, b1), math.hypot(a2p, b2)
+    h1p = math.degrees(math.atan2(b1, a1p)) % 360.0 if c1p else 0.0
+    h2p = math.degrees(math.atan2(b2, a2p)) % 360.0 if c2p else 0.0
+
+    dl = l2 - l1
+    dc = c2p - c1p
+    if c1p * c2p == 0:
+        dh = 0.0
+    elif abs(h2p - h1p) <= 180.0:
+        dh = h2p - h1p
+    elif h2p - h1p > 180.0:
+        dh = h2p - h1p - 360.0
+    else:
+        dh = h2p - h1p + 360.0
+    dh_big = 2.0 * math.sqrt(c1p * c2p) * math.sin(math.radians(dh / 2.0))
+
+    l_bar = (l1 + l2) / 2.0
+    c_bar_p = (c1p + c2p) / 2.0
+    if c1p * c2p == 0:
+        h_bar = h1p + h2p
+    elif abs(h1p - h2p) <= 180.0:
+        h_bar = (h1p + h2p) / 2.0
+    elif h1p + h2p < 360.0:
+        h_bar = (h1p + h2p + 360.0) / 2.0
+    else:
+        h_bar = (h1p + h2p - 360.0) / 2.0
+
+    t = (
+        1.0
+        - 0.17 * math.cos(math.radians(h_bar - 30.0))
+        + 0.24 * math.cos(math.radians(2.0 * h_bar))
+        + 0.32 * math.cos(math.radians(3.0 * h_bar + 6.0))
+        - 0.20 * math.cos(math.radians(4.0 * h_bar - 63.0))
+    )
+    d_theta = 30.0 * math.exp(-(((h_bar - 275.0) / 25.0) ** 2))
+    c_bar_p7 = c_bar_p**7
+    r_c = 2.0 * math.sqrt(c_bar_p7 / (c_bar_p7 + 25.0**7))
+    s_l = 1.0 + 0.015 * (l_bar - 50.0) ** 2 / math.sqrt(20.0 + (l_bar - 50.0) ** 2)
+    s_c = 1.0 + 0.045 * c_bar_p
+    s_h = 1.0 + 0.015 * c_bar_p * t
+    r_t = -math.sin(math.radians(2.0 * d_theta)) * r_c
+
+    return math.sqrt(
+        (dl / s_l) ** 2 + (dc / s_c) ** 2 + (dh_big / s_h) ** 2 + r_t * (dc / s_c) * (dh_big / s_h)
+    )
+
+
+@dataclass(frozen=True)
+class ShadeMatch:
+    """Найденный оттенок и расстояние ΔE2000 до цели"""
+
+    shade_id: str
+    delta_e: float
+
+
+# Узел KD-дерева: (индекс точки, ось, левое поддерево, правое поддерево)
+_Node = Tuple[int, int, Optional[tuple], Optional[tuple]]
+
+
+class ShadeMatcher:
+    """Индекс оттенков в CIELAB для запросов k ближайших по ΔE2000"""
+
+    def __init__(self, shades: Iterable[Tuple[str, Optional[str]]]):
+        """shades: пары (shade_id, hex); оттенки без корректного hex пропускаются"""
+        self._ids: List[str] = []
+        self._labs: List[Lab] = []
+        self._position = {}
+        for shade_id, hex_color in shades:
+            lab = hex_to_lab(hex_color)
+            if lab is None or shade_id in self._position:
+                continue
+            self._position[shade_id] = len(self._ids)
+            self._ids.append(shade_id)
+            self._labs.append(lab)
+
+        self._tree: Optional[_Node] = None
+        if len(self._ids) > BRUTE_FORCE_LIMIT:
+            self._tree = self._build(list(range(len(self._ids))), 0)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, shade_id: object) -> bool:
+        return shade_id in self._position
+
+    def lab(self, shade_id: str) -> Optional[Lab]:
+        position = self._position.get(shade_id)
+        return self._labs[position] if position is not None else None
+
+    # -------------------------------------------------------------- query
+
+    def nearest(
+        self,
+        target: Union[str, Lab],
+        k: int = 3,
+        *,
+        max_delta_e: Optional[float] = None,
+        where: Optional[Callable[[str], bool]] = None,
+    ) -> List[ShadeMatch]:
+        """k ближайших оттенков к shade_id, hex или Lab (сам shade_id исключается)
+
+        where - фильтр по shade_id (например, только та же линейка оттенков).
+        """
+        exclude: Optional[str] = None
+        if isinstance(target, str):
+            if target in self._position:
+                exclude = target
+                lab = self._labs[self._position[target]]
+            else:
+                lab = hex_to_lab(target)
+        else:
+            lab = target
+        if lab is None or k <= 0 or not self._ids:
+            return []
+
+        def accept(position: int) -> bool:
+            shade_id = self._ids[position]
+            return shade_id != exclude and (where is None or where(shade_id))
+
+        if self._tree is None:
+            candidates: Sequence[int] = [p for p in range(len(self._ids)) if accept(p)]
+        else:
+            candidates = self._euclidean_pool(lab, max(k * POOL_FACTOR, MIN_POOL), accept)
+
+        scored = sorted((delta_e_2000(lab, self._labs[p]), self._ids[p]) for p in candidates)
+        return [
+            ShadeMatch(shade_id, delta_e)
+            for delta_e, shade_id in scored[:k]
+            if max_delta_e is None or delta_e <= max_delta_e
+        ]
+
+    def neighbors(
+        self, shade_id: str, k: int = 3, where: Optional[Callable[[str], bool]] = None
+    ) -> List[str]:
+        """shade_id ближайших оттенков (пусто, если у оттенка нет hex)"""
+        if shade_id not in self._position:
+            return []
+        return [match.shade_id for match in self.nearest(shade_id, k, where=where)]
+
+    # ------------------------------------------------------------ KD-tree
+
+    def _build(self, positions: List[int], depth: int) -> Optional[_Node]:
+        if not positions:
+            return None
+        axis = depth % 3
+        positions.sort(key=lambda p: self._labs[p][axis])
+        median = len(positions) // 2
+        return (
+            positions[median],
+            axis,
+            self._build(positions[:median], depth + 1),
+            self._build(positions[median + 1 :], depth + 1),
+        )
+
+    def _euclidean_pool(self, lab: Lab, size: int, accept: Callable[[int], bool]) -> List[int]:
+        # max-heap из size ближайших по ΔE76 (храним отрицательный квадрат расстояния)
+        heap: List[Tuple[float, int]] = []
+
+        def visit(node: Optional[_Node]) -> None:
+            if node is None:
+                return
+            position, axis, left, right = node
+            point = self._labs[position]
+            if accept(position):
+                dist = sum((point[i] - lab[i]) ** 2 for i in range(3))
+                if len(heap) < size:
+                    heapq.heappush(heap, (-dist, position))
+                elif dist < -heap[0][0]:
+                    heapq.heapreplace(heap, (-dist, position))
+
+            diff = lab[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if len(heap) < size or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(self._tree)
+        return [position for _, position in heap]
+
+
+def get_shade_matcher() -> ShadeMatcher:
+    """Индекс оттенков глобального ShadeNormalizer (перестраивается при изменении карты)"""
+    from .shade_normalization import get_shade_normalizer
+
+    return get_shade_normalizer().matcher()
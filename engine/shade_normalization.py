@@ -8,6 +8,8 @@ import os
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 
+from .shade_matching import MAX_MATCH_DELTA_E, ShadeMatcher, parse_hex
+
 
 @dataclass
 class ShadeInfo:
@@ -33,6 +35,7 @@ class ShadeNormalizer:
         self.neighbors_path = neighbors_path
         self._shade_map: Dict[str, ShadeInfo] = {}
         self._neighbors: Dict[str, List[str]] = {}
+        self._matcher: Optional[ShadeMatcher] = None
         self._load_mappings()
 
     def _load_mappings(self):
@@ -90,10 +93,31 @@ class ShadeNormalizer:
             "berry": {"shade_id": "lip_005", "undertone": "cool", "finish": "satin"},
         }
 
+        # Ориентировочные цвета для перцептивного подбора (ShadeMatcher)
+        default_hex = {
+            "porcelain": "#F3DCCB",
+            "ivory": "#EFD3B9",
+            "fair": "#EBC9A8",
+            "light": "#E2BC98",
+            "light medium": "#D5A883",
+            "medium": "#C39170",
+            "medium deep": "#A8764F",
+            "deep": "#7E5236",
+            "fair concealer": "#EDCDB0",
+            "light concealer": "#E3BF9C",
+            "medium concealer": "#C99A74",
+            "nude": "#C8927C",
+            "pink": "#E0708F",
+            "coral": "#F0785A",
+            "red": "#C41E3A",
+            "berry": "#8E2C48",
+        }
+
         for raw_name, info in default_shades.items():
             self._shade_map[raw_name.lower()] = ShadeInfo(
                 shade_id=info["shade_id"],
                 raw_name=raw_name,
+                hex_color=default_hex.get(raw_name),
                 undertone=info.get("undertone"),
                 depth=info.get("depth"),
                 finish=info.get("finish"),
@@ -122,6 +146,13 @@ class ShadeNormalizer:
         if key in self._shade_map:
             return self._shade_map[key]
 
+        # Hex color: perceptually closest known shade. Only with a leading "#":
+        # numeric codes ("120") and words ("ace") also parse as hex digits
+        if key.startswith("#") and parse_hex(key):
+            matches = self.matcher().nearest(key, k=1, max_delta_e=MAX_MATCH_DELTA_E)
+            if matches:
+                return self._by_shade_id(matches[0].shade_id)
+
         # Fuzzy matching for common variations
         for mapped_key, shade_info in self._shade_map.items():
             if key in mapped_key or mapped_key in key:
@@ -131,8 +162,35 @@ class ShadeNormalizer:
         return ShadeInfo(shade_id=f"unknown_{hash(key) % 1000:03d}", raw_name=raw_shade_name)
 
     def get_shade_neighbors(self, shade_id: str) -> List[str]:
-        """Get neighboring shade IDs for fallback"""
-        return self._neighbors.get(shade_id, [])
+        """Get neighboring shade IDs for fallback
+
+        Hand-written neighbors win; otherwise the perceptually closest shades
+        of the same family (shade_id prefix, e.g. found_*) are used.
+        """
+        if shade_id in self._neighbors:
+            return self._neighbors[shade_id]
+        return self.get_perceptual_neighbors(shade_id)
+
+    def get_perceptual_neighbors(self, shade_id: str, k: int = 3) -> List[str]:
+        """Get k nearest shades by CIEDE2000 within the same shade family"""
+        family = shade_id.rsplit("_", 1)[0] + "_" if "_" in shade_id else ""
+        return self.matcher().neighbors(shade_id, k, where=lambda other: other.startswith(family))
+
+    def matcher(self) -> ShadeMatcher:
+        """CIELAB index over shades with hex colors (rebuilt after mapping changes)"""
+        matcher = self._matcher
+        if matcher is None:
+            matcher = ShadeMatcher(
+                (info.shade_id, info.hex_color) for info in self._shade_map.values()
+            )
+            self._matcher = matcher
+        return matcher
+
+    def _by_shade_id(self, shade_id: str) -> ShadeInfo:
+        for info in self._shade_map.values():
+            if info.shade_id == shade_id:
+                return info
+        return ShadeInfo(shade_id=shade_id, raw_name=shade_id)
 
     def get_season_universals(self, season: str) -> List[str]:
         """Get universal shade IDs for a given season"""
@@ -186,6 +244,7 @@ class ShadeNormalizer:
             depth=depth,
             finish=finish,
         )
+        self._matcher = None
 
     def add_neighbor_relationship(self, shade_id: str, neighbor_ids: List[str]):
         """Add neighbor relationships for a shade"""
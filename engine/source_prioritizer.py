@@ -6,7 +6,8 @@
 
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
-from urllib.parse import urlparse
+
+from engine.url_intel import get_url_intel
 
 
 @dataclass
@@ -81,14 +82,9 @@ class SourcePrioritizer:
         return sources
 
     def get_domain_from_url(self, url: str) -> Optional[str]:
-        """Извлекает домен из URL"""
+        """Извлекает домен из URL (без www., разбор кешируется в url_intel)"""
         try:
-            parsed = urlparse(url)
-            domain = parsed.netloc.lower()
-            # Убираем www. префикс
-            if domain.startswith("www."):
-                domain = domain[4:]
-            return domain
+            return get_url_intel().netloc_domain(url)
         except Exception:
             return None
 
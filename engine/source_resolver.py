@@ -9,7 +9,9 @@ from typing import Dict, Optional, Any
 from dataclasses import dataclass
 from datetime import datetime
 
+from engine.alternatives_index import SAME_BRAND
 from engine.catalog_store import CatalogStore
+from engine.url_intel import get_url_intel
 
 
 @dataclass
@@ -39,6 +41,9 @@ class ResolvedProduct:
 class SourceResolver:
     """Разрешитель источников с приоритизацией"""
 
+    # Пространство общего кеша url_intel для сопоставления домен -> источник
+    SOURCE_CACHE = "source:resolver"
+
     def __init__(self):
         # Приоритизация источников (меньше число = выше приоритет)
         self.source_priorities = {
@@ -78,24 +83,22 @@ class SourceResolver:
             ),
         }
 
-    def _extract_domain_from_url(self, url: str) -> str:
-        """Извлечение домена из URL"""
-        if not url:
-            return ""
-
-        # Убираем протокол
-        url = url.replace("https://", "").replace("http://", "")
-
-        # Берем домен до первого слеша
-        domain = url.split("/")[0].split("?")[0]
+        # Таблица источников могла измениться - сбрасываем кеш сопоставлений
+        get_url_intel().invalidate(self.SOURCE_CACHE)
 
-        # Приводим к нижнему регистру
-        return domain.lower()
+    def _extract_domain_from_url(self, url: str) -> str:
+        """Извлечение домена из URL (протокол убирается, до первого / или ?)"""
+        return get_url_intel().host_prefix(url)
 
     def _get_source_info(self, url: str) -> SourceInfo:
         """Получение информации об источнике по URL"""
         domain = self._extract_domain_from_url(url)
+        return get_url_intel().memo(
+            self.SOURCE_CACHE, domain, lambda: self._match_source_info(domain)
+        )
 
+    def _match_source_info(self, domain: str) -> SourceInfo:
+        """Поиск источника по домену: точное совпадение, затем поддомены"""
         # Проверяем точное совпадение домена
         if domain in self.source_priorities:
             return self.source_priorities[domain]
@@ -162,77 +165,53 @@ class SourceResolver:
         """
         Поиск альтернативы для недоступного товара
 
-        Стратегии поиска:
+        Кандидаты берутся из индекса замен каталога (AlternativesIndex):
         1. Тот же бренд + другое название (другой объем/оттенок)
-        2. Другая марка в той же категории
-        3. Аналог из другой категории (замена по назначению)
+        2. Соседние оттенки / та же глубина
+        3. Другая марка в той же категории
         """
         try:
             # Получаем каталог
             catalog_path = "assets/fixed_catalog.yaml"  # Можно параметризовать
-            catalog_store = CatalogStore.instance(catalog_path)
-            catalog = catalog_store.get()
-
-            product_brand = product.get("brand", "").lower()
-            product_category = product.get("category", "").lower()
-            product_id = product.get("id", "")
+            index = CatalogStore.instance(catalog_path).alternatives()
+            if index is None:
+                return None
 
-            best_alternative = None
-            best_priority = 999
-
-            for item in catalog:
-                # Пропускаем тот же товар
-                if item.id == product_id or str(getattr(item, "key", "")) == str(product_id):
-                    continue
-
-                # Проверяем доступность
-                if not getattr(item, "in_stock", True) or getattr(item, "price", 0) <= 0:
+            product_id = str(product.get("id", "") or "")
+            if index.get_product(product_id) is not None:
+                candidates = index.alternatives(product_id, limit=None)
+            else:
+                candidates = index.category_alternatives(
+                    product.get("category", ""),
+                    brand=product.get("brand", ""),
+                    exclude=product_id,
+                    limit=None,
+                )
+
+            # Индекс уже ранжирован; дополнительно требуем ненулевую цену
+            for alternative in candidates:
+                item = alternative.product
+                if not item.price or item.price <= 0:
                     continue
-
-                item_brand = getattr(item, "brand", "").lower()
-                item_category = getattr(item, "category", "").lower()
-
-                # Стратегия 1: Тот же бренд, другая модель (высокий приоритет)
-                if item_brand == product_brand and item_category == product_category:
-                    url = getattr(item, "buy_url", "") or getattr(item, "link", "")
-                    source_info = self._get_source_info(url)
-
-                    if source_info.priority < best_priority:
-                        best_priority = source_info.priority
-                        best_alternative = {
-                            "id": item.id,
-                            "name": getattr(item, "title", item.name),
-                            "brand": item.brand,
-                            "price": item.price,
-                            "price_currency": getattr(item, "price_currency", "RUB"),
-                            "category": item.category,
-                            "link": url,
-                            "source_name": source_info.name,
-                            "source_priority": source_info.priority,
-                            "alternative_reason": "другой_вариант_товара",
-                        }
-
-                # Стратегия 2: Другая марка, та же категория (средний приоритет)
-                elif item_category == product_category and not best_alternative:
-                    url = getattr(item, "buy_url", "") or getattr(item, "link", "")
-                    source_info = self._get_source_info(url)
-
-                    if source_info.priority < best_priority:
-                        best_priority = source_info.priority
-                        best_alternative = {
-                            "id": item.id,
-                            "name": getattr(item, "title", item.name),
-                            "brand": item.brand,
-                            "price": item.price,
-                            "price_currency": getattr(item, "price_currency", "RUB"),
-                            "category": item.category,
-                            "link": url,
-                            "source_name": source_info.name,
-                            "source_priority": source_info.priority,
-                            "alternative_reason": "аналог_категории",
-                        }
-
-            return best_alternative
+                url = getattr(item, "buy_url", "") or getattr(item, "link", "") or ""
+                source_info = self._get_source_info(url)
+                return {
+                    "id": getattr(item, "key", None) or item.id,
+                    "name": getattr(item, "title", item.name),
+                    "brand": item.brand,
+                    "price": item.price,
+                    "price_currency": getattr(item, "price_currency", "RUB"),
+                    "category": item.category,
+                    "link": url,
+                    "source_name": source_info.name,
+                    "source_priority": source_info.priority,
+                    "alternative_reason": (
+                        "другой_вариант_товара"
+                        if alternative.reason == SAME_BRAND
+                        else "аналог_категории"
+                    ),
+                }
+            return None
 
         except Exception as e:
             print(f"❌ Error finding alternative for product {product.get('id', 'unknown')}: {e}")
@@ -0,0 +1,222 @@
+"""
+🔗 URL Intelligence - общий кеш разбора URL, источников и партнерских ссылок
+
+SourcePrioritizer, SourceResolver, AffiliateService и AffiliateManager
+разбирали одни и те же ссылки каталога на каждый продукт каждого запроса.
+Здесь собраны общие ограниченные LRU кеши:
+
+    parse       URL -> ParseResult + параметры query
+    domain      URL -> домен (в правилах конкретного модуля)
+    source:*    URL -> информация об источнике (пространство на модуль)
+    affiliate   (URL, шаблон, кампания) -> партнерская ссылка
+
+Параметры партнерских ссылок компилируются в неизменяемые AffiliateTemplate.
+Шаблон - часть ключа кеша, поэтому смена partner_code в настройках сразу
+дает новые ссылки; invalidate() дополнительно освобождает устаревшие записи.
+
+Размер каждого кеша: переменная окружения URL_INTEL_CACHE_SIZE (по умолчанию 4096).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import urllib.parse
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+_NOT_FOUND = object()
+
+
+class _BoundedCache:
+    """Потокобезопасный LRU кеш с ограничением числа записей"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            value = self._data.get(key, _NOT_FOUND)
+            if value is not _NOT_FOUND:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        # Вычисляем без блокировки: результат детерминирован, гонка безопасна
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+@dataclass(frozen=True)
+class ParsedUrl:
+    """Разобранный URL: части адреса и параметры query в исходном порядке"""
+
+    parts: urllib.parse.ParseResult
+    query: Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+@dataclass(frozen=True)
+class AffiliateTemplate:
+    """Скомпилированные партнерские параметры одного источника"""
+
+    source: str
+    aff_param: Optional[str] = None
+    partner_code: Optional[str] = None
+    source_param: Optional[str] = None
+    medium_param: Optional[str] = None
+    campaign_param: Optional[str] = None
+    default_campaign: Optional[str] = None
+
+    @classmethod
+    def from_config(
+        cls, source: str, config: Mapping[str, Any], default_campaign: Optional[str] = None
+    ) -> "AffiliateTemplate":
+        return cls(
+            source=source,
+            aff_param=config.get("aff_param"),
+            partner_code=config.get("partner_code"),
+            source_param=config.get("source_param"),
+            medium_param=config.get("medium_param"),
+            campaign_param=config.get("campaign_param"),
+            default_campaign=config.get("campaign", default_campaign),
+        )
+
+    def apply(self, parsed: ParsedUrl, campaign: Optional[str] = None) -> str:
+        """URL с партнерскими параметрами (существующие параметры заменяются на месте)"""
+        params = {key: list(values) for key, values in parsed.query}
+        if self.aff_param and self.partner_code:
+            params[self.aff_param] = [self.partner_code]
+        if self.source_param:
+            params[self.source_param] = [self.source]
+        if self.medium_param:
+            params[self.medium_param] = ["affiliate"]
+        value = campaign or self.default_campaign
+        if self.campaign_param and value is not None:
+            params[self.campaign_param] = [value]
+
+        new_query = urllib.parse.urlencode(params, doseq=True)
+        return parsed.parts._replace(query=new_query).geturl()
+
+
+class UrlIntelligence:
+    """Общий слой разбора URL для модулей источников и партнерских ссылок"""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._caches: Dict[str, _BoundedCache] = {}
+        self._lock = threading.Lock()
+
+    def cache(self, namespace: str) -> _BoundedCache:
+        cache = self._caches.get(namespace)
+        if cache is None:
+            with self._lock:
+                cache = self._caches.setdefault(namespace, _BoundedCache(self.max_entries))
+        return cache
+
+    def memo(self, namespace: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Значение из кеша пространства namespace (вычисляется при промахе)"""
+        return self.cache(namespace).get_or_compute(key, compute)
+
+    # --------------------------------------------------------------- разбор
+
+    def parse(self, url: str) -> ParsedUrl:
+        def compute() -> ParsedUrl:
+            parts = urllib.parse.urlparse(url)
+            query = tuple(
+                (key, tuple(values)) for key, values in urllib.parse.parse_qs(parts.query).items()
+            )
+            return ParsedUrl(parts=parts, query=query)
+
+        return self.memo("parse", url, compute)
+
+    def netloc_domain(self, url: str) -> Optional[str]:
+        """Домен из netloc в нижнем регистре без www. (None, если URL не разбирается)"""
+
+        def compute() -> Optional[str]:
+            try:
+                domain = self.parse(url).parts.netloc.lower()
+            except Exception:
+                return None
+            return domain[4:] if domain.startswith("www.") else domain
+
+        return self.memo("domain", ("netloc", url), compute)
+
+    def host_prefix(self, url: str) -> str:
+        """Часть URL до первого / или ? без протокола, в нижнем регистре"""
+        if not url:
+            return ""
+
+        def compute() -> str:
+            rest = url.replace("https://", "").replace("http://", "")
+            return rest.split("/")[0].split("?")[0].lower()
+
+        return self.memo("domain", ("prefix", url), compute)
+
+    # ------------------------------------------------------- партнерские
+
+    def template(
+        self, source: str, config: Mapping[str, Any], default_campaign: Optional[str] = None
+    ) -> AffiliateTemplate:
+        """Шаблон источника; новый partner_code в config дает новый шаблон"""
+        key = (source, default_campaign, tuple(config.items()))
+        return self.memo(
+            "template",
+            key,
+            lambda: AffiliateTemplate.from_config(source, config, default_campaign),
+        )
+
+    def affiliate_url(
+        self, url: str, template: AffiliateTemplate, campaign: Optional[str] = None
+    ) -> str:
+        """Партнерская ссылка для URL, шаблона и кампании"""
+        return self.memo(
+            "affiliate",
+            (url, template, campaign),
+            lambda: template.apply(self.parse(url), campaign),
+        )
+
+    # --------------------------------------------------------- управление
+
+    def invalidate(self, namespace: Optional[str] = None) -> None:
+        """Сбросить один кеш (или все) - например, после смены партнерских настроек"""
+        if namespace is None:
+            for cache in list(self._caches.values()):
+                cache.clear()
+        elif namespace in self._caches:
+            self._caches[namespace].clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"entries": len(cache), "hits": cache.hits, "misses": cache.misses}
+            for name, cache in list(self._caches.items())
+        }
+
+
+# Глобальный экземпляр
+_url_intel: Optional[UrlIntelligence] = None
+
+
+def get_url_intel() -> UrlIntelligence:
+    """Получить общий кеш URL"""
+    global _url_intel
+    if _url_intel is None:
+        _url_intel = UrlIntelligence(int(os.getenv("URL_INTEL_CACHE_SIZE", "4096")))
+    return _url_intel
@@ -164,3 +164,8 @@ MSG_UNKNOWN_PRODUCT = "Не удалось найти товар"
 MSG_CART_READY_FOR_CHECKOUT = "Оформим заказ. Мы поможем завершить покупку."
 MSG_UNAVAILABLE = "Этого варианта нет в наличии"
 CART_FOOTER_CLEAR = "🧹 Очистить корзину"
+
+# Product search
+MSG_SEARCH_USAGE = "🔍 Напишите, что ищем: /search сыворотка с ниацинамидом"
+MSG_SEARCH_EMPTY = "Ничего не нашли по запросу «{query}». Попробуйте другие слова."
+MSG_SEARCH_RESULTS = "🔍 Результаты по запросу «{query}»:"
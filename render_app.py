@@ -9,7 +9,7 @@ import sys
 import asyncio
 import threading
 import signal
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 
 # Add current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -63,7 +63,18 @@ def _start_bot_background():
 @app.route("/health")
 def health():
     """Health check endpoint for Render"""
-    return jsonify({"status": "OK", "mode": "polling"})
+    from bot.warmup import get_warmup_state
+
+    # Polling receives no inbound traffic, so readiness is informational here
+    return jsonify({"status": "OK", "mode": "polling", "ready": get_warmup_state().ready})
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus metrics of the bot running in the background thread"""
+    from bot.metrics import CONTENT_TYPE, render_metrics
+
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
 
 
 def signal_handler(signum, frame):
@@ -78,6 +89,14 @@ if __name__ == "__main__":
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
 
+    # Webhook mode: aiohttp serves /health and the webhook in the bot's own event loop
+    if os.getenv("USE_WEBHOOK", "0").lower() in ("1", "true", "yes"):
+        print("🚀 Starting Render application (webhook mode, no Flask)...")
+        from bot.main import main as bot_main
+
+        asyncio.run(bot_main())
+        sys.exit(0)
+
     print("🚀 Starting Render Flask application (polling mode)...")
 
     # Start bot polling in background
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+"""
+⏱️ Settings Benchmark - стоимость get_settings() и производных конфигов
+
+Сравнивает создание Settings() на каждый вызов (как было раньше) с
+закешированным get_settings() и settings.security.
+
+    python scripts/bench_settings.py --calls 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.env import Settings, get_settings  # noqa: E402
+
+
+def per_call_us(stmt, calls: int) -> float:
+    return min(timeit.repeat(stmt, number=calls, repeat=3)) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    calls = parser.parse_args().calls
+
+    rows = [
+        ("Settings().security (uncached)", lambda: Settings().security),
+        ("get_settings()", get_settings),
+        ("get_settings().security", lambda: get_settings().security),
+    ]
+    for name, stmt in rows:
+        print(f"{name:<32} {per_call_us(stmt, calls):10.2f} µs/call")
+
+
+if __name__ == "__main__":
+    main()
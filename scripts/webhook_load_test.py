@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+🔥 Webhook Load Test - фейковый клиент Telegram против bot.webhook
+
+Поднимает webhook-приложение на localhost с диспетчером-заглушкой (каждое
+обновление "работает" --work-ms миллисекунд), отправляет --updates
+обновлений с --clients параллельными соединениями и печатает задержку
+подтверждения (p50/p95/p99), число 429 и время до полной обработки.
+
+    python scripts/webhook_load_test.py --updates 5000 --clients 64 --work-ms 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.types import Message  # noqa: E402
+from aiohttp import ClientSession, web  # noqa: E402
+
+from bot.webhook import WEBHOOK_HANDLER, build_webhook_app  # noqa: E402
+from config.env import TelegramConfig  # noqa: E402
+
+SECRET = "load-test-secret"
+
+
+def make_update(update_id: int) -> dict:
+    user = {"id": 1000 + update_id % 500, "is_bot": False, "first_name": "Load"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user["id"], "type": "private"},
+            "from": user,
+            "text": f"load {update_id}",
+        },
+    }
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def run(args: argparse.Namespace) -> None:
+    dp = Dispatcher()
+
+    @dp.message()
+    async def _work(message: Message) -> None:
+        await asyncio.sleep(args.work_ms / 1000)
+
+    bot = Bot("123456:LOAD-TEST")
+    telegram = TelegramConfig(token=bot.token, webhook_secret=SECRET, webapp_port=args.port)
+    app = build_webhook_app(
+        bot,
+        dp,
+        telegram,
+        max_concurrency=args.concurrency,
+        max_pending=args.max_pending,
+        register_webhook=False,
+    )
+    handler = app[WEBHOOK_HANDLER]
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    url = f"http://127.0.0.1:{args.port}{telegram.webhook_path}"
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    latencies: list = []
+    statuses: dict = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for update_id in range(1, args.updates + 1):
+        queue.put_nowait(update_id)
+
+    async def client(session: ClientSession) -> None:
+        while not queue.empty():
+            update_id = queue.get_nowait()
+            started = time.perf_counter()
+            async with session.post(url, json=make_update(update_id), headers=headers) as resp:
+                await resp.read()
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[resp.status] = statuses.get(resp.status, 0) + 1
+
+    started = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*(client(session) for _ in range(args.clients)))
+        acked = time.perf_counter() - started
+        while handler.pending:
+            await asyncio.sleep(0.01)
+    done = time.perf_counter() - started
+    await runner.cleanup()
+
+    print(f"📨 Sent {args.updates} updates with {args.clients} clients: {statuses}")
+    print(
+        f"⚡ Ack latency ms: p50={percentile(latencies, 0.5):.2f} "
+        f"p95={percentile(latencies, 0.95):.2f} p99={percentile(latencies, 0.99):.2f}"
+    )
+    print(f"⏱️ All acked in {acked:.2f}s, all processed in {done:.2f}s")
+    print(f"📊 Handler stats: {handler.snapshot()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--work-ms", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-pending", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=8089)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,45 +3,56 @@ Affiliate Links Service
 Генерация партнерских ссылок с приоритетом источников
 """
 
-import urllib.parse
 from typing import Dict, List, Optional, Any
 
+from engine.url_intel import get_url_intel
+
 # Try to import config, fallback to mock if not available
 try:
-    from config.env import get_settings
+    from config.env import get_settings, on_settings_reload
 
     _settings_available = True
 except ImportError:
     print("⚠️ Config module not available, using mock settings")
     get_settings = None
+    on_settings_reload = None
     _settings_available = False
 
 
 class AffiliateService:
     """Сервис для работы с партнерскими ссылками"""
 
+    # Пространство общего кеша url_intel: ссылка -> источник
+    SOURCE_CACHE = "source:affiliate_service"
+
     def __init__(self):
+        self.settings = self._load_settings()
+        self.affiliate_configs = self._build_affiliate_configs()
+
+    def _load_settings(self):
         if _settings_available and get_settings is not None:
             try:
-                self.settings = get_settings()
+                settings = get_settings()
                 print("✅ AffiliateService: Settings loaded successfully")
             except Exception as e:
                 print(f"⚠️ AffiliateService: Could not load settings: {e}, using defaults")
-                self.settings = None
+                settings = None
         else:
             print("⚠️ AffiliateService: Settings module not available, using defaults")
-            self.settings = None
+            settings = None
 
         # Use default values if settings not available
-        if self.settings is None:
-            self.settings = type(
+        if settings is None:
+            settings = type(
                 "MockSettings",
                 (),
                 {"affiliate_tag": "skincare_bot", "partner_code": "aff_skincare_bot"},
             )()
+        return settings
 
+    def _build_affiliate_configs(self) -> Dict[str, Dict[str, Any]]:
         # Конфигурация партнерских параметров для разных источников
-        self.affiliate_configs = {
+        return {
             "goldapple": {
                 "aff_param": "partner",
                 "campaign_param": "utm_campaign",
@@ -84,6 +95,12 @@ class AffiliateService:
             },
         }
 
+    def reload_settings(self) -> None:
+        """Перечитать партнерские коды и сбросить закешированные ссылки"""
+        self.settings = self._load_settings()
+        self.affiliate_configs = self._build_affiliate_configs()
+        get_url_intel().invalidate("affiliate")
+
     def build_ref_link(
         self, product: Dict[str, Any], campaign: str = "recommendation"
     ) -> Optional[str]:
@@ -163,26 +180,11 @@ class AffiliateService:
         # Проверяем по ссылке (высший приоритет)
         link = product.get("link") or product.get("url", "")
         if link:
-            link_lower = link.lower()
-
-            # Gold Apple - высший приоритет
-            if "goldapple" in link_lower:
-                return "goldapple"
-
-            # RU официальные магазины
-            if any(domain in link_lower for domain in ["letu.ru", "rive-gauche.ru", "sephora.ru"]):
-                return "ru_official"
-
-            # RU маркетплейсы
-            if any(
-                domain in link_lower
-                for domain in ["wildberries.ru", "ozon.ru", "yandex.market.ru", "market.yandex.ru"]
-            ):
-                return "ru_marketplace"
-
-            # Международные
-            if any(domain in link_lower for domain in ["amazon.com", "sephora.com", "ulta.com"]):
-                return "intl_authorized"
+            source = get_url_intel().memo(
+                self.SOURCE_CACHE, link, lambda: self._detect_source_by_link(link)
+            )
+            if source:
+                return source
 
         # Проверяем по названию/бренду (если не нашли по ссылке)
         brand = product.get("brand", "").lower()
@@ -202,6 +204,31 @@ class AffiliateService:
 
         return None
 
+    def _detect_source_by_link(self, link: str) -> Optional[str]:
+        """Источник по домену в ссылке (None - ссылка не распознана)"""
+        link_lower = link.lower()
+
+        # Gold Apple - высший приоритет
+        if "goldapple" in link_lower:
+            return "goldapple"
+
+        # RU официальные магазины
+        if any(domain in link_lower for domain in ["letu.ru", "rive-gauche.ru", "sephora.ru"]):
+            return "ru_official"
+
+        # RU маркетплейсы
+        if any(
+            domain in link_lower
+            for domain in ["wildberries.ru", "ozon.ru", "yandex.market.ru", "market.yandex.ru"]
+        ):
+            return "ru_marketplace"
+
+        # Международные
+        if any(domain in link_lower for domain in ["amazon.com", "sephora.com", "ulta.com"]):
+            return "intl_authorized"
+
+        return None
+
     def _add_affiliate_params(self, url: str, source: str, campaign: str) -> str:
         """Добавить партнерские параметры к URL"""
         if not url or not source:
@@ -214,33 +241,10 @@ class AffiliateService:
             return url
 
         try:
-            parsed = urllib.parse.urlparse(url)
-            params = urllib.parse.parse_qs(parsed.query)
-
-            # Безопасное добавление партнерских параметров
-            aff_param = config.get("aff_param")
-            partner_code = config.get("partner_code")
-            if aff_param and partner_code:
-                params[aff_param] = [partner_code]
-
-            source_param = config.get("source_param")
-            if source_param:
-                params[source_param] = [source]
-
-            medium_param = config.get("medium_param")
-            if medium_param:
-                params[medium_param] = ["affiliate"]
-
-            campaign_param = config.get("campaign_param")
-            if campaign_param:
-                params[campaign_param] = [campaign]
-
-            # Реконструируем URL
-            new_query = urllib.parse.urlencode(params, doseq=True)
-            new_url = parsed._replace(query=new_query).geturl()
-
-            return new_url
-
+            # Шаблон параметров и готовая ссылка кешируются в url_intel
+            intel = get_url_intel()
+            template = intel.template(source, config, default_campaign="")
+            return intel.affiliate_url(url, template, campaign)
         except Exception as e:
             print(f"❌ Error adding affiliate params to {url}: {e}")
             import traceback
@@ -272,9 +276,17 @@ def get_affiliate_service() -> AffiliateService:
     global _affiliate_service
     if _affiliate_service is None:
         _affiliate_service = AffiliateService()
+        if on_settings_reload is not None:
+            # Партнерские коды обновляются вместе с настройками (/reload_settings, SIGHUP)
+            on_settings_reload(_reload_affiliate_service)
     return _affiliate_service
 
 
+def _reload_affiliate_service(settings) -> None:
+    if _affiliate_service is not None:
+        _affiliate_service.reload_settings()
+
+
 def build_affiliate_link_safe(product_link: str | None, cfg: dict | None) -> str | None:
     """Безопасная функция для генерации партнерской ссылки с фолбэком"""
     if not product_link:
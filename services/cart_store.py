@@ -12,6 +12,8 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import time
 
+from engine.latency import PHASE_STORAGE, timed_phase
+
 
 @dataclass
 class CartItem:
@@ -106,6 +108,7 @@ class CartStore:
     def _cart_file(self, user_id: int) -> Path:
         return self.data_dir / f"cart_{user_id}.json"
 
+    @timed_phase(PHASE_STORAGE)
     def _load_cart(self, user_id: int) -> List[CartItem]:
         cart_file = self._cart_file(user_id)
         if not cart_file.exists():
@@ -126,6 +129,7 @@ class CartStore:
                 print(f"Malformed cart item for user {user_id}: {exc}")
         return items
 
+    @timed_phase(PHASE_STORAGE)
     def _save_cart(self, user_id: int, items: List[CartItem]) -> None:
         cart_file = self._cart_file(user_id)
         try:
@@ -4,7 +4,7 @@
 import sys
 import os
 import asyncio
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 
 # Add current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -24,6 +24,14 @@ def health():
     return "OK"
 
 
+@app.route("/metrics")
+def metrics():
+    """Prometheus metrics of the bot running in this process"""
+    from bot.metrics import CONTENT_TYPE, render_metrics
+
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
+
+
 @app.route("/webhook", methods=["GET", "POST"])
 def telegram_webhook():
     """Handle Telegram webhook requests"""
@@ -32,8 +40,8 @@ def telegram_webhook():
     if request.method == "GET":
         return jsonify({"status": "Webhook endpoint active", "method": "GET"})
 
-    # For POST requests - just acknowledge for now
-    print("📨 Webhook POST received")
+    # Updates are only processed in webhook mode (USE_WEBHOOK=1, see bot/webhook.py)
+    print("📨 Webhook POST received - ignored in polling mode")
     return jsonify({"status": "OK", "method": "POST"})
 
 
@@ -60,6 +68,12 @@ def run_bot():
 
 
 if __name__ == "__main__":
+    # Webhook mode: bot.main serves /health and the webhook itself (bot.webhook)
+    if os.getenv("USE_WEBHOOK", "0").lower() in ("1", "true", "yes"):
+        print("🚀 Starting bot in webhook mode (aiohttp server)...")
+        run_bot()
+        sys.exit(0)
+
     print("🚀 Starting combined Flask + Bot server...")
 
     # Start Flask in background thread
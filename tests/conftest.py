@@ -3,8 +3,18 @@ from __future__ import annotations
 import os
 import sys
 
+import pytest_asyncio
 
 # Ensure project root is on sys.path for imports like `engine` and `bot`
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
+
+
+@pytest_asyncio.fixture
+async def strict_loop():
+    """Тест падает, если event loop блокировался дольше LOOP_LAG_STRICT_MS (100 мс)."""
+    from bot.loop_monitor import strict_loop_monitor
+
+    async with strict_loop_monitor(float(os.getenv("LOOP_LAG_STRICT_MS", "100"))) as monitor:
+        yield monitor
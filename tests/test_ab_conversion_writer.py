@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты буферизованной записи метрик конверсии A/B тестов
+"""
+
+import csv
+
+from engine.ab_testing import (
+    CONVERSION_FIELDNAMES,
+    ABTestingFramework,
+    ABVariant,
+    ConversionMetricsWriter,
+)
+
+
+def _read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_log_conversion_keeps_csv_schema(tmp_path):
+    framework = ABTestingFramework(tests_dir=str(tmp_path))
+    framework.create_test(
+        "exp", "Exp", "desc", [ABVariant(id="a", name="A", content={}, weight=1.0)]
+    )
+    framework.start_test("exp")
+    framework.assign_user_to_variant(1, "exp")
+
+    framework.log_button_click(1, "exp", category_count=7)
+    framework.log_add_to_cart(1, "exp", items_added=2)
+    assert framework.flush_conversion_metrics()
+
+    with open(framework.conversion_metrics_file, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f))
+    assert header == CONVERSION_FIELDNAMES
+
+    rows = _read_rows(framework.conversion_metrics_file)
+    assert [r["event_type"] for r in rows] == ["button_click", "add_to_cart"]
+    assert rows[0]["category_count"] == "7"
+    assert rows[0]["items_added"] == ""
+    assert rows[1]["items_added"] == "2"
+    framework.close()
+
+
+def test_writer_batches_and_flushes_on_close(tmp_path):
+    path = tmp_path / "metrics.csv"
+    writer = ConversionMetricsWriter(path, batch_size=1000, flush_interval=60)
+
+    for i in range(10):
+        writer.write({"user_id": i, "event_type": "button_click"})
+
+    writer.close()
+    rows = _read_rows(path)
+    assert [int(r["user_id"]) for r in rows] == list(range(10))
+    assert writer.batches_written == 1
+
+    # После закрытия записи игнорируются
+    writer.write({"user_id": 99})
+    assert len(_read_rows(path)) == 10
+
+
+def test_writer_rotates_by_size(tmp_path):
+    path = tmp_path / "metrics.csv"
+    writer = ConversionMetricsWriter(path, batch_size=1, max_bytes=200, backup_count=2)
+
+    for i in range(30):
+        writer.write({"user_id": i, "test_id": "exp", "event_type": "button_click"})
+    writer.close()
+
+    assert writer.rotations > 0
+    rotated = tmp_path / "metrics.csv.1"
+    assert rotated.exists()
+    assert not (tmp_path / "metrics.csv.3").exists()
+    with open(rotated, newline="", encoding="utf-8") as f:
+        assert next(csv.reader(f)) == CONVERSION_FIELDNAMES
@@ -0,0 +1,105 @@
+"""
+🧪 Тесты индекса замен для товаров не в наличии
+"""
+
+from engine.alternatives_index import (
+    NEIGHBOR_SHADE,
+    OTHER_BRAND,
+    SAME_BRAND,
+    SEASON_UNIVERSAL,
+    AlternativesIndex,
+)
+from engine.models import Product
+from engine.shade_normalization import ShadeInfo
+
+
+class _Normalizer:
+    """Минимальная карта оттенков для тестов"""
+
+    shades = {
+        "ivory": ShadeInfo("found_002", "ivory", depth="light"),
+        "light": ShadeInfo("found_004", "light", depth="light"),
+        "medium": ShadeInfo("found_006", "medium", depth="medium"),
+    }
+
+    def __init__(self):
+        self.calls = 0
+
+    def normalize_shade(self, name):
+        self.calls += 1
+        return self.shades.get(name or "", ShadeInfo("unknown", name or ""))
+
+    def get_shade_neighbors(self, shade_id):
+        return {"found_002": ["found_004"]}.get(shade_id, [])
+
+    def get_season_universals(self, season):
+        return {"autumn": ["found_006"]}.get(season, [])
+
+
+def _product(key, brand, shade=None, in_stock=True, category="foundation"):
+    return Product(
+        id=key,
+        name=key,
+        brand=brand,
+        category=category,
+        price=1000.0,
+        in_stock=in_stock,
+        shade_name=shade,
+    )
+
+
+def _catalog():
+    return [
+        _product("a-ivory", "A", "ivory", in_stock=False),
+        _product("b-medium", "B", "medium"),
+        _product("c-light", "C", "light"),
+        _product("a-medium", "A", "medium"),
+        _product("d-ivory", "D", "ivory"),
+        _product("cream", "A", category="moisturizer"),
+    ]
+
+
+def test_ranked_alternatives_by_tier():
+    index = AlternativesIndex(_catalog(), normalizer=_Normalizer())
+
+    alternatives = index.alternatives("a-ivory", limit=None)
+    assert [(alt.product.key, alt.reason) for alt in alternatives] == [
+        ("a-medium", SAME_BRAND),
+        ("c-light", NEIGHBOR_SHADE),
+        ("d-ivory", "same_depth"),
+        ("b-medium", OTHER_BRAND),
+    ]
+
+    seasonal = index.alternatives("a-ivory", limit=None, season="autumn")
+    assert ("b-medium", SEASON_UNIVERSAL) in [(a.product.key, a.reason) for a in seasonal]
+
+
+def test_stock_flip_updates_lookup():
+    index = AlternativesIndex(_catalog(), normalizer=_Normalizer())
+
+    assert index.set_in_stock("a-medium", False)
+    assert index.alternatives("a-ivory", limit=1)[0].product.key == "c-light"
+
+    assert index.set_in_stock("a-medium", True)
+    assert index.alternatives("a-ivory", limit=1)[0].product.key == "a-medium"
+    assert not index.set_in_stock("missing", True)
+
+
+def test_shades_normalized_once_per_name():
+    normalizer = _Normalizer()
+    index = AlternativesIndex(_catalog(), normalizer=normalizer)
+    calls = normalizer.calls
+
+    for product in _catalog():
+        index.shade_info(product)
+    assert normalizer.calls == calls
+
+
+def test_category_alternatives_for_unknown_product():
+    index = AlternativesIndex(_catalog(), normalizer=_Normalizer())
+
+    alternatives = index.category_alternatives("Foundation", brand="d", limit=2)
+    assert [(a.product.key, a.reason) for a in alternatives] == [
+        ("d-ivory", SAME_BRAND),
+        ("b-medium", OTHER_BRAND),
+    ]
@@ -0,0 +1,105 @@
+"""
+🧪 Тесты singleflight/debounce для callback-кнопок
+"""
+
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.types import CallbackQuery, Update
+
+from bot.middlewares.callback_coalescing import CallbackCoalescingMiddleware
+
+
+class _FakeSession(AiohttpSession):
+    def __init__(self):
+        super().__init__()
+        self.answered = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.answered.append(method.callback_query_id)
+        return True
+
+
+def _update(update_id: int, data: str, user_id: int = 7) -> Update:
+    user = {"id": user_id, "is_bot": False, "first_name": "T"}
+    return Update(
+        update_id=update_id,
+        callback_query={"id": f"q{update_id}", "from": user, "chat_instance": "c", "data": data},
+    )
+
+
+def _setup(work: float = 0.05):
+    middleware = CallbackCoalescingMiddleware(debounce_ms=100)
+    dp = Dispatcher()
+    dp.callback_query.outer_middleware(middleware)
+    runs = {"started": [], "finished": []}
+
+    @dp.callback_query()
+    async def _handler(callback: CallbackQuery) -> None:
+        runs["started"].append(callback.data)
+        await asyncio.sleep(work)
+        runs["finished"].append(callback.data)
+        await callback.answer()
+
+    return middleware, dp, runs, Bot("123:TEST", session=_FakeSession())
+
+
+@pytest.mark.asyncio
+async def test_identical_inflight_callbacks_share_one_run_but_mutations_do_not():
+    middleware, dp, runs, bot = _setup()
+
+    await asyncio.gather(
+        *(dp.feed_update(bot, _update(i, "skincare_picker:start")) for i in (1, 2))
+    )
+    assert runs["finished"] == ["skincare_picker:start"]
+    assert middleware.stats.shared == 1
+    assert sorted(bot.session.answered) == ["q1", "q2"]
+
+    await asyncio.gather(*(dp.feed_update(bot, _update(i, "cart:inc:p1")) for i in (3, 4, 5)))
+    assert runs["finished"].count("cart:inc:p1") == 3
+    await bot.session.close()
+
+
+@pytest.mark.asyncio
+async def test_tap_storm_on_view_keeps_latest_and_cancels_superseded_work():
+    middleware, dp, runs, bot = _setup(work=0.15)
+
+    async def tap(update_id: int, data: str, delay: float):
+        await asyncio.sleep(delay)
+        await dp.feed_update(bot, _update(update_id, data))
+
+    await asyncio.gather(
+        tap(1, "report_tab:desc", 0),
+        tap(2, "report_tab:reco", 0.02),
+        tap(3, "report_tab:buy:2", 0.04),
+        dp.feed_update(bot, _update(9, "report_tab:desc", user_id=8)),
+    )
+
+    # первое нажатие стартовало сразу и было отменено, второе не стартовало;
+    # другой пользователь (q9) не затронут
+    assert runs["started"].count("report_tab:reco") == 0
+    assert runs["finished"] == ["report_tab:desc", "report_tab:buy:2"]
+    assert runs["started"].count("report_tab:desc") == 2
+    assert middleware.stats.cancelled == 1 and middleware.stats.superseded == 1
+    assert {"q1", "q2", "q3", "q9"} <= set(bot.session.answered)
+    await bot.session.close()
+
+
+@pytest.mark.asyncio
+async def test_taps_within_window_are_debounced_even_when_handler_is_fast():
+    middleware, dp, runs, bot = _setup(work=0.005)
+
+    async def tap(update_id: int, delay: float):
+        await asyncio.sleep(delay)
+        await dp.feed_update(bot, _update(update_id, f"rec:more:{update_id}"))
+
+    # нажатия каждые 40 мс при окне 100 мс: обработчик успевает закончиться
+    await asyncio.gather(*(tap(i, 0.04 * (i - 1)) for i in range(1, 6)))
+
+    assert runs["finished"] == ["rec:more:1", "rec:more:5"]
+    assert middleware.stats.superseded == 3 and middleware.stats.cancelled == 0
+    await asyncio.sleep(0.15)
+    assert middleware._slots == {}
+    await bot.session.close()
@@ -0,0 +1,106 @@
+"""
+🧪 Тесты запросов к каталогу по инвертированным индексам
+"""
+
+import random
+
+from engine.catalog_query import CatalogIndex
+from engine.models import Product
+
+
+def _catalog():
+    rng = random.Random(11)
+    return [
+        Product(
+            id=f"p{i}",
+            name=f"Product {i}",
+            brand="Brand",
+            category=rng.choice(["serum", "Serum", "cleanser", "foundation", "bb_cream"]),
+            subcategory=rng.choice([None, "gel", "foam"]),
+            finish=rng.choice([None, "matte", "Dewy"]),
+            undertone_match=rng.choice([None, "warm", "cool"]),
+            price=rng.choice([None, 300.0, 990.0, 1500.0, 2500.0]),
+            in_stock=rng.random() < 0.7,
+            tags=rng.sample(["hydrating", "vegan", "oily_skin", "spf"], rng.randint(0, 2)),
+            actives=rng.sample(["BHA", "niacinamide", "ceramide", "retinol"], rng.randint(0, 2)),
+        )
+        for i in range(400)
+    ]
+
+
+def test_compiled_query_matches_linear_scan():
+    catalog = _catalog()
+    index = CatalogIndex(catalog)
+
+    query = (
+        index.query()
+        .category("serum")
+        .actives_any(["bha", "Ceramide"])
+        .tags_any(["hydrating", "vegan"])
+        .finish_in(["matte", "dewy"])
+        .in_stock()
+        .price_between(500, 2000)
+    )
+    expected = [
+        p
+        for p in catalog
+        if p.category.lower() == "serum"
+        and {a.lower() for a in p.actives} & {"bha", "ceramide"}
+        and {"hydrating", "vegan"} & set(p.tags)
+        and (p.finish or "").lower() in ("matte", "dewy")
+        and p.in_stock
+        and p.price is not None
+        and 500 <= p.price <= 2000
+    ]
+    assert expected and list(query) == expected
+    assert query.count() == len(expected)
+
+    undertone = list(index.query().undertone("warm").subcategory("gel"))
+    assert undertone == [
+        p
+        for p in catalog
+        if p.undertone_match is not None
+        and p.undertone_match.value == "warm"
+        and p.subcategory == "gel"
+    ]
+
+    exact = list(index.query().category("Serum", exact=True))
+    assert exact == [p for p in catalog if p.category == "Serum"]
+
+    contains = list(index.query().category_contains("foundation", "bb_cream"))
+    assert contains == [p for p in catalog if p.category in ("foundation", "bb_cream")]
+
+
+def test_pagination_and_stock_updates():
+    catalog = _catalog()
+    index = CatalogIndex(catalog)
+    query = index.query().category("cleanser")
+    matches = list(query)
+
+    page = query.page(2, per_page=8)
+    assert page.items == matches[8:16]
+    assert page.total == len(matches)
+    assert page.pages == (len(matches) + 7) // 8
+    assert query.page(999, per_page=8).page == page.pages
+    assert index.query().category("missing").page(3).pages == 1
+
+    product = next(p for p in catalog if not p.in_stock)
+    product.in_stock = True
+    index.set_in_stock(product, True)
+    assert product in list(index.query().in_stock())
+    index.set_in_stock(product, False)
+    assert product not in list(index.query().in_stock())
+
+
+def test_catalog_store_query():
+    from engine.catalog_store import CatalogStore
+
+    store = CatalogStore("assets/fixed_catalog.yaml")
+    store._load_if_needed(force=True)
+    catalog = store.get()
+
+    category = catalog[0].category
+    assert list(store.query().category(category, exact=True)) == [
+        p for p in catalog if p.category == category
+    ]
+    assert store.query().count() == len(catalog)
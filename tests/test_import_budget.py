@@ -0,0 +1,59 @@
+"""
+🧪 Бюджет холодного импорта bot.main (python -X importtime)
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+# Бюджет на холодный импорт bot.main; переопределяется для медленных CI
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "250"))
+
+# Тяжелые пакеты, которые должны грузиться только при регистрации роутеров
+DEFERRED_PREFIXES = ("aiogram", "bot.handlers", "engine", "services", "fpdf", "ruamel")
+
+
+def _run(code: str, *flags: str, cwd: str = ROOT) -> subprocess.CompletedProcess:
+    env = {**os.environ, "BOT_TOKEN": os.getenv("BOT_TOKEN", "123:abc"), "PYTHONPATH": ROOT}
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+        check=True,
+    )
+
+
+def _importtime(stderr: str) -> dict:
+    """name -> cumulative microseconds из вывода -X importtime"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def test_bot_main_cold_import_within_budget():
+    modules = _importtime(_run("import bot.main", "-X", "importtime").stderr)
+
+    heavy = sorted(name for name in modules if name.startswith(DEFERRED_PREFIXES))
+    assert heavy == [], f"bot.main imports heavy modules eagerly: {heavy[:10]}"
+    assert modules["bot.main"] / 1000 <= IMPORT_BUDGET_MS
+
+
+def test_router_import_has_no_singleton_side_effects(tmp_path):
+    # Корзины и история A/B назначений не читаются при импорте роутеров
+    code = (
+        "import bot.main, services.cart_store as c, engine.ab_testing as a;"
+        "routers = bot.main.load_routers();"
+        "assert len(routers) == len(bot.main.ROUTER_MODULES);"
+        "assert c.CartStore._instance is None, 'CartStore';"
+        "assert a._ab_framework is None, 'ABTestingFramework'"
+    )
+    _run(code, cwd=str(tmp_path))
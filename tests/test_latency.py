@@ -0,0 +1,89 @@
+"""
+🧪 Тесты гистограмм задержек и latency middleware
+"""
+
+import asyncio
+import time
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.types import CallbackQuery, Update
+
+from bot.middlewares.latency import format_latency_report, install_latency_middleware
+from engine.latency import LatencyHistogram, LatencyRegistry, get_latency_registry, timed_phase
+
+
+def test_histogram_percentiles_within_bucket_error():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(ms)
+
+    assert histogram.count == 1000
+    assert histogram.summary()["max"] == 1000
+    for q in (50, 95, 99):
+        assert abs(histogram.percentile(q) - q * 10) <= q * 10 * 0.07
+    assert histogram.cumulative([100, 2000]) == [pytest.approx(100, abs=7), 1000]
+
+    registry = LatencyRegistry()
+    registry.record("cart_v2", "cart:", "handler", 5)
+    assert registry.snapshot()[0]["p99"] == pytest.approx(5, rel=0.07)
+
+    # /metrics читает снимок из потока: новые записи его не меняют
+    ((_, scraped),) = registry.items()
+    registry.record("cart_v2", "cart:", "handler", 900)
+    assert scraped.count == 1 and len(scraped.counts) == 1
+
+
+class _FakeSession(AiohttpSession):
+    async def make_request(self, bot, method, timeout=None):
+        await asyncio.sleep(0.02)
+        return True
+
+
+@timed_phase("selector")
+def _select():
+    time.sleep(0.01)
+    return _select_nested()
+
+
+@timed_phase("selector")
+def _select_nested():
+    time.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_middleware_records_handler_and_phases_by_router_and_prefix():
+    registry = get_latency_registry()
+    registry.reset()
+    bot = Bot("123:TEST", session=_FakeSession())
+    dp = Dispatcher()
+    router = Router()
+
+    @router.callback_query()
+    async def _handler(callback: CallbackQuery, bot: Bot) -> None:
+        _select()
+        await bot.answer_callback_query(callback.id)
+
+    install_latency_middleware(dp, bot)
+    dp.include_router(router)
+
+    user = {"id": 7, "is_bot": False, "first_name": "T"}
+    update = Update(
+        update_id=1,
+        callback_query={"id": "q1", "from": user, "chat_instance": "c", "data": "cart:add:p1"},
+    )
+    await dp.feed_update(bot, update)
+    await bot.session.close()
+
+    rows = {(r["router"], r["prefix"], r["phase"]): r for r in registry.snapshot()}
+    handler = rows[("test_latency", "cart:", "handler")]
+    selector = rows[("test_latency", "cart:", "selector")]
+    api = rows[("test_latency", "cart:", "telegram_api")]
+    assert handler["count"] == selector["count"] == api["count"] == 1
+    # вложенный вызов той же фазы не считается дважды
+    assert 18 <= selector["p50"] < 30
+    assert api["p50"] >= 18
+    assert handler["p50"] >= selector["p50"] + api["p50"] - 1
+    assert "test_latency cart:" in format_latency_report(registry.snapshot())
+    registry.reset()
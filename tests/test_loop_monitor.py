@@ -0,0 +1,64 @@
+"""
+🧪 Тесты монитора задержки event loop (строгий режим и место блокировки)
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+import pytest
+
+from bot.loop_monitor import BlockingCallError, strict_loop_monitor
+from engine.logging_setup import JSONLineFormatter
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.setFormatter(JSONLineFormatter())
+        self.lines = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.lines.append(self.format(record))
+
+
+def _logger():
+    logger = logging.getLogger("test_loop_lag")
+    logger.propagate = False
+    logger.handlers = [_ListHandler()]
+    return logger
+
+
+def _blocking_render():
+    time.sleep(0.25)
+
+
+@pytest.mark.asyncio
+async def test_strict_mode_reports_blocking_call_site_as_json():
+    logger = _logger()
+
+    with pytest.raises(BlockingCallError) as excinfo:
+        async with strict_loop_monitor(threshold_ms=100, logger=logger) as monitor:
+            await asyncio.sleep(0.05)
+            _blocking_render()
+
+    assert "test_loop_monitor.py" in str(excinfo.value)
+    event = monitor.violations[0]
+    assert event.lag_ms >= 100
+    assert event.call_site.startswith("tests/test_loop_monitor.py:")
+    assert event.call_site.endswith("in _blocking_render")
+
+    record = json.loads(logger.handlers[0].lines[0])
+    assert record["payload"]["event"] == "event_loop_blocked"
+    assert record["payload"]["call_site"] == event.call_site
+    assert any("test_strict_mode_reports" in frame for frame in record["payload"]["stack"])
+
+
+@pytest.mark.asyncio
+async def test_strict_loop_fixture_allows_offloaded_work(strict_loop):
+    await asyncio.sleep(0.1)
+    await asyncio.to_thread(time.sleep, 0.2)
+
+    assert strict_loop.samples > 5
+    assert not strict_loop.violations
@@ -0,0 +1,93 @@
+"""
+🧪 Тесты /metrics: формат Prometheus exposition проверяется локальным скрейпером
+"""
+
+import re
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.loop_monitor import get_loop_monitor
+from bot.metrics import CONTENT_TYPE, render_metrics
+from bot.webhook import build_webhook_app
+from config.env import TelegramConfig
+from engine.latency import get_latency_registry
+
+NAME = r"[a-zA-Z_:][a-zA-Z0-9_:]*"
+SAMPLE = re.compile(rf'^({NAME})(?:\{{((?:{NAME}="(?:[^"\\]|\\.)*",?)*)\}})? (\S+)$')
+LABEL = re.compile(rf'({NAME})="((?:[^"\\]|\\.)*)"')
+
+
+def scrape(text: str) -> dict:
+    """Разбор exposition 0.0.4: {family: {"type": ..., "samples": [(name, labels, value)]}}"""
+    assert text.endswith("\n")
+    families: dict = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            name = line.split()[2]
+            assert name not in families, f"duplicate family {name}"
+            families[name] = {"type": None, "samples": []}
+            current = name
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            assert name == current and kind in ("counter", "gauge", "histogram")
+            families[name]["type"] = kind
+        else:
+            match = SAMPLE.match(line)
+            assert match, f"bad sample line: {line!r}"
+            name, labels, value = match.groups()
+            assert current and name.startswith(current), f"sample outside family: {line!r}"
+            float(value)
+            families[current]["samples"].append(
+                (name, dict(LABEL.findall(labels or "")), float(value))
+            )
+    return families
+
+
+def test_metrics_exposition_format_and_histograms():
+    registry = get_latency_registry()
+    registry.reset()
+    for ms in (3, 40, 700):
+        registry.record("cart_v2", "cart:", "handler", ms)
+    registry.record("cart_v2", "cart:", "storage", 2)
+    get_loop_monitor().record(12.5)
+
+    families = scrape(render_metrics())
+    registry.reset()
+
+    updates = families["skin_advisor_updates_total"]
+    assert updates["type"] == "counter"
+    assert updates["samples"] == [
+        ("skin_advisor_updates_total", {"router": "cart_v2", "prefix": "cart:"}, 3)
+    ]
+
+    latency = families["skin_advisor_update_latency_seconds"]
+    assert latency["type"] == "histogram"
+    handler = [s for s in latency["samples"] if s[1].get("phase") == "handler"]
+    buckets = [(s[1]["le"], s[2]) for s in handler if s[0].endswith("_bucket")]
+    counts = [count for _, count in buckets]
+    assert counts == sorted(counts) and buckets[-1] == ("+Inf", 3)
+    assert dict(buckets)["0.005"] == 1 and dict(buckets)["1"] == 3
+    assert [s[2] for s in handler if s[0].endswith("_count")] == [3]
+
+    assert families["skin_advisor_event_loop_lag_seconds"]["samples"][0][2] == 0.0125
+    assert families["skin_advisor_fsm_active_sessions"]["type"] == "gauge"
+    assert {"pdf_jobs"} <= {s[1]["queue"] for s in families["skin_advisor_queue_depth"]["samples"]}
+    assert {"profile", "report_pdf"} <= {
+        s[1]["cache"] for s in families["skin_advisor_cache_hits_total"]["samples"]
+    }
+    assert families["process_resident_memory_bytes"]["samples"][0][2] > 0
+
+
+@pytest.mark.asyncio
+async def test_webhook_serves_metrics():
+    telegram = TelegramConfig(token="123:TEST", webhook_path="/tg")
+    app = build_webhook_app(Bot("123:TEST"), Dispatcher(), telegram, register_webhook=False)
+
+    async with TestClient(TestServer(app)) as client:
+        response = await client.get("/metrics")
+        assert response.status == 200
+        assert response.headers["Content-Type"] == CONTENT_TYPE
+        assert "process_resident_memory_bytes" in scrape(await response.text())
@@ -0,0 +1,157 @@
+"""
+🧪 Тесты исходящей очереди: склейка правок, лимиты и retry_after
+"""
+
+import asyncio
+import time
+
+import pytest
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from bot.utils.outbound import (
+    OutboundDispatcher,
+    OutboundRequestMiddleware,
+    TokenBucket,
+    edit_fingerprint,
+)
+from engine.latency import PHASE_TELEGRAM_API, phase, trace_update
+
+
+class _FakeApi:
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.calls = []
+
+    def edit(self, text: str):
+        async def call():
+            self.calls.append(("edit", text, time.monotonic()))
+            await asyncio.sleep(self.delay)
+            return text
+
+        return call
+
+    def send(self, text: str, fail_times: int = 0):
+        state = {"left": fail_times}
+
+        async def call():
+            self.calls.append(("send", text, time.monotonic()))
+            if state["left"]:
+                state["left"] -= 1
+                raise TelegramRetryAfter(SendMessage(chat_id=1, text=text), "flood", 1)
+            return text
+
+        return call
+
+
+@pytest.mark.asyncio
+async def test_queued_edits_of_one_message_collapse_into_latest():
+    api = _FakeApi()
+    dispatcher = OutboundDispatcher(chat_rate=1000, chat_burst=100)
+    dispatcher.start()
+
+    first = asyncio.create_task(
+        dispatcher.edit(1, 10, api.edit("qty 1"), edit_fingerprint("qty 1"))
+    )
+    await asyncio.sleep(0)  # первая правка уже в работе
+    rest = [
+        asyncio.create_task(
+            dispatcher.edit(1, 10, api.edit(f"qty {n}"), edit_fingerprint(f"qty {n}"))
+        )
+        for n in range(2, 6)
+    ]
+    results = await asyncio.gather(first, *rest)
+
+    assert [text for _, text, _ in api.calls] == ["qty 1", "qty 5"]
+    assert results == ["qty 1"] + ["qty 5"] * 4
+    assert dispatcher.stats.merged == 3 and dispatcher.stats.edited == 2
+
+    # повтор того же содержимого сразу после отправки не уходит в Telegram
+    assert await dispatcher.edit(1, 10, api.edit("qty 5"), edit_fingerprint("qty 5")) is None
+    assert dispatcher.stats.dropped == 1 and len(api.calls) == 2
+    await dispatcher.stop()
+    assert dispatcher.snapshot()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_bucket_limits_rate_and_retry_after_pauses_chat():
+    api = _FakeApi()
+    dispatcher = OutboundDispatcher(chat_rate=20, chat_burst=1)
+    dispatcher.start()
+
+    started = time.monotonic()
+    await asyncio.gather(*(dispatcher.send(5, api.send(f"m{n}")) for n in range(5)))
+    # 1 токен сразу, остальные 4 - по 50 мс; порядок чата сохраняется
+    assert time.monotonic() - started >= 0.18
+    assert [text for _, text, _ in api.calls] == ["m0", "m1", "m2", "m3", "m4"]
+
+    api.calls.clear()
+    assert await dispatcher.send(5, api.send("flood", fail_times=1)) == "flood"
+    assert len(api.calls) == 2 and api.calls[1][2] - api.calls[0][2] >= 0.95
+    assert dispatcher.stats.retried == 1 and dispatcher.stats.sent == 6
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_queued_call_runs_in_caller_context():
+    dispatcher = OutboundDispatcher(chat_rate=1000, chat_burst=100)
+    dispatcher.start()
+
+    async def api_call():
+        with phase(PHASE_TELEGRAM_API):
+            await asyncio.sleep(0.01)
+
+    async def update(prefix: str):
+        with trace_update(prefix) as trace:
+            await dispatcher.send(1, api_call)
+        return trace
+
+    # второе обновление попадает в воркер чата, созданный первым
+    first, second = await asyncio.gather(update("first"), update("second"))
+    assert PHASE_TELEGRAM_API in first.phases and PHASE_TELEGRAM_API in second.phases
+    await dispatcher.stop()
+
+
+class _FakeSession(AiohttpSession):
+    def __init__(self):
+        super().__init__()
+        self.methods = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.methods.append((method.__api_method__, getattr(method, "text", None)))
+        await asyncio.sleep(0.01)
+        return True
+
+
+@pytest.mark.asyncio
+async def test_session_middleware_queues_every_chat_edit_and_send():
+    dispatcher = OutboundDispatcher(chat_rate=1000, chat_burst=100)
+    dispatcher.start()
+    bot = Bot("123:TEST", session=_FakeSession())
+    bot.session.middleware(OutboundRequestMiddleware(dispatcher))
+
+    # листание подбора мимо safe_edit_message_text: правки склеиваются
+    await asyncio.gather(
+        *(bot.edit_message_text(text=f"page {n}", chat_id=1, message_id=10) for n in range(5)),
+        bot.send_message(chat_id=1, text="hello"),
+        bot.answer_callback_query("q1"),
+        bot.send_chat_action(chat_id=1, action="typing"),
+    )
+
+    texts = [text for name, text in bot.session.methods if name == "editMessageText"]
+    assert texts == ["page 4"]
+    assert dispatcher.stats.merged == 4
+    assert dispatcher.stats.edited == 1 and dispatcher.stats.sent == 1
+    assert ("answerCallbackQuery", None) in bot.session.methods
+    await dispatcher.stop()
+    await bot.session.close()
+
+
+def test_token_bucket_reserves_in_debt():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    bucket.pause(1)
+    assert bucket.reserve() >= 1.1
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты реестра шрифтов для PDF генераторов
+"""
+
+import os
+from datetime import datetime, timezone
+
+import pytest
+from fpdf import FPDF
+
+from bot.ui.pdf_fonts import FONT_CANDIDATES, FontRegistry
+
+DEJAVU = next((p for p in FONT_CANDIDATES["DejaVu"] if os.path.exists(p)), None)
+
+pytestmark = pytest.mark.skipif(DEJAVU is None, reason="DejaVu font is not installed")
+
+
+def _render(setup) -> bytes:
+    pdf = FPDF(unit="mm", format="A4")
+    # Фиксированная дата, иначе CreationDate отличается на границе секунды
+    pdf.set_creation_date(datetime(2024, 1, 1, tzinfo=timezone.utc))
+    pdf.add_page()
+    setup(pdf)
+    pdf.set_font("DejaVu", size=11)
+    pdf.multi_cell(0, 6, "Отчёт по цветотипу: осень, тёплый подтон")
+    pdf.set_font("DejaVu", "B", 14)
+    pdf.cell(0, 8, "ЧТО КУПИТЬ")
+    return bytes(pdf.output())
+
+
+def test_cached_font_produces_identical_pdf():
+    registry = FontRegistry()
+
+    def with_add_font(pdf):
+        pdf.add_font("DejaVu", "", DEJAVU)
+        pdf.add_font("DejaVu", "B", DEJAVU)
+
+    expected = _render(with_add_font)
+    assert _render(lambda pdf: registry.apply(pdf, "DejaVu", styles=("", "B"))) == expected
+    # Повторное использование не накапливает состояние между документами
+    assert _render(lambda pdf: registry.apply(pdf, "DejaVu", styles=("", "B"))) == expected
+
+
+def test_paths_resolved_once(monkeypatch):
+    registry = FontRegistry()
+    registry.resolve()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("font paths must not be probed per report")
+
+    monkeypatch.setattr(os.path, "exists", fail)
+    pdf = FPDF()
+    assert registry.apply(pdf, "DejaVu")
+    assert "dejavu" in pdf.fonts
+
+
+def test_missing_family_returns_false():
+    registry = FontRegistry(candidates={"Nope": ["/nonexistent/font.ttf"]})
+    pdf = FPDF()
+    assert registry.apply(pdf, "Nope") is False
+    assert not pdf.fonts
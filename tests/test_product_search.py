@@ -0,0 +1,127 @@
+"""
+🧪 Тесты полнотекстового поиска по каталогу
+"""
+
+import time
+
+from engine.models import Product
+from engine.product_search import ProductSearchIndex, tokenize
+
+
+def _catalog():
+    return [
+        Product(
+            id="lrp-serum",
+            name="Сыворотка с ниацинамидом",
+            brand="La Roche-Posay",
+            category="serum",
+            actives=["niacinamide"],
+        ),
+        Product(
+            id="cerave-foam",
+            name="Очищающий гель-пенка",
+            brand="CeraVe",
+            category="cleanser",
+            tags=["oily_skin"],
+        ),
+        Product(
+            id="ret-cream",
+            name="Ночной крём с ретинолом",
+            brand="The Ordinary",
+            category="moisturizer",
+            actives=["retinol"],
+        ),
+        Product(id="lip", name="Matte Lipstick", brand="Rouge", category="lipstick"),
+    ]
+
+
+def test_tokenize_normalizes_case_and_yo():
+    assert tokenize("Ночной КРЁМ, La_Roche-Posay 2%") == [
+        "ночной",
+        "крем",
+        "la",
+        "roche",
+        "posay",
+        "2",
+    ]
+
+
+def test_search_exact_prefix_and_typos():
+    index = ProductSearchIndex(_catalog())
+
+    def keys(query, **kwargs):
+        return [p.key for p in index.search(query, **kwargs)]
+
+    assert keys("la roche сыворотка") == ["lrp-serum"]
+    assert keys("крем") == ["ret-cream"]
+    assert keys("CERAV") == ["cerave-foam"]
+    assert keys("ретинал") == ["ret-cream"]
+    assert keys("lipstik matte") == ["lip"]
+    assert keys("oily skin cleanser")[0] == "cerave-foam"
+    assert set(keys("cerave ретинол")) == {"ret-cream", "cerave-foam"}
+    assert keys("cerave ретинол", require_all=True) == []
+    assert index.best("гель пенка cerave").key == "cerave-foam"
+    assert index.search("") == [] and index.best("zzzz") is None
+
+
+def test_unique_requires_exact_unambiguous_match():
+    catalog = _catalog() + [
+        Product(id="cerave-cream", name="Увлажняющий крем", brand="CeraVe", category="cream")
+    ]
+    index = ProductSearchIndex(catalog)
+
+    assert index.unique("cerave") is None  # два продукта бренда
+    assert index.unique("cerave пенка").key == "cerave-foam"
+    assert index.unique("ПЕНКА гель").key == "cerave-foam"
+    assert index.unique("cerav пенка") is None  # префикс не считается
+    assert index.unique("ретинал") is None  # опечатка не считается
+    assert index.unique("") is None
+
+
+def test_cart_lookup_rejects_ambiguous_search_fallback(monkeypatch):
+    from bot.handlers import cart_v2
+    from engine.catalog_store import CatalogStore
+
+    catalog = _catalog() + [
+        Product(id="cerave-cream", name="Увлажняющий крем", brand="CeraVe", category="cream")
+    ]
+    store = CatalogStore.__new__(CatalogStore)
+    store._catalog = catalog
+    store._search = ProductSearchIndex(catalog)
+    monkeypatch.setattr(store, "_load_if_needed", lambda force: None)
+    monkeypatch.setattr(cart_v2, "_catalog_store", store)
+
+    assert cart_v2.find_product_by_id("cerave") is None
+    assert cart_v2.find_product_by_id("пенка cerave").key == "cerave-foam"
+    assert cart_v2.find_product_by_id("cerav пенка") is None
+
+
+def test_search_is_fast_on_large_catalog():
+    base = _catalog()
+    catalog = [
+        Product(
+            id=f"{p.key}-{i}",
+            name=f"{p.title} {i}",
+            brand=p.brand,
+            category=p.category,
+            actives=p.actives,
+        )
+        for i in range(1500)
+        for p in base
+    ]
+    index = ProductSearchIndex(catalog)
+
+    started = time.perf_counter()
+    for query in ("сыворотка ниацинамид", "ретинал", "cerave гель"):
+        assert index.search(query, limit=8)
+    assert (time.perf_counter() - started) / 3 < 0.05
+
+
+def test_catalog_store_search():
+    from engine.catalog_store import CatalogStore
+
+    store = CatalogStore("assets/fixed_catalog.yaml")
+    store._load_if_needed(force=True)
+    product = store.get()[0]
+
+    assert product in store.search(f"{product.brand} {product.title}", limit=3)
@@ -0,0 +1,170 @@
+"""
+🧪 Тесты ленивых полей карточек продукта
+"""
+
+import copy
+import json
+import pickle
+
+from engine.models import Product, UserProfile
+from engine.product_view import LazyProductDict
+from engine.selector import SelectorV2
+
+
+def _counting_view():
+    calls = {"explain": 0}
+
+    def explain():
+        calls["explain"] += 1
+        return "подходит вам"
+
+    view = LazyProductDict({"id": "p1", "brand": "Brand"}, lazy={"explain": explain})
+    return view, calls
+
+
+def test_lazy_field_computed_once_on_access():
+    view, calls = _counting_view()
+
+    assert calls["explain"] == 0
+    assert "explain" in view
+    assert len(view) == 3
+    assert calls["explain"] == 0
+
+    assert view["explain"] == "подходит вам"
+    assert view.get("explain") == "подходит вам"
+    assert calls["explain"] == 1
+    assert view.pending_keys == frozenset()
+
+
+def test_behaves_like_plain_dict():
+    view, calls = _counting_view()
+    plain = {"id": "p1", "brand": "Brand", "explain": "подходит вам"}
+
+    assert view == plain
+    assert json.loads(json.dumps(view)) == plain
+    assert dict(view) == plain
+    assert {**view} == plain
+    assert calls["explain"] == 1
+
+    restored = pickle.loads(pickle.dumps(view))
+    assert type(restored) is dict and restored == plain
+    assert copy.deepcopy(view) == plain
+
+    view["explain"] = "override"
+    assert view["explain"] == "override"
+    assert view.get("missing", "default") == "default"
+
+
+def test_assignment_skips_pending_computation():
+    view, calls = _counting_view()
+    view["explain"] = "готово"
+    del view["brand"]
+
+    assert dict(view) == {"id": "p1", "explain": "готово"}
+    assert calls["explain"] == 0
+
+
+def test_selector_defers_explanations(monkeypatch):
+    selector = SelectorV2()
+    product = Product(
+        id="p1",
+        name="Gentle Cleanser",
+        brand="Brand",
+        category="cleanser",
+        price=500.0,
+        buy_url="https://goldapple.ru/p1",
+        actives=["hyaluronic_acid"],
+    )
+    profile = UserProfile(user_id=1, skin_type="dry", dehydrated=True)
+
+    calls = []
+    monkeypatch.setattr(
+        selector, "_get_match_reason", lambda p, prof: calls.append(p.key) or "увлажнение"
+    )
+
+    card = selector._product_to_dict(product, "aff", None, profile)
+    assert card["name"] == "Gentle Cleanser"
+    assert calls == []
+
+    assert card["match_reason"] == "увлажнение"
+    assert card["ref_link"] == "https://goldapple.ru/p1?aff=aff"
+    assert card["explain"]
+    assert isinstance(card["source_priority"], int)
+    assert calls == ["p1"]
+
+
+def test_catalog_store_precomputes_projections():
+    from engine.catalog_store import CatalogStore
+
+    store = CatalogStore("assets/fixed_catalog.yaml")
+    store._load_if_needed(force=True)
+    catalog = store.get()
+    assert catalog
+
+    product = catalog[0]
+    projection = store.projection(product)
+    assert projection is not None
+    assert projection.product_id == product.key
+    assert store.projection(product.model_copy()) is None
+
+    # Ссылка для партнерского кода считается один раз
+    link = projection.ref_link("aff", None)
+    assert projection.ref_link("aff", None) is link
+
+    card = projection.card("aff")
+    card["tags"].append("mutated")
+    assert "mutated" not in projection.tags
+
+    summary = store.summaries()[0]
+    assert summary["id"] == product.key
+    assert summary["price"] == (product.price or 0)
+
+
+def test_set_in_stock_patches_only_the_changed_summary():
+    from engine.catalog_store import CatalogStore
+
+    store = CatalogStore("assets/fixed_catalog.yaml")
+    store._load_if_needed(force=True)
+    product = store.get()[1]
+    summaries = store.summaries()
+    before = list(summaries)
+
+    assert store.set_in_stock(product.key, False)
+    assert store.projection(product).in_stock is False
+    assert store.summaries() is summaries
+    assert all(a is b for i, (a, b) in enumerate(zip(before, summaries)) if i != 1)
+    assert summaries[1] is store.projection(product).summary
+    assert not store.set_in_stock("missing-product", True)
+
+
+def test_projection_links_follow_settings_reload(tmp_path, monkeypatch):
+    from config import env
+    from engine import catalog_store
+
+    catalog = tmp_path / "catalog.yaml"
+    catalog.write_text(
+        "products:\n"
+        '  - {id: "t-001", brand: Brand, name: Gel, category: cleanser, price: 100,\n'
+        "     buy_url: https://goldapple.ru/t-001, in_stock: true}\n",
+        encoding="utf-8",
+    )
+
+    monkeypatch.setenv("BOT_TOKEN", "123:TEST")
+    monkeypatch.setenv("PARTNER_CODE", "first_code")
+    monkeypatch.setattr(catalog_store.CatalogStore, "_instance", None)
+    monkeypatch.setattr(env, "_settings", env._settings)  # undo() вернет прежний кеш
+    env.reload_settings()
+    try:
+        store = catalog_store.CatalogStore.instance(str(catalog))
+        product = store.get()[0]
+        assert list(store.projection(product)._ref_links) == [("first_code", None)]
+
+        # /reload_settings и SIGHUP пересобирают проекции через хук
+        monkeypatch.setenv("PARTNER_CODE", "second_code")
+        env.reload_settings()
+        projection = store.projection(product)
+        assert projection._ref_links == {
+            ("second_code", None): "https://goldapple.ru/t-001?aff=second_code"
+        }
+    finally:
+        monkeypatch.undo()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты контентно-адресуемого кеша PDF отчетов
+"""
+
+import os
+
+import pytest
+
+from bot.ui.report_cache import ReportCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ReportCache(root=str(tmp_path / "reports"))
+
+
+def _generator(cache, uid, filename, content, calls):
+    def generate():
+        calls.append(content)
+        path = cache.user_path(uid, filename)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content.encode("utf-8"))
+        return str(path)
+
+    return generate
+
+
+def test_key_ignores_dict_order_and_depends_on_kind(cache):
+    a = {"type": "palette", "profile": {"season": "autumn", "undertone": "warm"}}
+    b = {"profile": {"undertone": "warm", "season": "autumn"}, "type": "palette"}
+    assert cache.compute_key("structured", a) == cache.compute_key("structured", b)
+    assert cache.compute_key("structured", a) != cache.compute_key("simple", a)
+    assert cache.compute_key("structured", a) != cache.compute_key(
+        "structured", {**a, "type": "skincare"}
+    )
+
+
+def test_hit_skips_regeneration(cache):
+    calls = []
+    snapshot = {"type": "palette", "result": {"buy": [1, 2]}}
+
+    first = cache.render(
+        "structured", 1, "last_v2.pdf", snapshot, _generator(cache, 1, "last_v2.pdf", "A", calls)
+    )
+    second = cache.render(
+        "structured", 1, "last_v2.pdf", snapshot, _generator(cache, 1, "last_v2.pdf", "A", calls)
+    )
+
+    assert first == second
+    assert calls == ["A"]
+    assert cache.hits == 1
+    key = cache.compute_key("structured", snapshot)
+    assert cache.read_ref(1, "last_v2.pdf") == key
+    assert cache.blob_path(key).read_bytes() == b"A"
+
+
+def test_blob_shared_between_users_and_not_corrupted(cache):
+    calls = []
+    same = {"type": "palette"}
+    cache.render(
+        "structured", 1, "last_v2.pdf", same, _generator(cache, 1, "last_v2.pdf", "A", calls)
+    )
+    path2 = cache.render(
+        "structured", 2, "last_v2.pdf", same, _generator(cache, 2, "last_v2.pdf", "A", calls)
+    )
+    assert calls == ["A"]
+    assert open(path2, "rb").read() == b"A"
+
+    # Новый отчет пользователя 1 не должен перезаписать общий blob
+    cache.render(
+        "structured",
+        1,
+        "last_v2.pdf",
+        {"type": "skincare"},
+        _generator(cache, 1, "last_v2.pdf", "B", calls),
+    )
+    assert open(path2, "rb").read() == b"A"
+    assert open(cache.user_path(1, "last_v2.pdf"), "rb").read() == b"B"
+
+
+def test_garbage_collection_removes_unreferenced(cache):
+    calls = []
+    cache.render("text", 1, "last.pdf", {"v": 1}, _generator(cache, 1, "last.pdf", "old", calls))
+    old_key = cache.compute_key("text", {"v": 1})
+    cache.render("text", 1, "last.pdf", {"v": 2}, _generator(cache, 1, "last.pdf", "new", calls))
+    new_key = cache.compute_key("text", {"v": 2})
+
+    assert cache.collect_garbage(min_age=3600) == 0
+    assert cache.collect_garbage(min_age=0) == 1
+    assert not cache.blob_path(old_key).exists()
+    assert cache.blob_path(new_key).exists()
+    assert os.path.exists(cache.user_path(1, "last.pdf"))
+
+
+def test_failed_regeneration_drops_stale_ref(cache):
+    calls = []
+    cache.render("simple", 1, "last.pdf", {"v": 1}, _generator(cache, 1, "last.pdf", "A", calls))
+    assert cache.read_ref(1, "last.pdf")
+
+    assert cache.render("simple", 1, "last.pdf", {"v": 2}, lambda: "") == ""
+    assert cache.read_ref(1, "last.pdf") is None
+    assert not cache.user_path(1, "last.pdf").exists()
+
+
+class _FakeDocument:
+    def __init__(self, file_id):
+        self.file_id = file_id
+
+
+class _FakeMessage:
+    """Сообщение aiogram: answer_document принимает FSInputFile или file_id"""
+
+    def __init__(self, reject_file_ids=False):
+        self.sent = []
+        self.reject_file_ids = reject_file_ids
+
+    async def answer_document(self, document, caption=None):
+        from aiogram.exceptions import TelegramBadRequest
+
+        if isinstance(document, str):
+            if self.reject_file_ids:
+                raise TelegramBadRequest(method=None, message="wrong file identifier")
+            self.sent.append(("file_id", document))
+        else:
+            self.sent.append(("upload", str(document.path)))
+        return type("Sent", (), {"document": _FakeDocument(f"fid-{len(self.sent)}")})()
+
+
+def _send(monkeypatch, tmp_path, message, uid=5):
+    import asyncio
+
+    from bot.handlers import report
+    from bot.ui import report_cache
+
+    cache = ReportCache(root=str(tmp_path / "reports"))
+    store = report_cache.TelegramFileIdStore(path=str(tmp_path / "reports" / "ids.json"))
+    monkeypatch.setattr(report, "get_report_cache", lambda: cache)
+    monkeypatch.setattr(report, "get_file_id_store", lambda: store)
+
+    path = cache.user_path(uid, "last_v2.pdf")
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"%PDF report")
+
+    cb = type("Cb", (), {"message": message})()
+    asyncio.run(report._send_report_document(cb, uid, str(path)))
+    return store
+
+
+def test_repeat_send_reuses_file_id(monkeypatch, tmp_path):
+    message = _FakeMessage()
+    _send(monkeypatch, tmp_path, message)
+    store = _send(monkeypatch, tmp_path, message)
+
+    assert [kind for kind, _ in message.sent] == ["upload", "file_id"]
+    assert message.sent[1][1] == "fid-1"
+    # Соответствие сохраняется на диск и переживает перезапуск
+    from bot.ui.report_cache import TelegramFileIdStore
+
+    assert list(TelegramFileIdStore(path=str(store.path))._load().values()) == ["fid-1"]
+
+
+def test_rejected_file_id_falls_back_to_upload(monkeypatch, tmp_path):
+    _send(monkeypatch, tmp_path, _FakeMessage())
+    message = _FakeMessage(reject_file_ids=True)
+    store = _send(monkeypatch, tmp_path, message)
+
+    assert [kind for kind, _ in message.sent] == ["upload"]
+    assert list(store._load().values()) == ["fid-1"]
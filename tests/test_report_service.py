@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+🧪 Тесты сервиса генерации PDF вне event loop
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from bot.ui import report_service
+from bot.ui.report_service import (
+    ReportJobStatus,
+    ReportQueueFullError,
+    ReportRenderService,
+)
+
+
+def _slow_renderer(uid, delay=0.2):
+    time.sleep(delay)
+    return f"report-{uid}.pdf"
+
+
+def _cached_renderer(uid):
+    from bot.ui.report_cache import get_report_cache
+
+    cache = get_report_cache()
+    cache.hits += 2
+    cache.misses += 1
+    return f"report-{uid}.pdf"
+
+
+@pytest.fixture
+def slow_kind(monkeypatch):
+    monkeypatch.setitem(report_service.RENDERERS, "slow", (__name__, "_slow_renderer"))
+    return "slow"
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_render_text_pdf_in_pool(tmp_path, monkeypatch, executor):
+    monkeypatch.chdir(tmp_path)
+    service = ReportRenderService(executor=executor, max_workers=1)
+
+    async def scenario():
+        path = await service.render("text", 42, title="Report", body_text="Season: autumn")
+        await service.shutdown()
+        return path
+
+    path = asyncio.run(scenario())
+    assert path and os.path.exists(tmp_path / path)
+    job = service.get_user_jobs(42)[-1]
+    assert job.status == ReportJobStatus.DONE
+    assert service.get_stats()["completed"] == 1
+
+
+def test_event_loop_stays_responsive(slow_kind):
+    service = ReportRenderService(executor="thread", max_workers=1)
+
+    async def scenario():
+        job = service.submit(slow_kind, 1, delay=0.3)
+        ticks = 0
+        while service.get_job(job.job_id).status != ReportJobStatus.DONE:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        await service.shutdown()
+        return ticks
+
+    # Пока воркер "верстает" 300 мс, loop продолжает обслуживать другие корутины
+    assert asyncio.run(scenario()) > 5
+
+
+def test_concurrency_limit_and_queue_bound(slow_kind):
+    service = ReportRenderService(executor="thread", max_workers=1, max_queue=1)
+
+    async def scenario():
+        first = service.submit(slow_kind, 1, delay=0.2)
+        second = service.submit(slow_kind, 2, delay=0.0)
+        await asyncio.sleep(0.05)
+        assert service.get_job(first.job_id).status == ReportJobStatus.RUNNING
+        assert service.get_job(second.job_id).status == ReportJobStatus.QUEUED
+        assert service.queue_depth == 1
+
+        with pytest.raises(ReportQueueFullError):
+            service.submit(slow_kind, 3)
+
+        await service.shutdown()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.status == second.status == ReportJobStatus.DONE
+    assert service.get_stats()["rejected"] == 1
+
+
+def test_job_timeout(slow_kind):
+    service = ReportRenderService(executor="thread", max_workers=1, job_timeout=0.05)
+
+    async def scenario():
+        path = await service.render(slow_kind, 7, delay=0.3)
+        await service.shutdown()
+        return path
+
+    assert asyncio.run(scenario()) == ""
+    job = service.get_user_jobs(7)[-1]
+    assert job.status == ReportJobStatus.TIMEOUT
+    assert service.get_stats()["timed_out"] == 1
+
+
+def test_timed_out_render_keeps_its_slot_until_the_worker_finishes(slow_kind):
+    service = ReportRenderService(executor="thread", max_workers=1, max_queue=0, job_timeout=0.05)
+
+    async def scenario():
+        first = await service.render(slow_kind, 1, delay=0.3)
+        # верстка первой задачи еще идет: новая задача не принимается
+        assert service.get_stats()["overrunning"] == 1
+        with pytest.raises(ReportQueueFullError):
+            service.submit(slow_kind, 2, delay=0.0)
+
+        await asyncio.sleep(0.35)
+        assert service.get_stats()["overrunning"] == 0
+        second = await service.render(slow_kind, 3, delay=0.0)
+        await service.shutdown()
+        return first, second
+
+    assert asyncio.run(scenario()) == ("", "report-3.pdf")
+    assert service.get_stats()["rejected"] == 1
+
+
+def test_process_worker_cache_counts_reach_parent(tmp_path, monkeypatch):
+    from bot.ui import report_cache
+
+    cache = report_cache.ReportCache(root=str(tmp_path / "reports"))
+    monkeypatch.setattr(report_cache, "_report_cache", cache)
+    monkeypatch.setitem(report_service.RENDERERS, "cached", (__name__, "_cached_renderer"))
+    service = ReportRenderService(executor="process", max_workers=1)
+
+    async def scenario():
+        path = await service.render("cached", 3)
+        await service.shutdown()
+        return path
+
+    assert asyncio.run(scenario()) == "report-3.pdf"
+    job = service.get_user_jobs(3)[-1]
+    assert (job.cache_hits, job.cache_misses) == (2, 1)
+    assert (cache.hits, cache.misses) == (2, 1)
@@ -0,0 +1,91 @@
+"""
+🧪 Тесты скомпилированных правил совместимости активов
+"""
+
+import os
+
+from engine.models import Product
+from engine.rule_engine import CAUTION, DO, DONT, RuleEngine, get_rule_engine
+from engine.selector import SelectorV2
+
+MATRIX = """
+legend: { DO: "совместимо", CAUTION: "разносить", DONT: "не сочетать" }
+pairs:
+  retinoids:
+    with:
+      aha: CAUTION
+      niacinamide: DO
+  acids:
+    with:
+      copper_peptides: CAUTION
+incompatible_pairs:
+  - [benzoyl_peroxide, vitamin_c]
+"""
+
+
+def _write_rules(path, text=MATRIX):
+    (path / "compatibility_matrix.yaml").write_text(text, encoding="utf-8")
+
+
+def test_conflicts_use_aliases_and_groups(tmp_path):
+    _write_rules(tmp_path)
+    rules = RuleEngine(str(tmp_path)).rules
+
+    assert rules.canonical("Salicylic") == "bha"
+    assert rules.level("retinol", "glycolic") == CAUTION
+    assert rules.level("aha", "retinoids") == CAUTION
+    assert rules.level("retinol", "niacinamide") == DO
+    assert rules.level("hyaluronic", "niacinamide") is None
+
+    conflicts = rules.conflicts(["bpo", "vitamin-c", "lactic", "copper peptides", "ceramide"])
+    assert [(c.level, {c.first, c.second}) for c in conflicts] == [
+        (DONT, {"benzoyl_peroxide", "vitamin_c"}),
+        (CAUTION, {"acids", "copper_peptides"}),
+    ]
+    assert rules.conflicts(["retinol", "niacinamide", "hyaluronic"]) == []
+
+
+def test_rules_hot_reload_on_change(tmp_path):
+    _write_rules(tmp_path)
+    engine = RuleEngine(str(tmp_path), reload_interval=0)
+    first = engine.rules
+    assert engine.rules is first
+
+    _write_rules(tmp_path, MATRIX + "  - [retinol, bha]\n")
+    os.utime(tmp_path / "compatibility_matrix.yaml", (1, 1))
+
+    assert engine.rules is not first
+    assert engine.rules.level("retinal", "salicylic_acid") == DONT
+    assert engine.reloads == 1
+
+
+def test_selector_checks_only_selected_products(tmp_path):
+    _write_rules(tmp_path)
+    selector = SelectorV2(rules_path=str(tmp_path))
+    assert get_rule_engine(str(tmp_path)) is selector._rule_engine
+
+    serum = Product(id="s1", name="Serum", brand="B", category="serum", actives=["retinol"])
+    peel = Product(id="p1", name="Peel", brand="B", category="toner", actives=["glycolic"])
+
+    assert selector._check_compatibility([serum]) == []
+    assert len(selector._check_compatibility([serum, {"actives": ["glycolic"]}])) == 1
+    assert selector._check_compatibility([serum, peel])[0].startswith("Сочетайте")
+
+
+def test_engine_context_is_shared_and_swapped_on_reload(tmp_path):
+    from engine.answer_expander import AnswerExpanderV2
+    from engine.engine_context import get_engine_context
+
+    _write_rules(tmp_path)
+    path = str(tmp_path)
+    context = get_engine_context(path)
+    first, second = SelectorV2(rules_path=path), SelectorV2(rules_path=path)
+
+    assert first.makeup_categories is second.makeup_categories is context.makeup_categories
+    assert AnswerExpanderV2(rules_path=path)._compatibility_rules is context.rules.compatibility
+
+    get_rule_engine(path).reload(force=True)
+    swapped = get_engine_context(path)
+    assert swapped is not context and swapped.rules is not context.rules
+    assert swapped.skincare_categories is context.skincare_categories
+    assert first._context is swapped
@@ -0,0 +1,51 @@
+"""
+🧪 Тесты однопроходного подбора слотов legacy select_products
+"""
+
+import random
+
+from engine.models import Product
+from engine.selector import _filter_catalog, _select_slots, _SlotQuery
+from engine.source_prioritizer import get_source_prioritizer
+
+
+def _reference(catalog, slot):
+    # Поведение до однопроходного подбора: фильтр, затем стабильная сортировка по источнику
+    products = _filter_catalog(catalog, category=slot.category, actives=list(slot.actives))
+    prioritizer = get_source_prioritizer()
+    ranked = sorted(products, key=lambda p: prioritizer.get_priority(p.buy_url or ""))
+    return ranked[: slot.limit]
+
+
+def test_slots_match_filter_and_pick_top():
+    rng = random.Random(5)
+    links = [None, "https://goldapple.ru/p", "https://ozon.ru/p", "https://unknown.example/p"]
+    actives = ["BHA", "niacinamide", "hyaluronic", "ceramide", "retinol"]
+    catalog = [
+        Product(
+            id=f"p{i}",
+            name=f"Product {i}",
+            brand="Brand",
+            category=rng.choice(["cleanser", "Serum", "serum", "toner", "mask"]),
+            in_stock=rng.random() < 0.8,
+            buy_url=rng.choice(links),
+            actives=rng.sample(actives, rng.randint(0, 2)),
+        )
+        for i in range(200)
+    ]
+    wanted = ("bha", "ceramide")
+    slots = {
+        "am_cleanser": _SlotQuery("cleanser"),
+        "pm_cleanser": _SlotQuery("cleanser"),
+        "serum": _SlotQuery("serum", wanted, limit=2),
+        "toner": _SlotQuery("toner", wanted),
+        "mask": _SlotQuery("mask", ("missing",)),
+        "peeling": _SlotQuery("peeling", wanted),
+    }
+
+    picked = _select_slots(catalog, slots)
+
+    for name, slot in slots.items():
+        assert picked[name] == _reference(catalog, slot), name
+    assert picked["mask"] == [] and picked["peeling"] == []
+    assert _select_slots([], slots)["serum"] == []
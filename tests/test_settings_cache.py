@@ -0,0 +1,56 @@
+"""
+🧪 Тесты закешированных настроек и их перезагрузки
+"""
+
+import os
+
+import pytest
+
+from config import env
+
+
+@pytest.fixture
+def restore_settings(monkeypatch):
+    # Тесты не зависят от BOT_TOKEN из окружения CI
+    previous = env._settings
+    monkeypatch.setenv("BOT_TOKEN", os.environ.get("BOT_TOKEN", "123:abc"))
+    yield
+    # Сначала вернуть окружение, иначе в кеше останутся подмененные значения;
+    # токен нужен только для пересборки настроек и хуков
+    monkeypatch.undo()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("BOT_TOKEN", os.environ.get("BOT_TOKEN", "123:abc"))
+        env.reload_settings()
+    if previous is None:
+        env._settings = None
+
+
+def test_settings_cached_until_reload(monkeypatch, restore_settings):
+    seen = []
+    env.on_settings_reload(seen.append)
+    try:
+        settings = env.get_settings()
+        assert env.get_settings() is settings
+        assert settings.security is settings.security
+        assert settings.partner is settings.partner
+
+        monkeypatch.setenv("PARTNER_CODE", "reloaded_code")
+        monkeypatch.setenv("PIN_WHITELIST", "42")
+        assert env.get_settings().partner_code != "reloaded_code"
+
+        reloaded = env.reload_settings()
+        assert env.get_settings() is reloaded is not settings
+        assert reloaded.partner.partner_code == "reloaded_code"
+        assert 42 in reloaded.security.pin_whitelist
+        assert seen == [reloaded]
+    finally:
+        env._reload_hooks.remove(seen.append)
+
+
+def test_guards_follow_reloaded_settings(monkeypatch, restore_settings):
+    from bot.utils.security import chat_filter
+
+    monkeypatch.setenv("CHAT_WHITELIST", "777")
+    env.reload_settings()
+    assert chat_filter.is_chat_allowed(777)
+    assert not chat_filter.is_chat_allowed(778)
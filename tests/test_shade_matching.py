@@ -0,0 +1,87 @@
+"""
+🧪 Тесты перцептивного подбора оттенков (CIELAB, ΔE2000)
+"""
+
+import random
+
+import pytest
+
+from engine import shade_matching
+from engine.shade_matching import ShadeMatcher, delta_e_2000, hex_to_lab
+from engine.shade_normalization import ShadeNormalizer
+
+
+@pytest.mark.parametrize(
+    "lab1, lab2, expected",
+    [
+        # Эталонные пары из статьи Sharma, Wu, Dalal (2005)
+        ((50.0, 2.6772, -79.7751), (50.0, 0.0, -82.7485), 2.0425),
+        ((50.0, 2.5, 0.0), (73.0, 25.0, -18.0), 27.1492),
+        ((2.0776, 0.0795, -1.1350), (0.9033, -0.0636, -0.5514), 0.9082),
+        ((50.0, 2.5, 0.0), (50.0, 0.0, -2.5), 4.3065),
+    ],
+)
+def test_delta_e_2000_reference_values(lab1, lab2, expected):
+    assert delta_e_2000(lab1, lab2) == pytest.approx(expected, abs=1e-4)
+
+
+def test_hex_to_lab():
+    assert hex_to_lab("#FFFFFF") == pytest.approx((100.0, 0.0, 0.0), abs=0.01)
+    assert hex_to_lab("fff") == hex_to_lab("#ffffff")
+    assert hex_to_lab("not a color") is None
+
+
+def test_kd_tree_matches_brute_force(monkeypatch):
+    rng = random.Random(7)
+    shades = [
+        (
+            f"found_{i:04d}",
+            "#%02X%02X%02X" % (rng.randint(90, 255), rng.randint(60, 220), rng.randint(40, 200)),
+        )
+        for i in range(2000)
+    ]
+    tree = ShadeMatcher(shades)
+    assert tree._tree is not None
+
+    monkeypatch.setattr(shade_matching, "BRUTE_FORCE_LIMIT", 10**6)
+    brute = ShadeMatcher(shades)
+    assert brute._tree is None
+
+    for shade_id, _ in shades[:50]:
+        assert tree.neighbors(shade_id, k=5) == brute.neighbors(shade_id, k=5)
+
+
+def test_normalizer_uses_perceptual_neighbors(tmp_path):
+    normalizer = ShadeNormalizer(
+        shade_map_path=str(tmp_path / "shade_map.json"),
+        neighbors_path=str(tmp_path / "neighbors.json"),
+    )
+
+    # Ручная карта соседей имеет приоритет
+    assert normalizer.get_shade_neighbors("found_001") == ["found_002", "found_003"]
+
+    # Для помад ручной карты нет - ближайшие по цвету внутри линейки lip_*
+    neighbors = normalizer.get_shade_neighbors("lip_004")
+    assert neighbors and all(n.startswith("lip_") for n in neighbors)
+
+    # hex приводится к ближайшему известному оттенку
+    assert normalizer.normalize_shade("#E3BD99").shade_id == "found_004"
+    assert normalizer.normalize_shade("#0000FF").shade_id.startswith("unknown")
+
+    normalizer.add_shade_mapping("sand", "found_100", hex_color="#E1BB97")
+    assert normalizer.get_perceptual_neighbors("found_004", k=1) == ["found_100"]
+
+
+def test_hex_digit_shade_names_are_not_remapped_by_color(tmp_path, monkeypatch):
+    normalizer = ShadeNormalizer(
+        shade_map_path=str(tmp_path / "shade_map.json"),
+        neighbors_path=str(tmp_path / "neighbors.json"),
+    )
+
+    def no_color_match():
+        raise AssertionError("shade name treated as a hex color")
+
+    monkeypatch.setattr(normalizer, "matcher", no_color_match)
+    for name in ("120", "220330", "ace", "E3BD99"):
+        normalizer.normalize_shade(name)
+    assert normalizer.normalize_shade("220330").shade_id.startswith("unknown")
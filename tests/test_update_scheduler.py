@@ -0,0 +1,162 @@
+"""
+🧪 Тесты планировщика обновлений: порядок пользователя, лимит, приоритеты, допуск
+"""
+
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.types import CallbackQuery, Message, Update
+
+from bot.metrics import render_metrics
+from bot.middlewares.update_scheduler import (
+    MSG_OVERLOADED,
+    Priority,
+    UpdateScheduler,
+    install_update_scheduler,
+)
+
+
+class _FakeSession(AiohttpSession):
+    def __init__(self):
+        super().__init__()
+        self.answers = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.answers.append(method.text)
+        return True
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": "T"}
+
+
+def _callback(update_id: int, data: str, user_id: int) -> Update:
+    return Update(
+        update_id=update_id,
+        callback_query={
+            "id": f"q{update_id}",
+            "from": _user(user_id),
+            "chat_instance": "c",
+            "data": data,
+        },
+    )
+
+
+def _message(update_id: int, text: str, user_id: int) -> Update:
+    return Update(
+        update_id=update_id,
+        message={
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user(user_id),
+            "text": text,
+        },
+    )
+
+
+def _setup(scheduler: UpdateScheduler, work: float = 0.02):
+    dp = Dispatcher()
+    install_update_scheduler(dp, scheduler)
+    log = {"started": [], "running": 0, "peak": 0}
+
+    async def run(label: str) -> None:
+        log["started"].append(label)
+        log["running"] += 1
+        log["peak"] = max(log["peak"], log["running"])
+        await asyncio.sleep(work)
+        log["running"] -= 1
+
+    @dp.callback_query()
+    async def _on_callback(callback: CallbackQuery) -> None:
+        await run(callback.data)
+
+    @dp.message()
+    async def _on_message(message: Message) -> None:
+        await run(message.text)
+
+    return dp, log, Bot("123:TEST", session=_FakeSession())
+
+
+@pytest.mark.asyncio
+async def test_user_updates_run_in_order_under_global_limit():
+    scheduler = UpdateScheduler(max_concurrency=3)
+    scheduler.start()
+    dp, log, bot = _setup(scheduler)
+
+    updates = [
+        _callback(user * 100 + n, f"cart:inc:{user}:{n}", user)
+        for n in range(5)
+        for user in (1, 2, 3, 4)
+    ]
+    await asyncio.gather(*(dp.feed_update(bot, update) for update in updates))
+
+    assert log["peak"] == 3
+    for user in (1, 2, 3, 4):
+        mine = [label for label in log["started"] if label.startswith(f"cart:inc:{user}:")]
+        assert mine == [f"cart:inc:{user}:{n}" for n in range(5)]
+    assert scheduler.stats.completed == 20 and scheduler.running == 0
+    assert scheduler.snapshot()["lanes"] == 0
+    await scheduler.stop()
+    await bot.session.close()
+
+
+@pytest.mark.asyncio
+async def test_callbacks_jump_ahead_of_messages_and_background_jobs():
+    scheduler = UpdateScheduler(max_concurrency=1)
+    scheduler.start()
+    dp, log, bot = _setup(scheduler)
+    order = []
+
+    async def pdf_job() -> None:
+        async with scheduler.slot(Priority.BACKGROUND):
+            order.append("pdf")
+
+    blocker = asyncio.create_task(dp.feed_update(bot, _message(1, "first", 1)))
+    await asyncio.sleep(0)  # единственный слот занят
+    waiting = [
+        asyncio.create_task(pdf_job()),
+        asyncio.create_task(dp.feed_update(bot, _message(2, "text", 2))),
+        asyncio.create_task(dp.feed_update(bot, _callback(3, "report_tab:desc", 3))),
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.snapshot()["pending"] == {"interactive": 1, "normal": 1, "background": 1}
+
+    await asyncio.gather(blocker, *waiting)
+    assert log["started"] == ["first", "report_tab:desc", "text"]
+    assert order == ["pdf"]
+    assert scheduler.wait_histograms[Priority.BACKGROUND].count == 1
+    await scheduler.stop()
+    await bot.session.close()
+
+
+@pytest.mark.asyncio
+async def test_admission_sheds_messages_before_callbacks_and_caps_user_backlog(monkeypatch):
+    scheduler = UpdateScheduler(max_concurrency=1, max_pending=10, user_max_pending=3)
+    monkeypatch.setattr("bot.middlewares.update_scheduler._scheduler", scheduler)
+    scheduler.start()
+    dp, log, bot = _setup(scheduler)
+
+    # один пользователь жмет кнопку 6 раз: 1 в работе, 3 ждут, 2 отброшены
+    await asyncio.gather(
+        *(dp.feed_update(bot, _callback(n, f"cart:inc:p{n}", 1)) for n in range(6))
+    )
+    assert log["started"] == [f"cart:inc:p{n}" for n in range(4)]
+    assert scheduler.stats.shed_user_backlog == 2
+    assert bot.session.answers == [MSG_OVERLOADED] * 2
+
+    # очередь заполнена на 90%: сообщения отбрасываются, callback еще принимаются
+    log["started"].clear()
+    updates = [_message(100 + n, f"m{n}", 10 + n) for n in range(12)]
+    updates.append(_callback(200, "rec:more:1", 50))
+    await asyncio.gather(*(dp.feed_update(bot, update) for update in updates))
+    assert log["started"][:2] == ["m0", "rec:more:1"]
+    assert scheduler.stats.shed_queue_full == 2
+
+    text = render_metrics()
+    assert 'skin_advisor_updates_shed_total{reason="user_backlog"} 2' in text
+    assert 'skin_advisor_update_queue_wait_seconds_count{priority="interactive"}' in text
+    await scheduler.stop()
+    await bot.session.close()
@@ -0,0 +1,81 @@
+"""
+🧪 Тесты общего кеша URL (url_intel)
+"""
+
+from engine.source_prioritizer import SourcePrioritizer
+from engine.source_resolver import SourceResolver
+from engine.url_intel import AffiliateTemplate, UrlIntelligence, get_url_intel
+
+
+def test_domain_parsing_is_memoized():
+    intel = UrlIntelligence(max_entries=16)
+
+    assert intel.netloc_domain("https://www.GoldApple.ru/p/1") == "goldapple.ru"
+    assert intel.netloc_domain("https://www.GoldApple.ru/p/1") == "goldapple.ru"
+    assert intel.host_prefix("https://Ozon.ru/item?id=1") == "ozon.ru"
+    assert intel.host_prefix("") == ""
+
+    stats = intel.get_stats()["domain"]
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+
+def test_cache_is_bounded():
+    intel = UrlIntelligence(max_entries=3)
+    for i in range(10):
+        intel.parse(f"https://example.com/p/{i}")
+
+    assert intel.get_stats()["parse"]["entries"] == 3
+
+
+def test_affiliate_template_replaces_params_in_place():
+    intel = UrlIntelligence()
+    config = {
+        "aff_param": "partner",
+        "campaign_param": "utm_campaign",
+        "source_param": "utm_source",
+        "medium_param": "utm_medium",
+        "partner_code": "CODE",
+        "campaign": "recommendation",
+    }
+    template = intel.template("goldapple", config)
+    assert isinstance(template, AffiliateTemplate)
+    assert intel.template("goldapple", dict(config)) is template
+
+    url = intel.affiliate_url("https://goldapple.ru/p?x=1&partner=old", template)
+    assert url == (
+        "https://goldapple.ru/p?x=1&partner=CODE&utm_source=goldapple"
+        "&utm_medium=affiliate&utm_campaign=recommendation"
+    )
+    assert intel.affiliate_url("https://goldapple.ru/p?x=1&partner=old", template) is url
+
+
+def test_partner_code_change_produces_new_links():
+    intel = UrlIntelligence()
+    config = {"aff_param": "aff", "partner_code": "OLD"}
+    old = intel.affiliate_url("https://ulta.com/p", intel.template("intl", config))
+
+    config = {"aff_param": "aff", "partner_code": "NEW"}
+    new = intel.affiliate_url("https://ulta.com/p", intel.template("intl", config))
+
+    assert old.endswith("aff=OLD") and new.endswith("aff=NEW")
+
+    intel.invalidate("affiliate")
+    assert intel.get_stats()["affiliate"]["entries"] == 0
+
+
+def test_source_modules_share_cache():
+    intel = get_url_intel()
+    intel.invalidate()
+
+    prioritizer = SourcePrioritizer()
+    resolver = SourceResolver()
+    # Счетчики накопительные: сравниваем с состоянием после сброса кешей
+    before = {name: stats["misses"] for name, stats in intel.get_stats().items()}
+
+    assert prioritizer.get_source_info("https://www.goldapple.ru/p/1").priority == 1
+    assert resolver._get_source_info("https://shop.letu.ru/p").name == "Л'Этуаль"
+    assert resolver._get_source_info("https://unknown.example/p").priority == 999
+
+    stats = intel.get_stats()
+    assert stats["domain"]["misses"] - before.get("domain", 0) == 3
+    assert stats["source:resolver"]["misses"] - before.get("source:resolver", 0) == 2
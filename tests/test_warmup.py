@@ -0,0 +1,59 @@
+"""
+🧪 Тесты параллельного прогрева и флага готовности /health
+"""
+
+import time
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.warmup import get_warmup_state, run_warmup
+from bot.webhook import build_webhook_app
+from config.env import TelegramConfig
+
+
+def _slow(detail):
+    def init():
+        time.sleep(0.3)
+        return detail
+
+    return init
+
+
+def _broken():
+    raise RuntimeError("yaml is broken")
+
+
+@pytest.mark.asyncio
+async def test_components_run_concurrently_and_failures_do_not_block():
+    started = time.perf_counter()
+    state = await run_warmup(
+        {"catalog": _slow("42 products"), "rules": _slow(None), "carts": _broken}
+    )
+
+    assert time.perf_counter() - started < 0.55
+    assert state.ready and state is get_warmup_state()
+    assert [c.name for c in state.components] == ["catalog", "rules", "carts"]
+    catalog, rules, carts = state.components
+    assert catalog.ok and catalog.detail == "42 products" and catalog.seconds >= 0.3
+    assert rules.ok and rules.detail is None
+    assert not carts.ok and "yaml is broken" in carts.detail
+
+
+@pytest.mark.asyncio
+async def test_health_reports_readiness():
+    get_warmup_state().ready = False
+    app = build_webhook_app(
+        Bot("123:TEST"), Dispatcher(), TelegramConfig(token="123:TEST"), register_webhook=False
+    )
+
+    async with TestClient(TestServer(app)) as client:
+        response = await client.get("/health")
+        assert response.status == 503 and (await response.json())["ready"] is False
+
+        await run_warmup({"noop": lambda: None})
+        response = await client.get("/health")
+        body = await response.json()
+        assert response.status == 200 and body["status"] == "OK"
+        assert body["warmup"]["components"][0]["name"] == "noop"
@@ -0,0 +1,78 @@
+"""
+🧪 Тесты webhook-сервера на aiohttp (фейковый клиент Telegram)
+"""
+
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.webhook import WEBHOOK_HANDLER, build_webhook_app, webhook_url
+from config.env import TelegramConfig
+
+SECRET = "s3cret"
+HEADERS = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+
+
+def _update(update_id: int) -> dict:
+    user = {"id": update_id, "is_bot": False, "first_name": "T"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": update_id, "type": "private"},
+            "from": user,
+            "text": "hi",
+        },
+    }
+
+
+def _app(release: asyncio.Event, state: dict, **limits):
+    dp = Dispatcher()
+
+    @dp.message()
+    async def _handler(message: Message) -> None:
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await release.wait()
+        state["active"] -= 1
+        state["seen"].append(message.message_id)
+
+    telegram = TelegramConfig(token="123:TEST", webhook_secret=SECRET, webhook_path="/tg")
+    return build_webhook_app(Bot("123:TEST"), dp, telegram, register_webhook=False, **limits)
+
+
+@pytest.mark.asyncio
+async def test_updates_acked_fast_and_processed_with_bounded_concurrency():
+    release = asyncio.Event()
+    state = {"active": 0, "peak": 0, "seen": []}
+    app = _app(release, state, max_concurrency=3, max_pending=6)
+    handler = app[WEBHOOK_HANDLER]
+
+    async with TestClient(TestServer(app)) as client:
+        assert (await client.post("/tg", json=_update(1))).status == 401
+
+        statuses = [
+            (await client.post("/tg", json=_update(i), headers=HEADERS)).status for i in range(1, 9)
+        ]
+        # Подтверждение не ждет обработки: 6 приняты, остальные получают 429
+        assert statuses == [200] * 6 + [429] * 2
+        await asyncio.sleep(0.05)
+        assert state["peak"] == 3 and handler.pending == 6
+
+        health = await (await client.get("/health")).json()
+        assert health["mode"] == "webhook" and health["updates"]["rejected"] == 2
+
+        release.set()
+        await handler.drain(timeout=2)
+        assert sorted(state["seen"]) == [1, 2, 3, 4, 5, 6]
+        assert handler.snapshot()["processed"] == 6 and handler.pending == 0
+
+
+def test_webhook_url():
+    config = TelegramConfig(token="1:x", webhook_base="https://bot.example/", webhook_path="/tg")
+    assert webhook_url(config) == "https://bot.example/tg"
+    assert webhook_url(TelegramConfig(token="1:x")) is None